@@ -6,20 +6,54 @@ and generates VBA code using free AI services (no API key required).
 
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, ttk
-import win32com.client
-import subprocess
 import os
-import requests
 import json
-import threading
+import sqlite3
+import sys
 import time
+from functools import cached_property
+
+# Shared building blocks from catia_ai_generator (cache, transport, template matching)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "catia_ai_generator", "src"))
+import metrics
+from catia_session import get_catia_session
+from code_extractor import extract_code
+from executor import BackgroundExecutor
+from generation_daemon import DaemonUnavailable, get_daemon_client
+from intent_index import IntentIndex
+from response_cache import get_response_cache, make_key, normalize_request
 
 class CatiaAIAssistant:
+    # Keyword weights for picking a fallback template; earlier entries win ties
+    FALLBACK_KEYWORDS = {
+        "part": {"part": 2.0, "solid": 2.0, "extrude": 2.0, "pad": 2.0, "cube": 2.0, "block": 1.0},
+        "assembly": {"assembly": 2.0, "constraint": 2.0, "product": 2.0, "component": 1.0},
+        "drawing": {"drawing": 2.0, "view": 2.0, "dimension": 1.5, "sheet": 1.0},
+        "sketch": {"sketch": 2.0, "line": 1.5, "circle": 1.5, "profile": 1.5, "rectangle": 1.5},
+        "feature": {"feature": 1.0, "pocket": 1.5, "hole": 1.5, "fillet": 1.5, "chamfer": 1.5}
+    }
+    fallback_index = IntentIndex.from_keywords(FALLBACK_KEYWORDS)
+    
+    # The AI request is abandoned after this long; the template stays in place
+    AI_TIMEOUT_S = 60
+    # The UI stops waiting for a macro after this long (CATIA itself cannot be interrupted)
+    MACRO_TIMEOUT_S = 300
+    AI_MAX_TOKENS = 1000
+    
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("CATIA V5 AI Code Generator")
         self.root.geometry("800x600")
         self.catia_app = None
+        self.cache = get_response_cache()
+        self.executor = BackgroundExecutor(self.root)
+        # Connecting and running macros each have their own job slot, so neither cancels the other
+        self.connector = BackgroundExecutor(self.root)
+        self.macro_jobs = BackgroundExecutor(self.root)
+        self.catia_session = get_catia_session()
+        self.shown_code = None
+        self.pending_ai_code = None
+        self.local_result = None
         self.setup_gui()
         
     def setup_gui(self):
@@ -65,6 +99,9 @@ class CatiaAIAssistant:
         self.progress = ttk.Progressbar(input_frame, mode='indeterminate')
         self.progress.grid(row=2, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=(0, 10))
         
+        self.result_label = ttk.Label(input_frame, text="")
+        self.result_label.grid(row=3, column=0, columnspan=2, sticky=tk.W)
+        
         # Output Section
         output_frame = ttk.LabelFrame(main_frame, text="Generated VBA Code", padding="10")
         output_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), 
@@ -82,13 +119,23 @@ class CatiaAIAssistant:
                                     command=self.insert_code_to_catia)
         self.insert_btn.grid(row=0, column=0, padx=(0, 10))
         
+        self.run_btn = ttk.Button(button_frame, text="Run in CATIA", 
+                                 command=self.run_in_catia)
+        self.run_btn.grid(row=0, column=1, padx=(0, 10))
+        
         self.copy_btn = ttk.Button(button_frame, text="Copy to Clipboard", 
                                   command=self.copy_to_clipboard)
-        self.copy_btn.grid(row=0, column=1, padx=(0, 10))
+        self.copy_btn.grid(row=0, column=2, padx=(0, 10))
         
         self.save_btn = ttk.Button(button_frame, text="Save to File", 
                                   command=self.save_to_file)
-        self.save_btn.grid(row=0, column=2)
+        self.save_btn.grid(row=0, column=3, padx=(0, 10))
+        
+        # Shown only when an AI result arrives after the user edited the template
+        self.apply_ai_btn = ttk.Button(button_frame, text="Apply AI Result", 
+                                      command=self.apply_ai_result)
+        self.apply_ai_btn.grid(row=0, column=4)
+        self.apply_ai_btn.grid_remove()
         
         # Configure grid weights for resizing
         self.root.columnconfigure(0, weight=1)
@@ -99,112 +146,161 @@ class CatiaAIAssistant:
         output_frame.columnconfigure(0, weight=1)
         output_frame.rowconfigure(0, weight=1)
         
-    def connect_to_catia(self):
-        """Connect to CATIA V5 application"""
-        try:
-            # Try to connect to existing CATIA instance
-            self.catia_app = win32com.client.Dispatch("Catia.Application")
-            self.catia_app.Visible = True
-            self.status_label.config(text="Status: Connected", foreground="green")
-            messagebox.showinfo("Success", "Connected to CATIA V5!")
-        except:
-            # If no CATIA instance found, try to start it
+    @cached_property
+    def backend_names(self):
+        """AI backends: HuggingFace, plus OpenAI when OPENAI_API_KEY is set (CATIA_AI_BACKENDS overrides)"""
+        from backends import configured_backend_names
+        return configured_backend_names(os.getenv("OPENAI_API_KEY"), default="huggingface,openai")
+    
+    @cached_property
+    def router(self):
+        """In-process router over the AI backends; clients are created on first use"""
+        from backends import build_backends
+        from router import Router
+        return Router(build_backends(self.backend_names, os.getenv("OPENAI_API_KEY")))
+    
+    def complete(self, prompt):
+        """Run a completion on the generation daemon's warm router when it is running, else here"""
+        client = get_daemon_client()
+        if client is not None:
             try:
-                # You may need to adjust this path based on your CATIA installation
-                catia_path = r"C:\Program Files\Dassault Systemes\B28\win_b64\code\bin\CNEXT.exe"
-                if os.path.exists(catia_path):
-                    subprocess.Popen([catia_path])
-                    time.sleep(10)  # Wait for CATIA to start
-                    self.catia_app = win32com.client.Dispatch("Catia.Application")
-                    self.catia_app.Visible = True
-                    self.status_label.config(text="Status: Connected", foreground="green")
-                    messagebox.showinfo("Success", "Started and connected to CATIA V5!")
-                else:
-                    messagebox.showerror("Error", "CATIA V5 not found. Please start CATIA manually and try again.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to connect to CATIA: {str(e)}")
-                
-    def generate_code_thread(self, user_request):
-        """Generate code in a separate thread to avoid blocking GUI"""
+                return client.complete(prompt, self.AI_MAX_TOKENS, self.backend_names)
+            except DaemonUnavailable as e:
+                print(f"{e} - generating in-process")
+        return self.router.complete(prompt, self.AI_MAX_TOKENS)
+    
+    @cached_property
+    def offline(self):
+        """Snippet assembler that answers without a model, created on first use"""
+        from offline_backend import get_offline_backend
+        return get_offline_backend()
+    
+    @cached_property
+    def history(self):
+        """Shared generation history, opened on first use (None when disabled)"""
+        from history import get_history
+        return get_history()
+    
+    def record_history(self, user_request, code, source, backend=None, latency=0.0):
+        """Add a generation to the history; a failure never affects the result"""
+        if self.history is None or not code:
+            return
         try:
-            self.progress.start()
-            self.generate_btn.config(state='disabled')
-            
-            # Use HuggingFace's free inference API (no key required for some models)
-            generated_code = self.generate_with_huggingface(user_request)
-            
-            if not generated_code:
-                # Fallback to local code generation
-                generated_code = self.generate_fallback_code(user_request)
-            
-            # Update GUI in main thread
-            self.root.after(0, self.update_output, generated_code)
-            
-        except Exception as e:
-            error_msg = f"Error generating code: {str(e)}"
-            self.root.after(0, self.update_output, error_msg)
-        finally:
-            self.root.after(0, self.generation_complete)
+            self.history.record(user_request, code, "VBA", None, source, backend, latency)
+        except sqlite3.Error as e:
+            print(f"Recording history failed: {e}")
     
-    def generate_with_huggingface(self, user_request):
-        """Generate code using HuggingFace's free inference API"""
-        try:
-            # Using Hugging Face's free inference endpoint
-            api_url = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
-            
-            prompt = f"""Generate VBA code for CATIA V5 based on this request: {user_request}
+    def connect_to_catia(self):
+        """Connect to CATIA V5, starting it and waiting until it is ready if necessary"""
+        self.connect_btn.config(state='disabled')
+        self.status_label.config(text="Status: Connecting...", foreground="orange")
+        self.connector.submit(
+            lambda job: self.catia_session.connect(cancelled=lambda: job.cancelled),
+            on_done=self.catia_connected,
+            on_error=self.catia_connect_failed,
+            timeout=self.catia_session.timeout + 10,
+            on_cancel=self.catia_connect_cancelled
+        )
+    
+    def catia_connected(self, app):
+        self.catia_app = app
+        self.connect_btn.config(state='normal')
+        self.status_label.config(text="Status: Connected", foreground="green")
+        if self.catia_session.launched:
+            messagebox.showinfo("Success", "Started and connected to CATIA V5!")
+        else:
+            messagebox.showinfo("Success", "Connected to CATIA V5!")
+    
+    def catia_connect_cancelled(self):
+        self.connect_btn.config(state='normal')
+        self.status_label.config(text="Status: Not Connected", foreground="red")
+    
+    def catia_connect_failed(self, error):
+        self.catia_app = None
+        self.connect_btn.config(state='normal')
+        self.status_label.config(text="Status: Not Connected", foreground="red")
+        messagebox.showerror("Error", f"Failed to connect to CATIA: {str(error)}")
+                
+    def generate_with_ai(self, user_request):
+        """Generate code on the fastest healthy AI backend (HuggingFace's free API by default)"""
+        from router import NoBackendAvailable
+        start = time.perf_counter()
+        with metrics.span("generate") as span:
+            try:
+                prompt = f"""Generate VBA code for CATIA V5 based on this request: {user_request}
 
 The code should be complete and ready to use in CATIA V5 VBA environment.
 Include proper error handling and comments.
 
 VBA Code:"""
-
-            headers = {"Content-Type": "application/json"}
-            payload = {
-                "inputs": prompt,
-                "parameters": {
-                    "max_length": 1000,
-                    "temperature": 0.7,
-                    "do_sample": True
-                }
-            }
-            
-            response = requests.post(api_url, headers=headers, json=payload, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if isinstance(result, list) and len(result) > 0:
-                    generated_text = result[0].get('generated_text', '')
-                    return self.clean_generated_code(generated_text, user_request)
+                
+                key = make_key(",".join(self.backend_names), normalize_request(user_request, "VBA", None),
+                               prompt, "", {"max_tokens": self.AI_MAX_TOKENS})
+                if self.cache:
+                    cached = self.cache.get(key)
+                    span.set(cache_hit=cached is not None)
+                    if cached is not None:
+                        span.set(source="cache")
+                        code = self.checked_code(cached, span)
+                        self.record_history(user_request, code, "cache", None, time.perf_counter() - start)
+                        return code
+                
+                routed = self.complete(prompt)
+                span.set(source="ai", backend=routed.backend, hedged=routed.hedged)
+                code = self.checked_code(routed.text, span)
+                if self.cache and code is not None:
+                    self.cache.put(key, routed.text)  # Responses without code are asked again next time
+                self.record_history(user_request, code, "ai", routed.backend, time.perf_counter() - start)
+                return code
             
-        except Exception as e:
-            print(f"HuggingFace API error: {e}")
+            except NoBackendAvailable as e:
+                print(f"AI backends unavailable: {e}")
+                span.set(fallback_reason=type(e).__name__)
+            except Exception as e:
+                print(f"AI generation error: {e}")
+                span.set(fallback_reason=type(e).__name__)
             
-        return None
+            return None
+    
+    def checked_code(self, generated_text, span):
+        """Extract the VBA code, noting on the span when the response had none"""
+        with metrics.span("clean", chars=len(generated_text)) as clean:
+            code = self.extract_vba_code(generated_text)
+            clean.set(found=code is not None)
+        if code is None:
+            span.set(fallback_reason="no_code_in_response")
+        return code
+    
+    def assemble_offline(self, user_request):
+        """Stitch VBA together from the snippet library, or None if no operation matched"""
+        with metrics.span("offline", language="VBA") as span:
+            assembly = self.offline.assemble(user_request, "VBA")
+            if span.active and assembly is not None:
+                span.set(operations=len(assembly.operations), unmatched=len(assembly.unmatched))
+            return assembly
+    
+    def generate_local_code(self, user_request):
+        """VBA assembled offline, or the matching fixed template when nothing matched"""
+        assembly = self.assemble_offline(user_request)
+        if assembly is not None:
+            return assembly.code
+        return self.generate_fallback_code(user_request)
     
     def generate_fallback_code(self, user_request):
         """Generate basic VBA code template when API fails"""
         templates = {
-            "part": self.get_part_template(),
-            "assembly": self.get_assembly_template(),
-            "drawing": self.get_drawing_template(),
-            "sketch": self.get_sketch_template(),
-            "feature": self.get_feature_template()
+            "part": self.get_part_template,
+            "assembly": self.get_assembly_template,
+            "drawing": self.get_drawing_template,
+            "sketch": self.get_sketch_template,
+            "feature": self.get_feature_template
         }
         
-        request_lower = user_request.lower()
-        
-        # Simple keyword matching
-        if any(word in request_lower for word in ["part", "solid", "extrude", "pad"]):
-            return templates["part"]
-        elif any(word in request_lower for word in ["assembly", "constraint", "product"]):
-            return templates["assembly"]
-        elif any(word in request_lower for word in ["drawing", "view", "dimension"]):
-            return templates["drawing"]
-        elif any(word in request_lower for word in ["sketch", "line", "circle", "profile"]):
-            return templates["sketch"]
-        else:
-            return templates["feature"]
+        with metrics.span("fallback_template") as span:
+            template_key = self.fallback_index.best(user_request, default="feature")
+            if span.active:
+                span.set(template=template_key)
+            return templates[template_key]()
     
     def get_part_template(self):
         return '''Sub CreatePart()
@@ -304,46 +400,112 @@ End Sub'''
     
     def clean_generated_code(self, generated_text, original_request):
         """Clean and format the generated code"""
-        # Extract VBA code from the response
-        lines = generated_text.split('\n')
-        code_lines = []
-        in_code_block = False
-        
-        for line in lines:
-            if 'Sub ' in line or 'Function ' in line:
-                in_code_block = True
-            if in_code_block:
-                code_lines.append(line)
-            if 'End Sub' in line or 'End Function' in line:
-                break
-                
-        if code_lines:
-            return '\n'.join(code_lines)
-        else:
-            # If no proper VBA structure found, return a template
-            return self.generate_fallback_code(original_request)
+        code = self.extract_vba_code(generated_text)
+        if code:
+            return code
+        # If no proper VBA structure found, assemble it locally
+        return self.generate_local_code(original_request)
+    
+    def extract_vba_code(self, generated_text):
+        """Extract the VBA procedures from a model response, or None if there are none"""
+        return extract_code(generated_text, "VBA")
     
     def generate_code(self):
-        """Generate VBA code based on user input"""
+        """Generate VBA code based on user input
+        
+        Requests made only of operations in the snippet library are assembled offline
+        and need no AI call. Otherwise the local code (the partial assembly, or the
+        matching template) is shown immediately while the AI request runs in the
+        background, and a usable AI answer then replaces it in place.
+        """
         user_request = self.input_text.get("1.0", tk.END).strip()
         if not user_request:
             messagebox.showwarning("Warning", "Please enter a description of what you want to create.")
             return
-            
-        # Start code generation in a separate thread
-        thread = threading.Thread(target=self.generate_code_thread, args=(user_request,))
-        thread.daemon = True
-        thread.start()
+        
+        self.discard_pending_ai_result()
+        assembly = self.assemble_offline(user_request)
+        if assembly is not None and assembly.complete:
+            if self.executor.cancel():
+                self.generation_complete()
+            self.update_output(assembly.code)
+            self.result_label.config(text="Assembled offline from the snippet library")
+            self.record_history(user_request, assembly.code, "offline")
+            self.local_result = None
+            return
+        if assembly is not None:
+            self.local_result = (user_request, assembly.code, "offline")
+        else:
+            self.local_result = (user_request, self.generate_fallback_code(user_request), "template")
+        self.update_output(self.local_result[1])
+        self.result_label.config(text="Showing local code - waiting for AI result...")
+        self.requested_at = time.perf_counter()
+        self.progress.start()
+        
+        # A newer request replaces one still in flight; its result is dropped
+        self.executor.submit(
+            lambda job: self.generate_with_ai(user_request),
+            on_done=self.ai_result_ready,
+            on_error=self.ai_result_failed,
+            timeout=self.AI_TIMEOUT_S
+        )
+    
+    def ai_result_ready(self, code):
+        """Upgrade the local code to the AI result unless the user has edited it"""
+        self.generation_complete()
+        if not code:
+            outcome = "unavailable"
+            self.result_label.config(text="AI unavailable - showing local code")
+            self.record_local_result()
+        elif self.output_text.get("1.0", "end-1c") == self.shown_code:
+            self.local_result = None
+            outcome = "upgraded"
+            self.update_output(code)
+            self.result_label.config(text="Upgraded to AI-generated code")
+        else:
+            self.local_result = None
+            outcome = "pending"
+            self.pending_ai_code = code
+            self.apply_ai_btn.grid()
+            self.result_label.config(text="AI result ready - kept your edits (use Apply AI Result to replace them)")
+        metrics.record("ui_ai_result", time.perf_counter() - self.requested_at, outcome=outcome)
+    
+    def ai_result_failed(self, error):
+        self.generation_complete()
+        metrics.record("ui_ai_result", time.perf_counter() - self.requested_at,
+                       outcome="timeout" if isinstance(error, TimeoutError) else "error")
+        self.record_local_result()
+        if isinstance(error, TimeoutError):
+            self.result_label.config(text="AI request timed out - showing local code")
+        else:
+            self.result_label.config(text=f"Error generating code: {str(error)}")
+    
+    def record_local_result(self):
+        """Record the local code shown for a request that the AI did not answer"""
+        if self.local_result:
+            self.record_history(*self.local_result)
+        self.local_result = None
+    
+    def apply_ai_result(self):
+        """Replace the (edited) output with the pending AI result"""
+        if self.pending_ai_code:
+            self.update_output(self.pending_ai_code)
+            self.result_label.config(text="Applied AI-generated code")
+        self.discard_pending_ai_result()
+    
+    def discard_pending_ai_result(self):
+        self.pending_ai_code = None
+        self.apply_ai_btn.grid_remove()
     
     def update_output(self, code):
         """Update the output text widget with generated code"""
         self.output_text.delete("1.0", tk.END)
         self.output_text.insert("1.0", code)
+        self.shown_code = self.output_text.get("1.0", "end-1c")
     
     def generation_complete(self):
         """Called when code generation is complete"""
         self.progress.stop()
-        self.generate_btn.config(state='normal')
     
     def insert_code_to_catia(self):
         """Insert the generated code into CATIA VBA"""
@@ -364,6 +526,52 @@ End Sub'''
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open VBA editor: {str(e)}")
     
+    @cached_property
+    def macro_runner(self):
+        from macro_runner import MacroRunner
+        return MacroRunner(self.catia_session)
+    
+    def run_in_catia(self):
+        """Execute the generated code directly in the connected CATIA session"""
+        if not self.catia_app:
+            messagebox.showerror("Error", "Please connect to CATIA first.")
+            return
+        
+        code = self.output_text.get("1.0", tk.END).strip()
+        if not code:
+            messagebox.showwarning("Warning", "No code to run.")
+            return
+        
+        self.run_btn.config(state='disabled')
+        self.result_label.config(text="Running macro in CATIA...")
+        self.macro_jobs.submit(
+            lambda job: self.macro_runner.run(code),
+            on_done=self.macro_finished,
+            on_error=self.macro_failed,
+            timeout=self.MACRO_TIMEOUT_S,
+            on_cancel=self.macro_cancelled
+        )
+    
+    def macro_finished(self, result):
+        self.run_btn.config(state='normal')
+        if result.ok:
+            self.result_label.config(text=f"Ran {result.entry_point} in CATIA ({result.duration:.2f}s)")
+        else:
+            self.result_label.config(text=f"Macro failed after {result.duration:.2f}s")
+            messagebox.showerror("Macro Error", f"{result.entry_point or 'Macro'} failed: {result.error}")
+    
+    def macro_failed(self, error):
+        self.run_btn.config(state='normal')
+        if isinstance(error, TimeoutError):
+            self.result_label.config(text=f"Macro still running after {self.MACRO_TIMEOUT_S}s - stopped waiting")
+            return
+        self.result_label.config(text="Macro could not be run")
+        messagebox.showerror("Error", f"Failed to run macro: {str(error)}")
+    
+    def macro_cancelled(self):
+        self.run_btn.config(state='normal')
+        self.result_label.config(text="Macro run cancelled")
+    
     def copy_to_clipboard(self):
         """Copy generated code to clipboard"""
         code = self.output_text.get("1.0", tk.END).strip()
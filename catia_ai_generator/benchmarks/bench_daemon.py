@@ -0,0 +1,60 @@
+"""
+Benchmark - Generation Daemon
+Per-request cost through a running daemon (a separate process) against in-process generation
+
+    python benchmarks/bench_daemon.py                  # compare with baselines.json
+    python benchmarks/bench_daemon.py --save-baseline  # record new baselines
+"""
+
+import atexit
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.append(SRC)
+
+# The daemon and this process share a throwaway cache directory; nothing is recorded
+os.environ["CATIA_AI_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_daemon_")
+os.environ["CATIA_AI_HISTORY"] = "off"
+os.environ["CATIA_AI_BACKENDS"] = ""
+
+from generation_daemon import DaemonGenerator, find_daemon
+from harness import run
+from main import AICodeGenerator, CodeRequest
+
+OFFLINE = CodeRequest("Create a part called Bracket, draw a 120 x 40 mm rectangle on the XY plane, "
+                      "pad it 15 mm and fillet the edges 3 mm")
+TEMPLATE = CodeRequest("Create a sketch with a 50x30 rectangle", "Python")
+
+def start_daemon():
+    process = subprocess.Popen([sys.executable, os.path.join(SRC, "main.py"), "serve"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    atexit.register(process.terminate)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        client = find_daemon()
+        if client is not None:
+            return client
+        time.sleep(0.05)
+    sys.exit("Generation daemon did not start")
+
+def build_cases():
+    client = start_daemon()
+    remote = DaemonGenerator()
+    local = AICodeGenerator()
+    local.warm_up()
+
+    return {
+        "status[round_trip]": client.status,
+        "generate_local[offline/in_process]": lambda: local.generate_local_code(OFFLINE),
+        "generate_local[offline/daemon]": lambda: remote.generate_local_code(OFFLINE),
+        "generate_local[template/in_process]": lambda: local.generate_local_code(TEMPLATE),
+        "generate_local[template/daemon]": lambda: remote.generate_local_code(TEMPLATE),
+        "stream[template/daemon]": lambda: "".join(remote.stream_code_with_ai(TEMPLATE)),
+    }
+
+if __name__ == "__main__":
+    sys.exit(run(build_cases(), "Generation daemon round trips"))
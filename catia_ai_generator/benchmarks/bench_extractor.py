@@ -0,0 +1,79 @@
+"""
+Benchmark - Code Extraction
+Extracting VBA and Python from multi-megabyte model responses, both in one piece and
+streamed in small chunks as the GUI receives them
+
+    python benchmarks/bench_extractor.py                  # compare with baselines.json
+    python benchmarks/bench_extractor.py --save-baseline  # record new baselines
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from harness import run
+from code_extractor import CodeExtractor, extract_code
+
+MB = 1024 * 1024
+
+PROSE = ("The model explains what the next procedure does. It mentions that a Sub or Function "
+         "will be used, and that \"End Sub\" closes it.\n")
+VBA_BLOCK = '''Sub CreateBox{n}()
+    Dim partDoc As PartDocument
+    Set partDoc = CATIA.Documents.Add("Part") ' End Sub inside a comment
+    MsgBox "Function in a string"
+    partDoc.Part.Update
+End Sub
+'''
+PYTHON_BLOCK = '''def create_box_{n}(catia):
+    """Create a box; def inside a docstring
+    class inside it too
+    """
+    part = catia.Documents.Add("Part")  # End Sub
+    part.Part.Update()
+
+'''
+FENCED_BLOCK = "```vba\n" + VBA_BLOCK + "```\n"
+
+def response(size: int, block: str, prose_per_block: int) -> str:
+    """A ~size byte response alternating prose with numbered code blocks"""
+    parts = []
+    total = 0
+    n = 0
+    while total < size:
+        for piece in (PROSE * prose_per_block, block.format(n=n) if "{n}" in block else block):
+            parts.append(piece)
+            total += len(piece)
+        n += 1
+    return "".join(parts)
+
+def streamed(text: str, chunk_size: int):
+    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+    def extract():
+        extractor = CodeExtractor("VBA")
+        for chunk in chunks:
+            extractor.feed(chunk)
+        return extractor.code()
+    return extract
+
+def build_cases():
+    vba_code = response(2 * MB, VBA_BLOCK, 1)
+    mostly_prose = response(4 * MB, VBA_BLOCK, 200)
+    fenced = response(2 * MB, FENCED_BLOCK, 1)
+    python_code = response(2 * MB, PYTHON_BLOCK, 1)
+    one_line = "x" * (2 * MB)  # adversarial: no newline at all
+
+    return {
+        "extract_code[vba,2mb]": lambda: extract_code(vba_code, "VBA"),
+        "extract_code[vba,4mb,mostly_prose]": lambda: extract_code(mostly_prose, "VBA"),
+        "extract_code[fenced,2mb]": lambda: extract_code(fenced, "VBA"),
+        "extract_code[python,2mb]": lambda: extract_code(python_code, "Python"),
+        "extract_code[single_line,2mb]": lambda: extract_code(one_line, "VBA"),
+        "feed[vba,2mb,16b_chunks]": streamed(vba_code, 16),
+        "feed[single_line,2mb,16b_chunks]": streamed(one_line, 16),
+    }
+
+if __name__ == "__main__":
+    sys.exit(run(build_cases(), "Code extraction from large model responses"))
@@ -0,0 +1,55 @@
+"""
+Benchmark - Generation History
+Full-text searches over 300,000 recorded generations
+
+    python benchmarks/bench_history.py                  # compare with baselines.json
+    python benchmarks/bench_history.py --save-baseline  # record new baselines
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from harness import run
+from history import HistoryStore
+from offline_backend import OfflineBackend
+
+ENTRIES = 300_000
+
+SHAPES = ["rectangle", "circle", "square plate", "cylinder", "box", "line"]
+OPERATIONS = ["pad it", "pocket it", "fillet the edges", "chamfer the edges", "add a hole", "save it"]
+
+def build_cases():
+    rng = random.Random(1)
+    backend = OfflineBackend()
+    requests = []
+    for n in range(300):
+        description = (f"Create a part called P{n}, draw a {rng.randint(5, 200)} mm {rng.choice(SHAPES)}, "
+                       f"{rng.choice(OPERATIONS)} {rng.randint(1, 50)} mm")
+        language = rng.choice(["VBA", "Python"])
+        requests.append((description, language, backend.assemble(description, language).code))
+
+    directory = tempfile.mkdtemp(prefix="bench_history_")
+    store = HistoryStore(os.path.join(directory, "history.sqlite3"))
+    print(f"Recording {ENTRIES:,} generations...")
+    for n in range(ENTRIES):
+        description, language, code = requests[n % len(requests)]
+        store.record(f"{description} (revision {n})", code, language, "basic", "offline", None, 0.001)
+
+    return {
+        "search[common_word]": lambda: store.search("fillet"),
+        "search[two_words]": lambda: store.search("cylinder pocket"),
+        "search[prefix]": lambda: store.search("rect"),
+        "search[identifier_in_code]": lambda: store.search("AddNewHoleFromPoint"),
+        "search[rare]": lambda: store.search("revision 123456"),
+        "search[no_match]": lambda: store.search("bracket flange"),
+        "search[language_filter]": lambda: store.search("chamfer", language="Python"),
+        "recent[20]": lambda: store.recent(20),
+        "record": lambda: store.record("Create a 50 mm cube", requests[0][2], "VBA", "basic", "offline"),
+    }
+
+if __name__ == "__main__":
+    sys.exit(run(build_cases(), f"Generation history over {ENTRIES:,} entries"))
@@ -0,0 +1,87 @@
+"""
+Benchmark - Local Generation Hot Paths
+Prompt building, template generation, offline assembly, parameter parsing, custom snippets
+and the assistant's fallback and output cleaning, over realistic and adversarial inputs
+
+    python benchmarks/bench_hot_paths.py                  # compare with baselines.json
+    python benchmarks/bench_hot_paths.py --save-baseline  # record new baselines
+"""
+
+import os
+import sys
+
+# Add the src directory and the repository root (for catia_ai_assistant) to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from harness import run
+from main import AICodeGenerator, CodeRequest
+from param_parser import parse
+from catia_ai_assistant import CatiaAIAssistant
+
+SHORT = "Create a sketch with a rectangle and extrude it to make a box"
+REALISTIC = ("Create a new part called BRACKET_01, draw a 120 x 40 mm rectangle on the XY plane, "
+             "pad it 15 mm, then add four 8 mm holes 10 mm from each corner and fillet the edges")
+LONG = " ".join([REALISTIC] * 60)                      # ~12 KB pasted specification
+WHITESPACE = "extrude   \n\t " * 4000                  # adversarial: mostly whitespace
+NO_KEYWORDS = "lorem ipsum dolor sit amet " * 2000     # adversarial: nothing matches
+
+VBA_BLOCK = """Sub CreateBox()
+    Dim partDoc As PartDocument
+    Set partDoc = CATIA.Documents.Add("Part")
+    partDoc.Part.Update
+End Sub"""
+PROSE = "The model explains what it is going to do before it writes any code. " * 20
+
+def model_output(size: int, code_at: str) -> str:
+    """A ~size byte model response with the VBA block at the start, middle, end or nowhere"""
+    filler = (PROSE * (size // len(PROSE) + 1))[:size]
+    if code_at == "start":
+        return VBA_BLOCK + "\n" + filler
+    if code_at == "middle":
+        half = len(filler) // 2
+        return filler[:half] + "\n" + VBA_BLOCK + "\n" + filler[half:]
+    if code_at == "end":
+        return filler + "\n" + VBA_BLOCK
+    return filler
+
+def build_cases():
+    generator = AICodeGenerator(api_key="")
+    generator.macro_index = None  # Keep prompt timings independent of a local macro index
+    generator.registry.compile_all()
+
+    # The assistant's generation helpers need no window
+    assistant = CatiaAIAssistant.__new__(CatiaAIAssistant)
+
+    cases = {}
+    for label, text in [("short", SHORT), ("realistic", REALISTIC), ("long_12kb", LONG),
+                        ("whitespace_48kb", WHITESPACE), ("no_keywords_54kb", NO_KEYWORDS)]:
+        request = CodeRequest(description=text, language="VBA", complexity="intermediate")
+        cases[f"generate_prompt[{label}]"] = lambda r=request: generator.generate_prompt(r)
+        cases[f"generate_template_code[{label}]"] = lambda r=request: generator.generate_template_code(r)
+        cases[f"local_code[{label}]"] = lambda r=request: generator.local_code(r)
+        cases[f"fallback_code[{label}]"] = lambda t=text: assistant.generate_fallback_code(t)
+
+    python_request = CodeRequest(description=REALISTIC, language="Python", complexity="advanced")
+    cases["generate_template_code[python]"] = lambda: generator.generate_template_code(python_request)
+    cases["local_code[python]"] = lambda: generator.local_code(python_request)
+
+    for label, text in [("short", SHORT), ("realistic", REALISTIC), ("long_12kb", LONG),
+                        ("no_keywords_54kb", NO_KEYWORDS)]:
+        cases[f"parse[{label}]"] = lambda t=text: parse(t)
+
+    for template_type in ("sketch_creation", "part_creation", "extrude_operation"):
+        request = CodeRequest(description=REALISTIC)
+        cases[f"generate_custom_snippet[{template_type}]"] = (
+            lambda r=request, t=template_type: generator.generate_custom_snippet(r, t))
+
+    for code_at in ("start", "middle", "end", "none"):
+        text = model_output(100 * 1024, code_at)
+        cases[f"clean_generated_code[100kb,code_{code_at}]"] = (
+            lambda t=text: assistant.clean_generated_code(t, REALISTIC))
+    small = model_output(2 * 1024, "middle")
+    cases["clean_generated_code[2kb]"] = lambda: assistant.clean_generated_code(small, REALISTIC)
+    return cases
+
+if __name__ == "__main__":
+    sys.exit(run(build_cases(), "Local generation hot paths"))
@@ -0,0 +1,64 @@
+"""
+Benchmark - Intent Matching
+Compares the inverted intent index against a linear keyword scan as the template library grows
+"""
+
+import os
+import random
+import sys
+import time
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from intent_index import IntentIndex
+from templates import TEMPLATE_KEYWORDS, TEMPLATE_SYNONYMS
+
+QUERIES = 2000
+DESCRIPTIONS = [
+    "Create a sketch with a rectangle of 50x30 mm",
+    "Create an extrude operation with 20mm height",
+    "Create an assembly and insert two parts with coincidence constraints",
+    "Batch process all parts in a directory and extract their mass properties",
+    "Create a parametric bracket driven by a design table",
+]
+
+def synthetic_library(size: int, rng: random.Random):
+    """Real templates plus synthetic ones with five keywords from a large vocabulary"""
+    vocabulary = [f"term{i}" for i in range(size * 3)]
+    library = dict(TEMPLATE_KEYWORDS)
+    for i in range(size - len(library)):
+        library[f"template_{i}"] = {word: rng.uniform(0.5, 3.0) for word in rng.sample(vocabulary, 5)}
+    return library
+
+def linear_scan(library, description: str):
+    """Rank by substring checks against every template, as a ranked if-chain would"""
+    description = description.lower()
+    scores = {}
+    for template, keywords in library.items():
+        score = sum(weight for keyword, weight in keywords.items() if keyword in description)
+        if score:
+            scores[template] = score
+    return sorted(scores.items(), key=lambda item: -item[1])[:5]
+
+def measure(func, queries):
+    start = time.perf_counter()
+    for query in queries:
+        func(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+def run_benchmark():
+    """Measure per-query latency at increasing library sizes"""
+    rng = random.Random(42)
+    print("📊 Intent matching latency (µs per query)\n")
+    print(f"{'templates':>10} {'linear scan':>12} {'intent index':>14}")
+    for size in (10, 100, 1000, 10000):
+        library = synthetic_library(size, rng)
+        index = IntentIndex.from_keywords(library, TEMPLATE_SYNONYMS)
+        queries = [rng.choice(DESCRIPTIONS) + f" term{rng.randrange(size * 3)}" for _ in range(QUERIES)]
+        chain = measure(lambda q: linear_scan(library, q), queries)
+        indexed = measure(lambda q: index.rank(q, limit=5), queries)
+        print(f"{size:>10} {chain:>12.1f} {indexed:>14.1f}")
+
+if __name__ == "__main__":
+    run_benchmark()
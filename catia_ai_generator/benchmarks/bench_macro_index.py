@@ -0,0 +1,87 @@
+"""
+Benchmark - Macro Retrieval Index
+Builds, incrementally updates and queries a BM25 index over a synthetic macro corpus
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from macro_index import MacroIndex, build_index
+
+FILES = int(os.getenv("BENCH_MACRO_FILES", "50000"))
+QUERIES = 500
+
+OPERATIONS = ["Pad", "Pocket", "Hole", "Fillet", "Chamfer", "Shaft", "Groove", "Sketch",
+              "Rectangle", "Circle", "Line", "Constraint", "Product", "Drawing", "Parameter"]
+OBJECTS = ["Bracket", "Flange", "Housing", "Shaft", "Plate", "Rib", "Boss", "Cover", "Gear"]
+
+def write_macro(path: str, rng: random.Random):
+    """Write a plausible VBA macro built from a few random operations"""
+    operation = rng.sample(OPERATIONS, 3)
+    name = rng.choice(OBJECTS) + str(rng.randrange(1000))
+    lines = [f"Sub Create{name}()",
+             "    Dim partDocument As Document",
+             "    Set partDocument = CATIA.ActiveDocument",
+             "    Dim shapeFactory As ShapeFactory",
+             "    Set shapeFactory = partDocument.Part.ShapeFactory"]
+    for op in operation:
+        lines.append(f"    Dim my{op} As {op}")
+        lines.append(f"    Set my{op} = shapeFactory.Add New{op}({rng.randrange(5, 200)})")
+        lines.append(f"    ' {op.lower()} the {name.lower()} {rng.choice(OBJECTS).lower()}")
+    lines.append("    partDocument.Part.Update")
+    lines.append("End Sub")
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+
+def run_benchmark():
+    """Measure full build, incremental update and query latency"""
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus = os.path.join(workdir, "macros")
+        index_dir = os.path.join(workdir, "index")
+        for i in range(FILES):
+            subdir = os.path.join(corpus, f"{i // 1000:03d}")
+            os.makedirs(subdir, exist_ok=True)
+            write_macro(os.path.join(subdir, f"macro_{i}.bas"), rng)
+
+        print(f"📊 Macro index benchmark ({FILES:,} files)\n")
+
+        start = time.perf_counter()
+        stats = build_index(corpus, index_dir)
+        print(f"full build:          {time.perf_counter() - start:8.2f} s  ({stats['added']:,} added)")
+
+        # Touch 1% of the corpus and update incrementally
+        for i in rng.sample(range(FILES), FILES // 100):
+            write_macro(os.path.join(corpus, f"{i // 1000:03d}", f"macro_{i}.bas"), rng)
+            os.utime(os.path.join(corpus, f"{i // 1000:03d}", f"macro_{i}.bas"), (0, time.time() + 10))
+        start = time.perf_counter()
+        stats = build_index(corpus, index_dir)
+        print(f"incremental update:  {time.perf_counter() - start:8.2f} s  ({stats['updated']:,} updated)")
+
+        start = time.perf_counter()
+        index = MacroIndex(index_dir)
+        print(f"open index:          {(time.perf_counter() - start) * 1000:8.1f} ms")
+        size = sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(index_dir) for name in names)
+        print(f"index size:          {size / 1024 / 1024:8.1f} MB")
+
+        latencies = []
+        for _ in range(QUERIES):
+            query = f"{rng.choice(OPERATIONS)} a {rng.choice(OBJECTS)} with a {rng.choice(OPERATIONS)}"
+            start = time.perf_counter()
+            index.search(query, k=5)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        print(f"query p50:           {statistics.median(latencies):8.2f} ms")
+        print(f"query p99:           {latencies[int(len(latencies) * 0.99) - 1]:8.2f} ms")
+        index.close()
+
+if __name__ == "__main__":
+    run_benchmark()
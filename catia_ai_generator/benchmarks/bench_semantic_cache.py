@@ -0,0 +1,58 @@
+"""
+Benchmark - Semantic Cache
+Near-duplicate lookups for reworded requests against an index of a million past requests
+
+    python benchmarks/bench_semantic_cache.py                  # compare with baselines.json
+    python benchmarks/bench_semantic_cache.py --save-baseline  # record new baselines
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from harness import run
+from response_cache import ResponseCache
+from semantic_cache import SemanticCache, Signature, signature
+
+ENTRIES = 1_000_000
+
+ORIGINAL = "Create a 50x30 rectangle sketch on the XY plane and pad it 10 mm"
+REWORDED = "Sketch a rectangle 50 by 30 mm on the XY plane, pad it 10 mm"
+RESIZED = "Sketch a rectangle 60 by 30 mm on the XY plane, pad it 10 mm"
+UNRELATED = "Build an assembly with three bolts and a washer"
+CODE = """Sub CATMain()
+    factory2D.CreateLine 0, 0, 50, 0
+    factory2D.CreateLine 50, 0, 50, 30
+    Set pad = shapeFactory.AddNewPad(sketch, 10)
+End Sub"""
+
+def build_cases():
+    directory = tempfile.mkdtemp(prefix="bench_semantic_")
+    cache = ResponseCache(os.path.join(directory, "responses.sqlite3"))
+    similar = SemanticCache(cache)
+    len(similar)  # Open the table before filling the index directly
+
+    # A million past requests with random signatures, spread over languages and complexities
+    rng = random.Random(1)
+    scopes = [(language, complexity) for language in ("VBA", "Python")
+              for complexity in ("basic", "intermediate", "advanced")]
+    for n in range(ENTRIES):
+        similar.index.add(f"past-{n}", Signature(rng.getrandbits(64), (("?0", float(n % 500)),),
+                                                       scopes[n % 6]))
+    cache.put("original", CODE)
+    similar.put(ORIGINAL, "VBA", "basic", "original")
+    query = signature(REWORDED)
+
+    return {
+        "signature[realistic]": lambda: signature(REWORDED),
+        "candidates[1m,reworded]": lambda: similar.index.candidates(query),
+        "get[1m,reworded]": lambda: similar.get(REWORDED),
+        "get[1m,resized]": lambda: similar.get(RESIZED),
+        "get[1m,unrelated]": lambda: similar.get(UNRELATED),
+    }
+
+if __name__ == "__main__":
+    sys.exit(run(build_cases(), f"Semantic cache lookups over {ENTRIES:,} entries"))
@@ -0,0 +1,66 @@
+"""
+Benchmark - Template Rendering
+Compares per-call jinja2.Template compilation against the compiled TemplateRegistry
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jinja2 import Template
+from main import AICodeGenerator, CatiaCodeTemplates, CodeRequest
+from template_registry import TemplateRegistry
+
+ITERATIONS = 5000
+
+def measure(label, func, iterations=ITERATIONS, unit="renders"):
+    """Run func repeatedly and print the rate per second"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    rate = iterations / elapsed
+    print(f"{label:<40} {rate:>12,.0f} {unit}/sec")
+    return rate
+
+def run_benchmark():
+    """Benchmark template rendering before and after the registry"""
+    print("📊 Template rendering benchmark\n")
+    
+    source = CatiaCodeTemplates.VBA_TEMPLATES["sketch_creation"]
+    custom_code = "' Custom sketch geometry"
+    template_sets = {
+        "VBA": CatiaCodeTemplates.VBA_TEMPLATES,
+        "Python": CatiaCodeTemplates.PYTHON_TEMPLATES
+    }
+    
+    before = measure("jinja2.Template per call (before)",
+                     lambda: Template(source).render(custom_code=custom_code))
+    
+    registry = TemplateRegistry(template_sets, use_bytecode_cache=False)
+    after = measure("TemplateRegistry.render (after)",
+                    lambda: registry.render("VBA/sketch_creation", custom_code=custom_code))
+    
+    generator = AICodeGenerator(api_key="")
+    request = CodeRequest(description="Create a sketch with a rectangle", language="VBA")
+    measure("AICodeGenerator.generate_template_code",
+            lambda: generator.generate_template_code(request))
+    
+    # Cold start: a fresh registry compiles from source vs. loads from bytecode cache
+    with tempfile.TemporaryDirectory() as cache_dir:
+        TemplateRegistry(template_sets, cache_dir=cache_dir).compile_all()
+        measure("cold compile_all (no bytecode cache)",
+                lambda: TemplateRegistry(template_sets, use_bytecode_cache=False).compile_all(),
+                iterations=200, unit="registries")
+        measure("cold compile_all (bytecode cache)",
+                lambda: TemplateRegistry(template_sets, cache_dir=cache_dir).compile_all(),
+                iterations=200, unit="registries")
+    
+    print(f"\n✅ Speedup: {after / before:.1f}x")
+
+if __name__ == "__main__":
+    run_benchmark()
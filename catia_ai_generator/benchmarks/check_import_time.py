@@ -0,0 +1,73 @@
+"""
+Import-Time Regression Check
+Fails when importing the CLI core or the GUIs gets slow or pulls in heavy dependencies
+
+Usage: python benchmarks/check_import_time.py [--runs N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.normpath(os.path.join(HERE, '..', 'src'))
+ROOT_DIR = os.path.normpath(os.path.join(HERE, '..', '..'))
+
+# module -> (directory to import from, cumulative import budget in ms)
+BUDGETS = {
+    "main": (SRC_DIR, 60),
+    "gui": (SRC_DIR, 150),
+    "catia_ai_assistant": (ROOT_DIR, 150),
+}
+
+# Heavy dependencies that must only be imported on first use
+DEFERRED = {"openai", "jinja2", "click", "dotenv", "requests", "win32com", "asyncio"}
+
+def import_profile(module: str, directory: str):
+    """Return (cumulative import time in ms, set of imported top-level packages)"""
+    code = f"import sys; sys.path.insert(0, {directory!r}); import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=directory)
+    if result.returncode != 0:
+        raise ImportError(result.stderr.strip().splitlines()[-1])
+
+    total_us = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        imported.add(name.strip().split(".")[0])
+        if name.strip() == module and not name.startswith("  ", 1):
+            total_us = int(cumulative)
+    return (total_us or 0) / 1000, imported
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="Take the fastest of N runs")
+    args = parser.parse_args()
+
+    failures = 0
+    print("⏱️  Import-time check\n")
+    for module, (directory, budget_ms) in BUDGETS.items():
+        try:
+            runs = [import_profile(module, directory) for _ in range(args.runs)]
+        except ImportError as e:
+            print(f"⏭️  {module:<20} skipped ({e})")
+            continue
+        elapsed_ms = min(run[0] for run in runs)
+        heavy = sorted(DEFERRED & runs[0][1])
+        ok = elapsed_ms <= budget_ms and not heavy
+        failures += not ok
+        status = "✅" if ok else "❌"
+        print(f"{status} {module:<20} {elapsed_ms:7.1f} ms (budget {budget_ms} ms)")
+        if heavy:
+            print(f"   imported eagerly: {', '.join(heavy)}")
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Benchmark harness
+Times a set of benchmark cases, reports ops/sec with p50/p99 latency, and compares
+the results against stored JSON baselines
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+@dataclass
+class BenchResult:
+    name: str
+    iterations: int
+    ops_per_sec: float
+    p50_us: float
+    p99_us: float
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def bench(name: str, func: Callable[[], object], min_time: float = 0.5,
+          min_iterations: int = 20, warmup: int = 3) -> BenchResult:
+    """Call func until min_time has passed, timing every call individually"""
+    for _ in range(warmup):
+        func()
+    timings: List[int] = []
+    clock = time.perf_counter_ns
+    deadline = clock() + int(min_time * 1e9)
+    while len(timings) < min_iterations or clock() < deadline:
+        start = clock()
+        func()
+        timings.append(clock() - start)
+
+    total = sum(timings)
+    timings.sort()
+    return BenchResult(
+        name=name,
+        iterations=len(timings),
+        ops_per_sec=len(timings) / (total / 1e9) if total else float("inf"),
+        p50_us=percentile(timings, 0.50) / 1000,
+        p99_us=percentile(timings, 0.99) / 1000
+    )
+
+def load_baselines(path: str) -> Dict[str, dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("results", {})
+    except (OSError, ValueError):
+        return {}
+
+def save_baselines(path: str, results: List[BenchResult]):
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {result.name: {key: round(value, 2) if isinstance(value, float) else value
+                                  for key, value in asdict(result).items()}
+                    for result in results}
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def compare(result: BenchResult, baseline: Optional[dict], threshold: float) -> Tuple[str, bool]:
+    """Return a change description and whether the result regressed past the threshold"""
+    if not baseline:
+        return "(no baseline)", False
+    change = result.ops_per_sec / baseline["ops_per_sec"] - 1
+    return f"{change:+7.1%}", change < -threshold
+
+def run(cases: Dict[str, Callable[[], object]], description: str, argv: Optional[List[str]] = None) -> int:
+    """Command line entry point shared by the benchmark scripts; returns the exit code"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--baselines", default=DEFAULT_BASELINES, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baselines")
+    parser.add_argument("--threshold", type=float, default=0.3,
+                        help="Allowed ops/sec drop versus the baseline before failing (default: 0.3 = 30%%)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to run each case")
+    parser.add_argument("--filter", "-k", help="Only run cases whose name contains this text")
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines(args.baselines)
+    results = []
+    regressions = []
+    print(f"📊 {description}\n")
+    print(f"{'case':<44} {'ops/sec':>12} {'p50 µs':>10} {'p99 µs':>10}  vs baseline")
+    for name, func in cases.items():
+        if args.filter and args.filter not in name:
+            continue
+        result = bench(name, func, min_time=args.min_time)
+        results.append(result)
+        change, regressed = compare(result, baselines.get(name), args.threshold)
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<44} {result.ops_per_sec:>12,.0f} {result.p50_us:>10.1f} {result.p99_us:>10.1f}  "
+              f"{change}{'  ❌' if regressed else ''}")
+
+    if args.save_baseline:
+        merged = {name: BenchResult(**data) for name, data in baselines.items()}
+        merged.update({result.name: result for result in results})
+        save_baselines(args.baselines, list(merged.values()))
+        print(f"\n💾 Baselines saved to {args.baselines}")
+        return 0
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit("Run one of the bench_*.py scripts that use this harness")
@@ -0,0 +1,62 @@
+"""
+Example: routing requests across AI backends
+
+Uses local stub backends with different latency distributions, so it runs offline.
+Shows the router settling on the fastest backend, failing over when it breaks, and
+hedged requests cutting off the latency tail.
+"""
+
+import os
+import sys
+import time
+
+# Add the src directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from backends import StubBackend
+from router import Router
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run(router: Router, requests: int):
+    latencies = []
+    winners = {}
+    hedged = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = router.complete("Create a pad", 200)
+        latencies.append(time.perf_counter() - start)
+        winners[response.backend] = winners.get(response.backend, 0) + 1
+        hedged += response.hedged
+    return latencies, winners, hedged
+
+def report(title: str, router: Router, latencies, winners, hedged):
+    print(f"\n{title}")
+    print(f"   p50 {percentile(latencies, 0.5) * 1000:6.1f} ms   p99 {percentile(latencies, 0.99) * 1000:6.1f} ms"
+          f"   hedged: {hedged}   answered by: {winners}")
+    for name, stats in router.stats.items():
+        latency = f"{stats.latency * 1000:.1f} ms" if stats.latency is not None else "-"
+        print(f"   {name:<8} EWMA latency {latency:>9}   error rate {stats.error_rate:5.1%}   calls {stats.calls}")
+
+def main():
+    # "slow" is slow but steady; "fast" is usually quicker but stalls 3% of the time
+    def backends():
+        return [StubBackend("slow", median=0.04, sigma=0.1, seed=1),
+                StubBackend("fast", median=0.01, sigma=0.2, stall_rate=0.03, stall=0.3, seed=2)]
+
+    print("🔀 Routing 200 requests between two stub backends")
+    router = Router(backends(), hedge=False)
+    report("Without hedging:", router, *run(router, 200))
+
+    router = Router(backends(), hedge=True)
+    report("With hedging after the p95 latency:", router, *run(router, 200))
+
+    # The fast backend starts failing: the router fails over and then routes around it
+    router.backends[1].error_rate = 1.0
+    report("Fast backend failing:", router, *run(router, 50))
+    router.close()
+
+if __name__ == "__main__":
+    main()
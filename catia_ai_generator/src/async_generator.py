@@ -0,0 +1,173 @@
+"""
+CATIA V5 AI Code Generator - Async Generation
+Generates code for many requests concurrently over the configured AI backends
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, List, Optional
+
+from main import AICodeGenerator, CodeRequest
+from prompt_builder import Prompt
+from router import RoutedResponse
+from single_flight import AsyncSingleFlight
+
+@dataclass
+class GenerationResult:
+    """Outcome of one request in an async run"""
+    index: int
+    request: CodeRequest
+    code: str
+    source: str  # "ai", "cache", "similar", "offline" or "template"
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    backend: Optional[str] = None  # AI backend that answered
+
+def _in_thread(func, *args) -> "asyncio.Future":
+    """Run a blocking call on a new daemon thread and return a future for its result
+
+    Unlike ``run_in_executor`` on a bounded pool, a call whose caller stopped waiting
+    holds no slot that later calls need.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(result, error):
+        if future.done():
+            return  # The caller timed out or was cancelled
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def run():
+        try:
+            result, error = func(*args), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(settle, result, error)
+        except RuntimeError:
+            pass  # The event loop has already closed
+
+    threading.Thread(target=run, name="async-ai", daemon=True).start()
+    return future
+
+class AsyncCodeGenerator:
+    """Asynchronous AI code generator with a bounded number of in-flight requests
+
+    Requests are pulled lazily from the input iterable, at most ``concurrency`` at a
+    time, and results are yielded in completion order. Completions go through the
+    generator's router, so failover and hedging across the configured backends apply,
+    each on its own thread; cache, history and prompt work runs in threads too, so the
+    event loop only schedules. Each request has its own timeout and falls back to
+    offline or template generation when the AI call fails. A call that timed out is
+    abandoned rather than stopped: its thread ends when the backend gives up, and later
+    requests never wait for it.
+    """
+
+    def __init__(self, generator: Optional[AICodeGenerator] = None, concurrency: int = 8,
+                 timeout: float = 60.0):
+        self.generator = generator or AICodeGenerator()
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.flights = AsyncSingleFlight()
+
+    async def generate(self, request: CodeRequest, index: int = 0) -> GenerationResult:
+        """Generate code for a single request"""
+        start = time.perf_counter()
+        generator = self.generator
+
+        async def result(code: str, source: str, error: Optional[str] = None,
+                         backend: Optional[str] = None) -> GenerationResult:
+            elapsed = time.perf_counter() - start
+            await asyncio.to_thread(generator.record_history, request, code, source, backend, elapsed)
+            return GenerationResult(index, request, code, source, error, elapsed, backend)
+
+        async def local(error: Optional[str] = None) -> GenerationResult:
+            assembly = await asyncio.to_thread(generator.assemble, request)
+            source = "offline" if assembly is not None else "template"
+            code = await asyncio.to_thread(generator.local_code, request, assembly)
+            return await result(code, source, error)
+
+        if not generator.ai_available:
+            return await local()
+
+        try:
+            prompt = await asyncio.to_thread(generator.build_prompt, request)
+            key = generator.cache_key(request, prompt)
+            if generator.cache:
+                cached = await asyncio.to_thread(generator.cache.get, key)
+                if cached is not None:
+                    return await result(cached, "cache")
+                similar = await asyncio.to_thread(generator.similar_code, request)
+                if similar is not None:
+                    return await result(similar, "similar")
+
+            routed = await self.flights.do(key, lambda: self._complete(prompt, key))
+            await asyncio.to_thread(generator.remember, request, key)
+            return await result(routed.text, "ai", backend=routed.backend)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            print(f"AI generation failed: {error}")
+            return await local(error)
+
+    async def _complete(self, prompt: Prompt, key: str) -> RoutedResponse:
+        """Run one routed completion with the per-request timeout and cache the result"""
+        routed = await asyncio.wait_for(
+            _in_thread(self.generator.router.complete, prompt.text, prompt.max_tokens),
+            timeout=self.timeout
+        )
+        if self.generator.cache:
+            await asyncio.to_thread(self.generator.cache.put, key, routed.text)
+        return routed
+
+    async def generate_many(self, requests: Iterable[CodeRequest]) -> AsyncIterator[GenerationResult]:
+        """Yield a result for every request as soon as it finishes"""
+        iterator = enumerate(requests)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        closing = False
+
+        async def worker():
+            try:
+                for index, request in iterator:
+                    await results.put(await self.generate(request, index))
+            finally:
+                if not closing:
+                    await results.put(None)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            remaining = len(workers)
+            while remaining:
+                item = await results.get()
+                if item is None:
+                    remaining -= 1
+                else:
+                    yield item
+            await asyncio.gather(*workers)
+        finally:
+            closing = True
+            for task in workers:
+                task.cancel()
+
+    async def generate_all(self, requests: Iterable[CodeRequest]) -> List[GenerationResult]:
+        """Generate code for every request and return the results in input order"""
+        results = [result async for result in self.generate_many(requests)]
+        return sorted(results, key=lambda result: result.index)
+
+    def close(self):
+        """Nothing to release: abandoned calls finish on their own daemon threads"""
+
+def generate_all(requests: Iterable[CodeRequest], concurrency: int = 8, timeout: float = 60.0) -> List[GenerationResult]:
+    """Synchronous helper that runs an async generation over the given requests"""
+    generator = AsyncCodeGenerator(concurrency=concurrency, timeout=timeout)
+    try:
+        return asyncio.run(generator.generate_all(requests))
+    finally:
+        generator.close()
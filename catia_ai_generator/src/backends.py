@@ -0,0 +1,155 @@
+"""
+CATIA V5 AI Code Generator - Model Backends
+Interchangeable services that turn a prompt into generated text, for use behind the router
+"""
+
+import os
+import random
+import time
+from functools import cached_property
+from typing import Callable, List, Optional
+
+import metrics
+from macro_index import estimate_tokens
+
+class BackendError(Exception):
+    """Raised when a backend did not return a usable completion"""
+
+class Backend:
+    """A model service; ``complete`` either returns generated text or raises"""
+
+    name = "backend"
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class OpenAIBackend(Backend):
+    """Chat completions from the OpenAI API"""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-3.5-turbo",
+                 temperature: float = 0.3,
+                 system_message: str = "You are an expert CATIA V5 automation developer.",
+                 client=None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.model = model
+        self.temperature = temperature
+        self.system_message = system_message
+        if client is not None:
+            self.client = client
+
+    @cached_property
+    def client(self):
+        """OpenAI client, created on first use"""
+        from openai import OpenAI
+        return OpenAI(api_key=self.api_key)
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        with metrics.span("network", backend=self.name, model=self.model) as span:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self.system_message},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=self.temperature
+            )
+            usage = getattr(response, "usage", None)
+            if usage:
+                span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+        text = (response.choices[0].message.content or "").strip()
+        if not text:
+            raise BackendError("OpenAI returned an empty completion")
+        return text
+
+class HuggingFaceBackend(Backend):
+    """Text generation from the HuggingFace inference API"""
+
+    name = "huggingface"
+
+    def __init__(self, transport=None, temperature: float = 0.7):
+        self.temperature = temperature
+        if transport is not None:
+            self.transport = transport
+
+    @cached_property
+    def transport(self):
+        """HTTP transport for the inference API (imports requests on first use)"""
+        from hf_transport import HuggingFaceTransport
+        return HuggingFaceTransport()
+
+    @property
+    def parameters(self) -> dict:
+        return {"temperature": self.temperature, "do_sample": True}
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        payload = {"inputs": prompt, "parameters": {"max_length": max_tokens, **self.parameters}}
+        with metrics.span("network", backend=self.name) as span:
+            result = self.transport.post(payload)
+            text = ""
+            if isinstance(result, list) and result:
+                text = result[0].get("generated_text", "")
+            if span.active:
+                span.set(prompt_tokens=estimate_tokens(prompt), completion_tokens=estimate_tokens(text))
+        if not text:
+            raise BackendError("HuggingFace returned an empty response")
+        return text
+
+    def close(self):
+        if "transport" in self.__dict__:
+            self.transport.close()
+
+class StubBackend(Backend):
+    """Local backend with a configurable latency distribution and failure rate
+
+    Latencies are log-normal around ``median`` seconds; with probability ``stall_rate``
+    a call stalls for ``stall`` seconds instead, which is the tail that hedged requests
+    are meant to cut off. Useful for exercising the router without network access.
+    """
+
+    def __init__(self, name: str, median: float = 0.05, sigma: float = 0.3,
+                 error_rate: float = 0.0, stall_rate: float = 0.0, stall: float = 1.0,
+                 response: str = "Sub CATMain()\n    MsgBox \"Hello from {name}\"\nEnd Sub",
+                 seed: Optional[int] = None, sleep: Callable[[float], None] = time.sleep):
+        self.name = name
+        self.median = median
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.response = response
+        self.random = random.Random(seed)
+        self.sleep = sleep
+        self.calls = 0
+
+    def latency(self) -> float:
+        if self.stall_rate and self.random.random() < self.stall_rate:
+            return self.stall
+        return self.median * self.random.lognormvariate(0, self.sigma)
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        self.calls += 1
+        self.sleep(self.latency())
+        if self.error_rate and self.random.random() < self.error_rate:
+            raise BackendError(f"{self.name} failed (simulated)")
+        return self.response.format(name=self.name)
+
+def configured_backend_names(api_key: Optional[str], default: str = "openai") -> List[str]:
+    """Backends named in CATIA_AI_BACKENDS (or ``default``), minus OpenAI without an API key"""
+    names = [name.strip().lower() for name in os.getenv("CATIA_AI_BACKENDS", default).split(",")]
+    return [name for name in names if name in ("openai", "huggingface") and (name != "openai" or api_key)]
+
+def build_backends(names: List[str], api_key: Optional[str] = None, **openai_options) -> List[Backend]:
+    """Create the backends for names from ``configured_backend_names``"""
+    backends: List[Backend] = []
+    for name in names:
+        if name == "openai":
+            backends.append(OpenAIBackend(api_key, **openai_options))
+        elif name == "huggingface":
+            backends.append(HuggingFaceBackend())
+    return backends
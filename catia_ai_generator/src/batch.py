@@ -0,0 +1,211 @@
+"""
+CATIA V5 AI Code Generator - Batch Mode
+Streams descriptions from JSONL/CSV/text input through a process pool of offline generators
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+from main import AICodeGenerator, CodeRequest
+
+FILE_EXTENSIONS = {"VBA": ".bas", "Python": ".py"}
+
+@dataclass
+class BatchStats:
+    """Counters reported at the end of a batch run"""
+    records: int = 0
+    errors: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return max(self.finished - self.started, 1e-9)
+
+    @property
+    def throughput(self) -> float:
+        return self.records / self.elapsed
+
+def detect_format(path: str) -> str:
+    """Guess the input format from the file extension (stdin defaults to JSONL)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension == ".txt":
+        return "text"
+    return "jsonl"
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Dict]:
+    """Lazily yield one record dict per input row"""
+    if fmt == "csv":
+        for row in csv.DictReader(stream):
+            yield row
+    elif fmt == "text":
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield {"description": line}
+    else:
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"error": f"line {line_number}: invalid JSON ({e.msg})"}
+
+def iter_requests(records: Iterable[Dict], language: str, complexity: str) -> Iterator[Tuple[int, Dict]]:
+    """Attach an index and defaults to each record without materializing the input
+
+    A record that is not an object, or whose fields are not text, becomes an error
+    result for that record instead of stopping the batch.
+    """
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            yield index, {"id": None, "description": "", "language": language, "complexity": complexity,
+                          "error": f"expected a JSON object, got {type(record).__name__}"}
+            continue
+        fields = {"description": record.get("description") or "",
+                  "language": record.get("language") or language,
+                  "complexity": record.get("complexity") or complexity}
+        wrong = [name for name, value in fields.items() if not isinstance(value, str)]
+        yield index, {
+            "id": record.get("id"),
+            "description": fields["description"].strip() if not wrong else "",
+            "language": fields["language"] if "language" not in wrong else language,
+            "complexity": fields["complexity"] if "complexity" not in wrong else complexity,
+            "error": record.get("error") or (f"{', '.join(wrong)} must be text" if wrong else None)
+        }
+
+# One generator per worker process, created by the pool initializer
+_worker_generator: Optional[AICodeGenerator] = None
+
+def _init_worker():
+    global _worker_generator
+    _worker_generator = AICodeGenerator(api_key="")
+    _worker_generator.registry.compile_all()
+
+def _generate_chunk(chunk: List[Tuple[int, Dict]]) -> List[Dict]:
+    """Render a chunk of records in a worker process"""
+    results = []
+    for index, record in chunk:
+        result = dict(record, index=index, code=None)
+        if not result["error"]:
+            if not record["description"]:
+                result["error"] = "missing description"
+            else:
+                try:
+                    request = CodeRequest(
+                        description=record["description"],
+                        language=record["language"],
+                        complexity=record["complexity"]
+                    )
+                    result["code"] = _worker_generator.local_code(request)
+                except Exception as e:
+                    result["error"] = str(e)
+        results.append(result)
+    return results
+
+def _chunked(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def run_batch(items: Iterable[Tuple[int, Dict]], workers: Optional[int] = None,
+              ordered: bool = True, chunk_size: int = 64,
+              max_pending: Optional[int] = None) -> Iterator[Dict]:
+    """Generate code for every record, yielding results as they are ready
+
+    At most ``max_pending`` chunks are in flight at any time, so memory stays bounded
+    regardless of the input size. With ``ordered`` the results keep input order.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = deque()
+
+        def drain() -> List[Dict]:
+            if ordered:
+                return pending.popleft().result()
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            results = []
+            for future in done:
+                pending.remove(future)
+                results.extend(future.result())
+            return results
+
+        for chunk in _chunked(items, chunk_size):
+            pending.append(pool.submit(_generate_chunk, chunk))
+            while len(pending) >= max_pending:
+                yield from drain()
+
+        while pending:
+            yield from drain()
+
+def output_filename(result: Dict, taken: Optional[Set[str]] = None) -> str:
+    """Build the per-record output file name
+
+    Names already in ``taken`` (compared case-insensitively, as on Windows) get the
+    record index appended, so records with the same or similar ids never overwrite
+    each other; the chosen name is added to ``taken``.
+    """
+    stem = str(result["id"]) if result.get("id") else f"{result['index']:06d}"
+    stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", stem).strip("._") or f"{result['index']:06d}"
+    language = "VBA" if result["language"].upper() == "VBA" else "Python"
+    extension = FILE_EXTENSIONS[language]
+    name = stem + extension
+    if taken is None:
+        return name
+    attempt = 0
+    while name.lower() in taken:
+        attempt += 1
+        name = f"{stem}-{result['index']:06d}" + (f"-{attempt}" if attempt > 1 else "") + extension
+    taken.add(name.lower())
+    return name
+
+def write_results(results: Iterable[Dict], output: Optional[TextIO] = None,
+                  output_dir: Optional[str] = None) -> BatchStats:
+    """Stream results to a JSONL writer or to one source file per record"""
+    stats = BatchStats(started=time.perf_counter())
+    taken: Set[str] = set()
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    for result in results:
+        stats.records += 1
+        if result["error"]:
+            stats.errors += 1
+
+        if output_dir:
+            if not result["error"]:
+                with open(os.path.join(output_dir, output_filename(result, taken)), 'w') as f:
+                    f.write(result["code"])
+            else:
+                print(f"⚠️  Record {result['index']}: {result['error']}", file=sys.stderr)
+        else:
+            output.write(json.dumps(result) + "\n")
+
+    stats.finished = time.perf_counter()
+    return stats
+
+def open_input(path: str) -> TextIO:
+    """Open the input file, or stdin for '-'"""
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    return open(path, newline="", encoding="utf-8")
@@ -0,0 +1,254 @@
+"""
+CATIA V5 AI Code Generator - CATIA Session Manager
+Keeps one long-lived COM connection to CATIA V5, launching and waiting for it if needed
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Optional, Set
+
+DEFAULT_EXECUTABLE = r"C:\Program Files\Dassault Systemes\B28\win_b64\code\bin\CNEXT.exe"
+
+class CatiaUnavailable(Exception):
+    """Raised when no usable CATIA session can be obtained"""
+
+class Win32ComBackend:
+    """COM backend for a real CATIA V5 installation (Windows, pywin32)
+
+    COM is initialized in the multithreaded apartment, so the application object can
+    be obtained on a background thread and then used from the UI thread. With
+    ``dedicated=True`` the backend never attaches to a shared instance; it starts a
+    private CATIA process with DispatchEx (used by the worker pool) and records its
+    process id, which COM does not expose, by comparing the CATIA processes running
+    before and after the launch.
+    """
+
+    PROG_ID = "Catia.Application"
+
+    def __init__(self, executable: Optional[str] = None, dedicated: bool = False):
+        self.executable = executable or os.getenv("CATIA_EXECUTABLE", DEFAULT_EXECUTABLE)
+        self.dedicated = dedicated
+        self._instance = None
+        self.pid: Optional[int] = None
+
+    def initialize_thread(self):
+        sys.coinit_flags = 0  # COINIT_MULTITHREADED; must be set before pythoncom is imported
+        import pythoncom
+        pythoncom.CoInitializeEx(pythoncom.COINIT_MULTITHREADED)
+
+    def get_running(self) -> Optional[Any]:
+        """Return the instance registered in the Running Object Table, if any"""
+        if self.dedicated:
+            return self._instance
+        import pywintypes
+        import win32com.client
+        try:
+            return win32com.client.GetActiveObject(self.PROG_ID)
+        except pywintypes.com_error:
+            return None
+
+    def launch(self):
+        if self.dedicated:
+            import win32com.client
+            import win32event
+            # Workers launching at the same time would see each other's new processes
+            mutex = win32event.CreateMutex(None, False, "Local\\CatiaAiDedicatedLaunch")
+            win32event.WaitForSingleObject(mutex, win32event.INFINITE)
+            try:
+                before = self._processes()
+                self._instance = win32com.client.DispatchEx(self.PROG_ID)
+                started = self._processes() - before
+                self.pid = started.pop() if len(started) == 1 else None
+            finally:
+                win32event.ReleaseMutex(mutex)
+                mutex.Close()
+            return
+        if not os.path.exists(self.executable):
+            raise CatiaUnavailable("CATIA V5 not found. Please start CATIA manually and try again.")
+        subprocess.Popen([self.executable])
+
+    def is_ready(self, app) -> bool:
+        """True once CATIA answers automation calls (it registers before it finishes loading)"""
+        try:
+            app.Documents.Count
+            return True
+        except Exception:
+            return False
+
+    def prepare(self, app):
+        app.Visible = not self.dedicated
+
+    def _processes(self) -> Set[int]:
+        """Ids of the running processes with the CATIA executable's name"""
+        import pywintypes
+        import win32api
+        import win32con
+        import win32process
+        name = os.path.basename(self.executable).lower()
+        found = set()
+        for pid in win32process.EnumProcesses():
+            try:
+                handle = win32api.OpenProcess(win32con.PROCESS_QUERY_INFORMATION | win32con.PROCESS_VM_READ,
+                                              False, pid)
+            except pywintypes.error:
+                continue  # System processes and other users' processes
+            try:
+                if os.path.basename(win32process.GetModuleFileNameEx(handle, 0)).lower() == name:
+                    found.add(pid)
+            except pywintypes.error:
+                pass
+            finally:
+                handle.Close()
+        return found
+
+    def process_id(self, app) -> Optional[int]:
+        """Id of the CATIA process behind ``app``, when it is known"""
+        if self.dedicated:
+            return self.pid
+        processes = self._processes()
+        return processes.pop() if len(processes) == 1 else None
+
+    def memory_mb(self, app) -> Optional[float]:
+        """Working set of the CATIA process (not exposed through COM)"""
+        pid = self.process_id(app)
+        if pid is None:
+            return None
+        import pywintypes
+        import win32api
+        import win32con
+        import win32process
+        try:
+            handle = win32api.OpenProcess(win32con.PROCESS_QUERY_INFORMATION | win32con.PROCESS_VM_READ,
+                                          False, pid)
+        except pywintypes.error:
+            return None
+        try:
+            return win32process.GetProcessMemoryInfo(handle)["WorkingSetSize"] / (1024 * 1024)
+        finally:
+            handle.Close()
+
+    def shutdown(self, app):
+        try:
+            app.Quit()
+        except Exception:
+            pass
+
+class CatiaSessionManager:
+    """Shared CATIA connection with readiness polling, health checks and reconnects
+
+    ``connect`` reuses a running instance when there is one, waiting for it if it is
+    still starting; only when none is registered does it launch CATIA. Either way it
+    polls for readiness with exponential backoff until ``timeout``. ``application``
+    returns the live connection, re-checking its health at most every
+    ``health_interval`` seconds and reconnecting when CATIA went away.
+    """
+
+    def __init__(self, backend=None, timeout: float = 120.0, initial_delay: float = 0.25,
+                 max_delay: float = 5.0, health_interval: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.backend = backend or Win32ComBackend()
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.health_interval = health_interval
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.RLock()
+        self._app = None
+        self._checked_at = 0.0
+        self.launched = False
+
+    @property
+    def connected(self) -> bool:
+        return self._app is not None
+
+    def connect(self, launch: bool = True, timeout: Optional[float] = None,
+                cancelled: Optional[Callable[[], bool]] = None):
+        """Return a ready CATIA application object, starting CATIA if allowed"""
+        with self._lock:
+            if self._app is not None and self._healthy(force=True):
+                return self._app
+            self._app = None
+            self.backend.initialize_thread()
+
+            app = self.backend.get_running()
+            if app is None:
+                if not launch:
+                    raise CatiaUnavailable("CATIA V5 is not running")
+                self.backend.launch()
+                self.launched = True
+                app = self._wait_until_ready(timeout or self.timeout, cancelled)
+            elif not self.backend.is_ready(app):
+                # Registered but still loading (started by the user or another process)
+                app = self._wait_until_ready(timeout or self.timeout, cancelled)
+
+            self.backend.prepare(app)
+            self._app = app
+            self._checked_at = self.clock()
+            return app
+
+    def application(self):
+        """Return the live connection, reconnecting to a running CATIA if it dropped"""
+        with self._lock:
+            if self._app is not None and self._healthy():
+                self.backend.initialize_thread()
+                return self._app
+            return self.connect(launch=False)
+
+    def is_healthy(self) -> bool:
+        with self._lock:
+            return self._app is not None and self._healthy(force=True)
+
+    def disconnect(self):
+        with self._lock:
+            self._app = None
+
+    def _ready_instance(self):
+        app = self.backend.get_running()
+        if app is not None and self.backend.is_ready(app):
+            return app
+        return None
+
+    def _wait_until_ready(self, timeout: float, cancelled: Optional[Callable[[], bool]]):
+        deadline = self.clock() + timeout
+        delay = self.initial_delay
+        while True:
+            app = self._ready_instance()
+            if app is not None:
+                return app
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                raise CatiaUnavailable(f"CATIA V5 did not become ready within {timeout:g}s")
+            if cancelled and cancelled():
+                raise CatiaUnavailable("Connecting to CATIA V5 was cancelled")
+            self.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.max_delay)
+
+    def _healthy(self, force: bool = False) -> bool:
+        now = self.clock()
+        if not force and now - self._checked_at < self.health_interval:
+            return True
+        if self.backend.is_ready(self._app):
+            self._checked_at = now
+            return True
+        self._app = None
+        return False
+
+_session: Optional[CatiaSessionManager] = None
+_session_lock = threading.Lock()
+
+def get_catia_session() -> CatiaSessionManager:
+    """Return the process-wide CATIA session (CATIA_BACKEND=fake uses the simulator)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            backend = None
+            if os.getenv("CATIA_BACKEND", "").lower() == "fake":
+                from fake_catia import FakeCatiaBackend
+                backend = FakeCatiaBackend()
+            _session = CatiaSessionManager(backend)
+        return _session
@@ -0,0 +1,324 @@
+"""
+CATIA V5 AI Code Generator - Command Line Interface
+"""
+
+import os
+import sys
+import time
+from typing import Optional
+
+import click
+
+from generation_daemon import get_generator
+from main import AICodeGenerator, CodeRequest
+from response_cache import get_response_cache
+
+class DefaultCommandGroup(click.Group):
+    """Click group that runs `generate` when no subcommand is given (keeps `main.py -d ...` working)"""
+    
+    def parse_args(self, ctx, args):
+        if not args or (args[0] not in self.commands and args[0] != "--help"):
+            args.insert(0, "generate")
+        return super().parse_args(ctx, args)
+
+@click.group(cls=DefaultCommandGroup)
+def cli():
+    """CATIA V5 AI Code Generator"""
+
+@cli.command(name="generate")
+@click.option('--description', '-d', required=True, help='Description of the code you want to generate')
+@click.option('--language', '-l', default='VBA', type=click.Choice(['VBA', 'Python']), help='Programming language')
+@click.option('--complexity', '-c', default='basic', type=click.Choice(['basic', 'intermediate', 'advanced']), help='Code complexity level')
+@click.option('--output', '-o', help='Output file path')
+@click.option('--use-ai', is_flag=True, help='Use AI model for code generation (requires OpenAI API key)')
+@click.option('--stream', is_flag=True, help='Write AI output incrementally as it arrives (implies --use-ai)')
+def generate_code(description: str, language: str, complexity: str, output: Optional[str], use_ai: bool, stream: bool):
+    """Generate CATIA V5 automation code from natural language description"""
+    
+    print(f"🔧 Generating {language} code for: {description}")
+    print(f"📊 Complexity level: {complexity}")
+    
+    # Create code request
+    request = CodeRequest(
+        description=description,
+        language=language,
+        complexity=complexity
+    )
+    
+    # Initialize code generator (the daemon's, when `serve` is running)
+    generator = get_generator()
+    if generator.remote:
+        print("⚡ Using the running generation daemon")
+    
+    if stream and generator.ai_available:
+        print("🤖 Streaming AI model output...")
+        stream_code(generator, request, output)
+        return
+    
+    # Generate code
+    if use_ai and generator.ai_available:
+        print("🤖 Using AI model for code generation...")
+        generated_code = generator.generate_code_with_ai(request)
+    else:
+        print("📋 Using offline code generation...")
+        generated_code = generator.generate_local_code(request)
+    
+    # Output results
+    if output:
+        with open(output, 'w') as f:
+            f.write(generated_code)
+        print(f"💾 Code saved to: {output}")
+    else:
+        print("\n" + "="*50)
+        print("GENERATED CODE:")
+        print("="*50)
+        print(generated_code)
+        print("="*50)
+
+def stream_code(generator, request: CodeRequest, output: Optional[str] = None):
+    """Write streamed AI code to stdout or a file as each block arrives"""
+    start = time.perf_counter()
+    first_token = None
+    
+    if output:
+        target = open(output, 'w')
+    else:
+        print("\n" + "="*50)
+        print("GENERATED CODE:")
+        print("="*50)
+        target = sys.stdout
+    
+    try:
+        for chunk in generator.stream_code_with_ai(request):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            target.write(chunk)
+            target.flush()
+    finally:
+        if output:
+            target.close()
+    
+    total = time.perf_counter() - start
+    if output:
+        print(f"💾 Code saved to: {output}")
+    else:
+        print("\n" + "="*50)
+    print(f"⏱️  First code after {first_token or total:.2f}s, complete after {total:.2f}s")
+
+@cli.command()
+@click.option('--input', '-i', 'input_path', default='-', help='JSONL, CSV or text file of descriptions (default: stdin)')
+@click.option('--format', '-f', 'input_format', type=click.Choice(['jsonl', 'csv', 'text']), help='Input format (default: from file extension)')
+@click.option('--language', '-l', default='VBA', type=click.Choice(['VBA', 'Python']), help='Default language for records without one')
+@click.option('--complexity', '-c', default='basic', type=click.Choice(['basic', 'intermediate', 'advanced']), help='Default complexity for records without one')
+@click.option('--output', '-o', help='JSONL output file (default: stdout)')
+@click.option('--output-dir', help='Write one .bas/.py file per record instead of JSONL')
+@click.option('--workers', '-w', type=int, help='Number of worker processes (default: CPU count)')
+@click.option('--chunk-size', default=64, show_default=True, help='Records sent to a worker at a time')
+@click.option('--ordered/--unordered', default=True, help='Keep input order in the output')
+def batch(input_path: str, input_format: Optional[str], language: str, complexity: str, output: Optional[str],
+          output_dir: Optional[str], workers: Optional[int], chunk_size: int, ordered: bool):
+    """Generate offline code for every description in a JSONL/CSV file or stdin"""
+    from batch import detect_format, iter_requests, open_input, read_records, run_batch, write_results
+    
+    fmt = input_format or detect_format(input_path)
+    with open_input(input_path) as stream:
+        items = iter_requests(read_records(stream, fmt), language, complexity)
+        results = run_batch(items, workers=workers, ordered=ordered, chunk_size=chunk_size)
+        if output_dir:
+            stats = write_results(results, output_dir=output_dir)
+        elif output:
+            with open(output, 'w') as f:
+                stats = write_results(results, output=f)
+        else:
+            stats = write_results(results, output=sys.stdout)
+    
+    click.echo(f"✅ {stats.records} records ({stats.errors} errors) in {stats.elapsed:.2f}s "
+               f"- {stats.throughput:,.0f} records/sec", err=True)
+
+@cli.command(name="index")
+@click.argument('macro_dir', type=click.Path(exists=True, file_okay=False))
+@click.option('--index-dir', help='Where to store the index (default: CATIA_MACRO_INDEX or the cache directory)')
+@click.option('--query', '-q', help='Run a test query against the index after building it')
+def index_command(macro_dir: str, index_dir: Optional[str], query: Optional[str]):
+    """Build or update the retrieval index over a directory of existing macros"""
+    from macro_index import MacroIndex, build_index, default_index_dir
+    
+    index_dir = index_dir or default_index_dir()
+    if not index_dir:
+        raise click.ClickException("No writable index directory; pass --index-dir")
+    
+    start = time.perf_counter()
+    stats = build_index(macro_dir, index_dir)
+    print(f"📚 Indexed {macro_dir} in {time.perf_counter() - start:.2f}s: "
+          f"{stats['added']} added, {stats['updated']} updated, "
+          f"{stats['removed']} removed, {stats['unchanged']} unchanged")
+    print(f"💾 Index stored in: {index_dir}")
+    
+    if query:
+        with MacroIndex(index_dir) as index:
+            for path, score in index.search(query):
+                print(f"   {score:6.2f}  {path}")
+
+@cli.command(name="prompt")
+@click.option('--description', '-d', required=True, help='Description of the code you want to generate')
+@click.option('--language', '-l', default='VBA', type=click.Choice(['VBA', 'Python']), help='Programming language')
+@click.option('--complexity', '-c', default='basic', type=click.Choice(['basic', 'intermediate', 'advanced']), help='Code complexity level')
+@click.option('--budget', type=int, help='Input token budget (default: CATIA_AI_PROMPT_BUDGET or 1500)')
+def prompt_command(description: str, language: str, complexity: str, budget: Optional[int]):
+    """Show the prompt that would be sent to the model and its token counts"""
+    generator = AICodeGenerator(prompt_budget=budget)
+    prompt = generator.build_prompt(CodeRequest(description=description, language=language, complexity=complexity))
+    click.echo(prompt.text)
+    click.echo("=" * 50)
+    click.echo(f"🔢 {prompt.tokens} prompt tokens of {prompt.budget} "
+               f"({generator.prompt_builder.tokenizer.name}), max {prompt.max_tokens} completion tokens")
+    click.echo(f"   sections: {', '.join(prompt.sections)}; examples: {prompt.examples}"
+               f"{'; description truncated' if prompt.truncated else ''}")
+
+@cli.command(name="run")
+@click.argument('macro_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--stop-on-error', is_flag=True, help='Stop at the first macro that fails')
+@click.option('--no-launch', is_flag=True, help='Only attach to a running CATIA instead of starting one')
+def run_command(macro_files, stop_on_error: bool, no_launch: bool):
+    """Run VBA macro files in CATIA one after another (CATIA_BACKEND=fake to simulate)"""
+    from catia_session import CatiaUnavailable, get_catia_session
+    from macro_runner import MacroRunner, summarize
+    
+    session = get_catia_session()
+    try:
+        session.connect(launch=not no_launch)
+    except CatiaUnavailable as e:
+        raise click.ClickException(str(e))
+    
+    def read_macros():
+        for path in macro_files:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                yield f.read()
+    
+    results = []
+    with MacroRunner(session) as runner:
+        for result in runner.run_many(read_macros(), stop_on_error=stop_on_error):
+            results.append(result)
+            name = macro_files[result.index]
+            if result.ok:
+                click.echo(f"✅ {name}: {result.entry_point} ({result.duration:.2f}s)")
+            else:
+                click.echo(f"❌ {name}: {result.error} ({result.duration:.2f}s)")
+    
+    click.echo(summarize(results))
+    if not all(result.ok for result in results):
+        sys.exit(1)
+
+@cli.command(name="history")
+@click.argument('query', nargs=-1)
+@click.option('--limit', '-n', default=10, show_default=True, help='Number of entries to list')
+@click.option('--language', '-l', type=click.Choice(['VBA', 'Python']), help='Only entries in this language')
+@click.option('--show', 'show_id', type=int, help='Print the code of the entry with this id')
+@click.option('--output', '-o', help='With --show, write the code to this file')
+@click.option('--compact', is_flag=True, help='Compress the code of all entries older than 7 days now')
+def history_command(query, limit: int, language: Optional[str], show_id: Optional[int],
+                    output: Optional[str], compact: bool):
+    """Search past generations (the most recent ones without a query)"""
+    from history import get_history
+
+    history = get_history()
+    if not history:
+        raise click.ClickException("Generation history is disabled or unavailable.")
+
+    if show_id is not None:
+        entry = history.get(show_id)
+        if entry is None:
+            raise click.ClickException(f"No history entry {show_id}")
+        if output:
+            with open(output, 'w') as f:
+                f.write(entry.code)
+            click.echo(f"💾 Code saved to: {output}")
+        else:
+            click.echo(f"# {entry.description}\n")
+            click.echo(entry.code)
+        return
+
+    if compact:
+        click.echo(f"🗜️  Compacted {history.compact()} entries.")
+
+    start = time.perf_counter()
+    text = " ".join(query)
+    entries = history.search(text, limit=limit, language=language) if text else history.recent(limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    for entry in entries:
+        backend = f"/{entry.backend}" if entry.backend else ""
+        click.echo(f"{entry.id:>7}  {entry.when}  {entry.language:<6} {entry.source}{backend:<12} "
+                   f"{entry.description[:70]}")
+    stats = history.stats()
+    click.echo(f"🔎 {len(entries)} of {stats['entries']} entries in {elapsed:.1f} ms "
+               f"({stats['bytes'] / 1024 / 1024:.1f} MB) - show one with --show ID")
+
+@cli.command(name="serve")
+@click.option('--port', '-p', default=0, show_default=True, help='Port on 127.0.0.1 (0 picks a free one)')
+@click.option('--status', 'show_status', is_flag=True, help='Show whether a daemon is running')
+@click.option('--stop', is_flag=True, help='Stop the running daemon')
+def serve_command(port: int, show_status: bool, stop: bool):
+    """Run the generation daemon that the CLI and GUIs use while it is running"""
+    from generation_daemon import find_daemon, serve
+
+    client = find_daemon()
+    if show_status or stop:
+        if client is None:
+            click.echo("No generation daemon is running.")
+            return
+        status = client.status()
+        if stop:
+            client.shutdown()
+            click.echo(f"🛑 Stopped the generation daemon (pid {status['pid']}).")
+            return
+        click.echo(f"⚡ Generation daemon pid {status['pid']} on port {status['port']}: "
+                   f"up {status['uptime']:.0f}s, {status['requests']} requests, "
+                   f"AI backends: {', '.join(status['backends']) or 'none'}")
+        flights = status.get("flights")
+        if flights:
+            click.echo(f"   AI calls: {flights['executions']} made, {flights['coalesced']} identical requests "
+                       f"shared one, {flights['in_flight']} in flight")
+        return
+    if client is not None:
+        raise click.ClickException(f"A generation daemon is already running on port {client.port}")
+
+    start = time.perf_counter()
+
+    def ready(daemon):
+        click.echo(f"⚡ Generation daemon warmed up in {time.perf_counter() - start:.2f}s, listening on "
+                   f"127.0.0.1:{daemon.port} (pid {os.getpid()}); Ctrl+C to stop")
+
+    try:
+        serve(port, on_ready=ready)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        raise click.ClickException(f"Could not start the generation daemon: {e}")
+    click.echo("🛑 Generation daemon stopped.")
+
+@cli.command(name="cache")
+@click.option('--clear', is_flag=True, help='Remove all cached responses and reset counters')
+def cache_command(clear: bool):
+    """Show statistics for the shared AI response cache"""
+    cache = get_response_cache()
+    if not cache:
+        click.echo("Response cache is disabled or unavailable.")
+        return
+    if clear:
+        cache.clear()
+        click.echo("🧹 Response cache cleared.")
+    stats = cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / lookups * 100 if lookups else 0.0
+    click.echo(f"📦 {cache.path}")
+    click.echo(f"   entries: {stats['entries']}  size: {stats['bytes'] / 1024:.1f} KB")
+    click.echo(f"   hits: {stats['hits']}  misses: {stats['misses']}  "
+               f"evictions: {stats['evictions']}  hit rate: {hit_rate:.1f}%")
+
+    from semantic_cache import get_semantic_cache
+    similar = get_semantic_cache(cache)
+    if similar is not None:
+        click.echo(f"   requests indexed for reworded lookups: {len(similar)}")
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,278 @@
+"""
+CATIA V5 AI Code Generator - Code Extractor
+Incrementally pulls code blocks out of (streamed) model responses
+"""
+
+import re
+from typing import Iterable, Iterator, List, Optional
+
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+# VBA: procedures and container blocks, and module-level declarations kept with them. Only
+# real declarations open a block: "Sub Name(" and "Type Name" alone on its line, not prose
+# such as "Type the following" or "Sub procedures like this one"
+_VBA_START = re.compile(
+    r"^\s*(?:(?:Public|Private|Friend)\s+)?(?:Static\s+)?"
+    r"(?:(?:Sub|Function|Property\s+(?:Get|Let|Set))\s+\w+\s*\(|(?:Class|Type|Enum)\s+\w+\s*$)",
+    re.IGNORECASE)
+_VBA_END = re.compile(r"^\s*End\s+(Sub|Function|Property|Class|Type|Enum)\b", re.IGNORECASE)
+_VBA_DECLARATION = re.compile(
+    r"^\s*(?:Option\s+\w+|(?:Dim|Const|Private|Public|Global)\s+\w+.*\bAs\b|"
+    r"(?:(?:Public|Private)\s+)?Declare\s)", re.IGNORECASE)
+_VBA_STRING = re.compile(r'"[^"]*"')
+
+# Python: what may start a block, and what counts as code at the block's own indentation
+_PY_START = re.compile(r"(?:async\s+def|def|class)\s+\w+|@\w|import\s+\w|from\s+[\w.]+\s+import\s")
+_PY_SPECIAL = re.compile(r"[#'\"]")
+_PY_STRING_END = {"'": re.compile(r"[^'\\]*(?:\\.[^'\\]*)*'"), '"': re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"')}
+_PY_STATEMENT = re.compile(
+    r"(?:async\s+def|def|class|if|elif|else|for|while|try|except|finally|with|return|raise|"
+    r"import|from|pass|break|continue|global|assert|del|yield)\b|@\w|[A-Za-z_][\w.]*\s*(?:[-+*/|&]?=|\(|\[)")
+
+class CodeExtractor:
+    """Single-pass extractor for VBA or Python code in model output
+
+    ``feed`` accepts arbitrary chunks and returns the blocks completed by them, so it
+    can run while a response streams in; only the unfinished last line is buffered,
+    and every character is scanned once. Fenced code blocks are taken verbatim.
+    Outside fences, every Sub/Function/Property/Class/Type/Enum (VBA) or top-level
+    def/class/import block (Python) is kept, and keywords inside strings and
+    comments are ignored. A VBA block that never reaches its End line is dropped.
+    """
+
+    def __init__(self, language: str = "VBA"):
+        self.python = language.lower() == "python"
+        self.fenced: List[str] = []
+        self.procedures: List[str] = []
+        self._partial: List[str] = []
+        self._fence: Optional[str] = None
+        self._lines: List[str] = []
+        # VBA state
+        self._depth = 0
+        self._declarations: List[str] = []
+        # Python state
+        self._in_block = False
+        self._base_indent = 0
+        self._pending: List[str] = []
+        self._triple: Optional[str] = None
+        self._finished = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """Consume a chunk of output and return any blocks it completed"""
+        completed: List[str] = []
+        if "\n" not in chunk:
+            if chunk:
+                self._partial.append(chunk)  # Joined once the line is complete
+            return completed
+        lines = chunk.split("\n")
+        if self._partial:
+            self._partial.append(lines[0])
+            lines[0] = "".join(self._partial)
+            self._partial = []
+        tail = lines.pop()
+        if tail:
+            self._partial.append(tail)
+        handle = self._line
+        for line in lines:
+            handle(line.rstrip("\r"), completed)
+        return completed
+
+    def finish(self) -> List[str]:
+        """Flush the last line and any block left open at the end of the output"""
+        completed: List[str] = []
+        if self._finished:
+            return completed
+        self._finished = True
+        if self._partial:
+            line = "".join(self._partial)
+            self._partial = []
+            self._line(line.rstrip("\r"), completed)
+        if self._fence is not None:
+            self._emit(self.fenced, self._lines, completed)
+        elif self._lines and self.python:
+            self._emit(self.procedures, self._lines, completed)
+        return completed
+
+    @property
+    def blocks(self) -> List[str]:
+        """Fenced blocks when the output had any, otherwise the detected procedures"""
+        return self.fenced or self.procedures
+
+    def code(self) -> Optional[str]:
+        """All extracted code joined together, or None if nothing looked like code"""
+        self.finish()
+        return "\n\n".join(self.blocks) or None
+
+    def _emit(self, target: List[str], lines: List[str], completed: List[str]):
+        while lines and not lines[-1].strip():
+            lines.pop()
+        if lines:
+            block = "\n".join(lines)
+            target.append(block)
+            completed.append(block)
+        self._lines = []
+
+    def _line(self, line: str, completed: List[str]):
+        if _FENCE.match(line):
+            if self._fence is None:
+                # A fence interrupts whatever was being collected outside it
+                if self._lines and self.python:
+                    self._emit(self.procedures, self._lines, completed)
+                self._lines = []  # An unclosed VBA block is dropped
+                self._reset()
+                self._fence = line.strip()[:3]
+            elif line.strip() == self._fence:
+                self._emit(self.fenced, self._lines, completed)
+                self._fence = None
+            else:
+                self._lines.append(line)
+            return
+        if self._fence is not None:
+            self._lines.append(line)
+        elif self.python:
+            self._python_line(line, completed)
+        else:
+            self._vba_line(line, completed)
+
+    def _reset(self):
+        self._depth = 0
+        self._declarations = []
+        self._in_block = False
+        self._pending = []
+        self._triple = None
+
+    # VBA
+
+    @staticmethod
+    def _vba_code(line: str) -> str:
+        """The line without string literals and comments
+
+        ``Rem`` comments need no handling: no block keyword pattern matches them.
+        """
+        if '"' in line:
+            line = _VBA_STRING.sub('""', line)
+        quote = line.find("'")
+        if quote >= 0:
+            return line[:quote]
+        return line
+
+    def _vba_line(self, line: str, completed: List[str]):
+        code = self._vba_code(line)
+        if _VBA_START.match(code):
+            if self._depth == 0:
+                self._lines = self._declarations + [line]
+                self._declarations = []
+            else:
+                self._lines.append(line)
+            self._depth += 1
+        elif self._depth:
+            self._lines.append(line)
+            if _VBA_END.match(code):
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(self.procedures, self._lines, completed)
+        elif _VBA_DECLARATION.match(code):
+            self._declarations.append(line)
+
+    # Python
+
+    def _python_code(self, line: str) -> str:
+        """The line without string literals and comments, tracking triple-quoted strings"""
+        if self._triple is None and not _PY_SPECIAL.search(line):
+            return line
+        out = []
+        i = 0
+        n = len(line)
+        while i < n:
+            if self._triple:
+                end = line.find(self._triple, i)
+                if end < 0:
+                    return "".join(out)
+                i = end + 3
+                self._triple = None
+                out.append('""')
+                continue
+            match = _PY_SPECIAL.search(line, i)
+            if match is None:
+                out.append(line[i:])
+                break
+            start = match.start()
+            out.append(line[i:start])
+            ch = line[start]
+            if ch == "#":
+                break
+            if line.startswith(ch * 3, start):
+                self._triple = ch * 3
+                i = start + 3
+                continue
+            end = _PY_STRING_END[ch].match(line, start + 1)
+            out.append('""')
+            i = end.end() if end else n
+        return "".join(out)
+
+    def _python_line(self, line: str, completed: List[str]):
+        in_string = self._triple is not None
+        code = self._python_code(line)
+        stripped = code.strip()
+        indent = len(line) - len(line.lstrip())
+
+        if not self._in_block:
+            if not in_string and _PY_START.match(stripped):
+                self._in_block = True
+                self._base_indent = indent
+                self._lines = [line]
+            else:
+                self._triple = None  # A quote in prose must not swallow the rest
+            return
+
+        if in_string or (stripped and indent > self._base_indent):
+            self._lines.extend(self._pending)
+            self._pending = []
+            self._lines.append(line)
+        elif not stripped:
+            self._pending.append(line)  # Blank line or comment: kept if the block goes on
+        elif indent == self._base_indent and _PY_STATEMENT.match(stripped):
+            self._lines.extend(self._pending)
+            self._pending = []
+            self._lines.append(line)
+        else:
+            self._pending = []
+            self._in_block = False
+            self._emit(self.procedures, self._lines, completed)
+            self._triple = None
+            self._python_line(line, completed)
+
+def extract_code(text: str, language: str = "VBA") -> Optional[str]:
+    """Extract the code from a complete model response"""
+    extractor = CodeExtractor(language)
+    extractor.feed(text)
+    return extractor.code()
+
+def iter_code(chunks: Iterable[str], language: str = "VBA") -> Iterator[str]:
+    """Yield the code in streamed model output, each block as soon as it is complete
+
+    Blocks after the first are prefixed with a blank line, so the pieces join into the
+    extracted code. Procedures found outside fences are skipped once a fenced block has
+    been seen, and output with no recognisable code is yielded unchanged at the end.
+    """
+    extractor = CodeExtractor(language)
+    raw: List[str] = []
+    separator = ""
+
+    def keep(blocks: List[str]) -> Iterator[str]:
+        nonlocal separator
+        for block in blocks:
+            if extractor.fenced and block not in extractor.fenced:
+                continue
+            yield separator + block
+            separator = "\n\n"
+
+    for chunk in chunks:
+        if not separator:
+            raw.append(chunk)  # Only needed while no code has been found
+        yield from keep(extractor.feed(chunk))
+    yield from keep(extractor.finish())
+    if not separator:
+        text = "".join(raw).strip()
+        if text:
+            yield text
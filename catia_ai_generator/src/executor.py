@@ -0,0 +1,132 @@
+"""
+CATIA V5 AI Code Generator - Background Executor
+Runs generation jobs off the Tk main thread and hands results back through root.after
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+class JobCancelled(Exception):
+    """Raised inside a job function that notices it was cancelled or timed out"""
+
+class Job:
+    """Handle for one background job
+
+    Job functions receive their Job and should call ``check()`` (or test ``cancelled``)
+    between steps, so that cancelling or replacing a job stops the work early.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.started = time.monotonic()
+        self.deadline = deadline
+        self.reason: Optional[str] = None
+        self.finished = False
+        self.on_cancel: Optional[Callable[[], None]] = None
+        self._cancelled = threading.Event()
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._cancelled.is_set():
+            self.reason = reason
+            self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._cancelled.is_set():
+            return True
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    @property
+    def active(self) -> bool:
+        return not self.finished and not self.cancelled
+
+    def check(self):
+        """Raise JobCancelled if the job should stop"""
+        if self.cancelled:
+            raise JobCancelled(self.reason or "timed out")
+
+class BackgroundExecutor:
+    """Shared executor for UI generation jobs
+
+    Only one job is current at a time: submitting a new job cancels the previous one,
+    and results of cancelled, replaced or timed-out jobs are dropped. Callbacks always
+    run on the Tk main thread. Jobs run on daemon threads so a stuck network call can
+    never keep the application from exiting.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.current: Optional[Job] = None
+
+    def submit(self, func: Callable[[Job], Any], on_done: Callable[[Any], None],
+               on_error: Optional[Callable[[BaseException], None]] = None,
+               timeout: Optional[float] = None,
+               on_cancel: Optional[Callable[[], None]] = None) -> Job:
+        """Run ``func(job)`` in the background, replacing any job still running
+
+        ``on_cancel`` runs instead of ``on_done``/``on_error`` when the job is cancelled
+        or replaced, so callers can restore the UI state they changed for it.
+        """
+        self.cancel("replaced")
+        job = Job(deadline=time.monotonic() + timeout if timeout else None)
+        job.on_cancel = on_cancel
+        self.current = job
+
+        future: Future = Future()
+
+        def run():
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(func(job))
+            except BaseException as e:
+                future.set_exception(e)
+            self.call_soon(self._complete, job, future, on_done, on_error)
+
+        threading.Thread(target=run, daemon=True, name="generation-job").start()
+        if timeout:
+            self.root.after(int(timeout * 1000), self._expire, job, on_error)
+        return job
+
+    def call_soon(self, callback: Callable, *args):
+        """Schedule a callback on the Tk main thread (safe to call from any thread)"""
+        try:
+            self.root.after(0, callback, *args)
+        except (RuntimeError, AttributeError):
+            pass  # The window is gone; nothing left to update
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Cancel the current job; returns False if nothing was running"""
+        job = self.current
+        self.current = None
+        if job is None or job.finished:
+            return False
+        job.cancel(reason)
+        if job.on_cancel:
+            self.call_soon(job.on_cancel)
+        return True
+
+    def shutdown(self):
+        self.cancel("shutdown")
+
+    def _complete(self, job: Job, future: Future, on_done, on_error):
+        if job.finished or job.cancelled:
+            return
+        job.finished = True
+        if self.current is job:
+            self.current = None
+        error = future.exception()
+        if error is None:
+            on_done(future.result())
+        elif on_error and not isinstance(error, JobCancelled):
+            on_error(error)
+
+    def _expire(self, job: Job, on_error):
+        if job.finished or job.reason:
+            return
+        job.cancel("timed out")
+        job.finished = True
+        if self.current is job:
+            self.current = None
+        if on_error:
+            on_error(TimeoutError("Code generation timed out"))
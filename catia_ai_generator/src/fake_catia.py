@@ -0,0 +1,193 @@
+"""
+CATIA V5 AI Code Generator - Fake CATIA
+Stand-in COM backend and automation objects for running the CATIA integration on Linux
+"""
+
+import os
+import re
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+class FakeComError(Exception):
+    """Shaped like pywintypes.com_error: (hresult, text, excepinfo, argerror)"""
+
+    def __init__(self, description: str):
+        super().__init__(-2147352567, "Exception occurred.",
+                         (0, "CATIAApplication", description, None, 0, -2147467259), None)
+
+class FakeDocument:
+    def __init__(self, documents: "FakeDocuments", name: str):
+        self._documents = documents
+        self.Name = name
+
+    def Save(self):
+        self._documents._app.call()
+
+    def Close(self):
+        self._documents._app.call()
+        self._documents._items.remove(self)
+
+class FakeDocuments:
+    """Document collection; opening a file whose name contains "crash" kills the
+    application and "hang" blocks forever, to exercise crash and timeout handling"""
+
+    def __init__(self, app: "FakeApplication"):
+        self._app = app
+        self._items: List[FakeDocument] = []
+        self.opened = 0
+
+    @property
+    def Count(self) -> int:
+        self._app.check_alive()
+        return len(self._items)
+
+    def Add(self, kind: str) -> FakeDocument:
+        self._app.call()
+        return self._open(kind)
+
+    def Open(self, path: str) -> FakeDocument:
+        self._app.call()
+        name = os.path.basename(path)
+        if "crash" in name:
+            self._app.alive = False
+            raise OSError("The RPC server is unavailable")
+        if "hang" in name:
+            while True:
+                time.sleep(1)
+        return self._open(name)
+
+    def _open(self, name: str) -> FakeDocument:
+        document = FakeDocument(self, name)
+        self._items.append(document)
+        self.opened += 1
+        return document
+
+class FakeSystemService:
+    """Records every script call; a macro containing ``Err.Raise`` fails like a CATIA error"""
+
+    def __init__(self, app: "FakeApplication"):
+        self._app = app
+        self.calls: List[Tuple[str, tuple]] = []
+
+    def ExecuteScript(self, library: str, library_type: int, program: str, function: str,
+                      parameters: list) -> Any:
+        self._app.check_alive()
+        self.calls.append(("ExecuteScript", (library, library_type, program, function, parameters)))
+        path = os.path.join(library, program)
+        try:
+            with open(path, encoding="utf-8") as f:
+                code = f.read()
+        except OSError:
+            raise FakeComError(f"Script {program} not found in {library}")
+        return self._run(code, function)
+
+    def Evaluate(self, script: str, language: int, function: str, parameters: list) -> Any:
+        self._app.check_alive()
+        self.calls.append(("Evaluate", (script, language, function, parameters)))
+        return self._run(script, function)
+
+    def _run(self, code: str, function: str) -> Any:
+        self._app.call()
+        if not re.search(rf"\b(?:Sub|Function)\s+{re.escape(function)}\b", code, re.IGNORECASE):
+            raise FakeComError(f"The function {function} was not found")
+        if "Err.Raise" in code:
+            raise FakeComError(f"Runtime error in {function}")
+        return None
+
+class FakeApplication:
+    """Minimal CATIA.Application look-alike"""
+
+    def __init__(self, clock: Callable[[], float], ready_at: float, call_latency: float = 0.0):
+        self.Name = "CNEXT"
+        self.Visible = False
+        self.Documents = FakeDocuments(self)
+        self.SystemService = FakeSystemService(self)
+        self.call_latency = call_latency
+        self._clock = clock
+        self._ready_at = ready_at
+        self.alive = True
+
+    def check_alive(self):
+        if not self.alive:
+            raise OSError("The RPC server is unavailable")
+        if self._clock() < self._ready_at:
+            raise OSError("Call was rejected by callee (CATIA is still starting)")
+
+    def call(self):
+        """Every automation call checks liveness and costs ``call_latency`` seconds"""
+        self.check_alive()
+        if self.call_latency:
+            time.sleep(self.call_latency)
+
+    def Quit(self):
+        self.alive = False
+
+class FakeCatiaBackend:
+    """Simulated CATIA installation for CatiaSessionManager
+
+    After ``launch`` the application registers in the (simulated) Running Object
+    Table after ``register_delay`` seconds and answers calls after ``startup_delay``
+    seconds, like a real CATIA that is still loading its workbenches.
+    """
+
+    def __init__(self, startup_delay: Optional[float] = None, register_delay: Optional[float] = None,
+                 running: bool = False, call_latency: float = 0.0, base_memory_mb: float = 400.0,
+                 leak_per_document_mb: float = 0.0, clock: Callable[[], float] = time.monotonic):
+        if startup_delay is None:
+            startup_delay = float(os.getenv("CATIA_FAKE_STARTUP_S", "3"))
+        self.call_latency = call_latency
+        self.base_memory_mb = base_memory_mb
+        self.leak_per_document_mb = leak_per_document_mb
+        self.startup_delay = startup_delay
+        self.register_delay = startup_delay / 2 if register_delay is None else register_delay
+        self.clock = clock
+        self.app: Optional[FakeApplication] = None
+        self._registered_at: Optional[float] = None
+        self.launches = 0
+        self.lookups = 0
+        if running:
+            self._start(ready_after=0.0, register_after=0.0)
+
+    def initialize_thread(self):
+        pass
+
+    def _start(self, ready_after: float, register_after: float):
+        now = self.clock()
+        self.app = FakeApplication(self.clock, now + ready_after, self.call_latency)
+        self._registered_at = now + register_after
+
+    def get_running(self) -> Optional[FakeApplication]:
+        self.lookups += 1
+        if self.app is None or not self.app.alive or self.clock() < self._registered_at:
+            return None
+        return self.app
+
+    def launch(self):
+        self.launches += 1
+        self._start(ready_after=self.startup_delay, register_after=self.register_delay)
+
+    def is_ready(self, app: FakeApplication) -> bool:
+        try:
+            app.Documents.Count
+            return True
+        except OSError:
+            return False
+
+    def prepare(self, app: FakeApplication):
+        app.Visible = True
+
+    def process_id(self, app: FakeApplication) -> Optional[int]:
+        """The simulated CATIA runs inside the calling process"""
+        return None
+
+    def memory_mb(self, app: FakeApplication) -> float:
+        """Simulated working set that grows with every document ever opened"""
+        return self.base_memory_mb + self.leak_per_document_mb * app.Documents.opened
+
+    def shutdown(self, app: FakeApplication):
+        app.Quit()
+
+    def crash(self):
+        """Simulate CATIA exiting underneath the session"""
+        if self.app:
+            self.app.alive = False
@@ -0,0 +1,567 @@
+"""
+CATIA V5 AI Code Generator - Generation Daemon
+A long-running local server that keeps one warm generator, and the client that the CLI
+and both GUIs use to reach it (falling back to in-process generation without it)
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import closing
+from functools import cached_property
+from typing import Dict, Iterator, List, Optional
+
+import metrics
+from paths import get_cache_dir
+
+HOST = "127.0.0.1"
+STATE_FILE = "daemon.json"
+TOKEN_HEADER = "X-Daemon-Token"
+
+# Longer than the GUI's generation timeout, so the GUI gives up first
+REQUEST_TIMEOUT_S = 180
+# Status checks answer at once, so a daemon that does not is treated as gone
+STATUS_TIMEOUT_S = 2.0
+# After the daemon stops answering, look for a new one this often
+RETRY_AFTER_S = 10.0
+# Idle keep-alive connections kept per client
+MAX_IDLE_CONNECTIONS = 4
+
+class DaemonUnavailable(Exception):
+    """Raised when the daemon cannot be reached (callers generate in-process instead)"""
+
+class DaemonError(Exception):
+    """Raised when the daemon was reached but the request failed there"""
+
+def state_path() -> Optional[str]:
+    directory = get_cache_dir()
+    return os.path.join(directory, STATE_FILE) if directory else None
+
+def read_state() -> Optional[Dict]:
+    """Port, token and pid of the last daemon started, or None"""
+    path = state_path()
+    if not path:
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _disabled() -> bool:
+    return os.getenv("CATIA_AI_DAEMON", "").lower() in ("0", "off", "false", "no")
+
+# ---------------------------------------------------------------------------
+# Server
+
+class GenerationDaemon:
+    """Serves generation requests from one warm ``AICodeGenerator`` over localhost HTTP
+
+    Templates, the intent and macro indexes, the response and semantic caches, the
+    offline snippet index and the AI clients (with their pooled connections and the
+    router's latency statistics) are created once and shared by every request.
+    Clients keep their connections open, so a request costs one round trip on top of
+    the generation itself. Requests must carry the token written to the state file,
+    which only the user running the daemon can read.
+    """
+
+    def __init__(self, port: int = 0, generator=None):
+        import secrets
+        from http.server import ThreadingHTTPServer
+        from main import AICodeGenerator
+
+        self.generator = generator or AICodeGenerator()
+        self.token = secrets.token_urlsafe(24)
+        self.started = time.time()
+        self.requests = 0
+        self.routers: Dict[str, object] = {}
+        self._routers_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((HOST, port), _make_handler())
+        self.server.daemon_threads = True
+        self.server.owner = self
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def warm_up(self):
+        """Build everything the first request would otherwise wait for"""
+        self.generator.warm_up()
+        if self.generator.similar is not None:
+            len(self.generator.similar)  # Loads the near-duplicate index
+        self.generator.history
+        if self.generator.ai_available:
+            self.generator.router
+
+    def router(self, names: List[str]):
+        """Router over the named backends, shared by every client asking for the same ones"""
+        key = ",".join(names)
+        with self._routers_lock:
+            if key not in self.routers:
+                from backends import build_backends
+                from router import Router
+                self.routers[key] = Router(build_backends(names, self.generator.api_key))
+            return self.routers[key]
+
+    def status(self) -> Dict:
+        return {
+            "pid": os.getpid(),
+            "port": self.port,
+            "uptime": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "ai_available": self.generator.ai_available,
+            "backends": self.generator.backend_names,
+            "flights": self.generator.flights.stats(),
+        }
+
+    def write_state(self):
+        path = state_path()
+        if not path:
+            raise OSError("No writable cache directory for the daemon state file")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"port": self.port, "pid": os.getpid(), "token": self.token}, f)
+        os.replace(tmp, path)
+
+    def remove_state(self):
+        state = read_state()
+        if state and state.get("pid") == os.getpid():
+            try:
+                os.remove(state_path())
+            except OSError:
+                pass
+
+    def serve_forever(self):
+        """Serve until ``shutdown`` is called (or Ctrl+C)"""
+        self.write_state()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.remove_state()
+            self.server.server_close()
+            for router in self.routers.values():
+                router.close()
+
+    def shutdown(self):
+        # serve_forever must be stopped from another thread than the one handling a request
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+def _payload(request) -> Dict:
+    return {"description": request.description, "language": request.language,
+            "complexity": request.complexity}
+
+def _request_from(payload: Dict):
+    from main import CodeRequest
+    return CodeRequest(description=str(payload["description"]),
+                       language=payload.get("language") or "VBA",
+                       complexity=payload.get("complexity") or "basic")
+
+def _make_handler():
+    """Request handler class (http.server is only imported by the daemon, not by clients)"""
+    import secrets
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive
+        disable_nagle_algorithm = True
+
+        @property
+        def daemon(self) -> GenerationDaemon:
+            return self.server.owner
+
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, status: int, payload: Dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def authorized(self) -> bool:
+            if secrets.compare_digest(self.headers.get(TOKEN_HEADER, ""), self.daemon.token):
+                return True
+            self.reply(403, {"error": "Missing or wrong daemon token"})
+            return False
+
+        def do_GET(self):
+            if not self.authorized():
+                return
+            if self.path == "/status":
+                self.reply(200, self.daemon.status())
+            else:
+                self.reply(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            if not self.authorized():
+                return
+            handler = {
+                "/generate": self.generate,
+                "/stream": self.stream,
+                "/complete": self.complete,
+                "/shutdown": self.stop,
+            }.get(self.path)
+            if handler is None:
+                self.reply(404, {"error": f"Unknown path {self.path}"})
+                return
+            self.daemon.requests += 1
+            try:
+                handler(json.loads(body or b"{}"))
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True  # The client went away
+            except Exception as e:
+                self.reply(500, {"error": str(e), "type": type(e).__name__})
+
+        def generate(self, payload: Dict):
+            request = _request_from(payload)
+            generator = self.daemon.generator
+            info: Dict = {}
+            if payload.get("use_ai"):
+                code = generator.generate_code_with_ai(request, info)
+            else:
+                code = generator.generate_local_code(request, info)
+            self.reply(200, dict(info, code=code))
+
+        def stream(self, payload: Dict):
+            """Newline-delimited JSON chunks, sent as the generator yields them"""
+            request = _request_from(payload)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            info: Dict = {}
+            with closing(self.daemon.generator.stream_code_with_ai(request, info)) as chunks:
+                try:
+                    for chunk in chunks:
+                        self.write_chunk({"chunk": chunk})
+                    self.write_chunk(dict(info, done=True))
+                except (BrokenPipeError, ConnectionResetError):
+                    raise  # Closing the generator stops the upstream request
+                except Exception as e:
+                    self.write_chunk({"error": str(e)})
+            self.wfile.write(b"0\r\n\r\n")
+
+        def write_chunk(self, payload: Dict):
+            data = json.dumps(payload).encode("utf-8") + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+        def complete(self, payload: Dict):
+            from router import NoBackendAvailable
+            router = self.daemon.router([str(name) for name in payload.get("backends", [])])
+            try:
+                routed = router.complete(str(payload["prompt"]), int(payload["max_tokens"]))
+            except NoBackendAvailable as e:
+                self.reply(503, {"error": str(e), "type": "NoBackendAvailable"})
+                return
+            self.reply(200, {"text": routed.text, "backend": routed.backend,
+                             "latency": routed.latency, "hedged": routed.hedged})
+
+        def stop(self, payload: Dict):
+            self.reply(200, {"stopping": True})
+            self.daemon.shutdown()
+
+    return Handler
+
+def serve(port: int = 0, on_ready=None):
+    """Start a daemon, warm it up and serve until stopped"""
+    daemon = GenerationDaemon(port)
+    daemon.warm_up()
+    if on_ready:
+        on_ready(daemon)
+    daemon.serve_forever()
+
+# ---------------------------------------------------------------------------
+# Client
+
+class DaemonClient:
+    """Sends requests to a running daemon over pooled keep-alive connections
+
+    A connection is taken from the pool for one request and returned once its
+    response has been read, so any thread can use the client. A request that fails on
+    a reused connection (closed by the daemon in the meantime) is retried once on a
+    new one. http.client is imported with the first client, so processes without a
+    daemon do not pay for it.
+    """
+
+    def __init__(self, port: int, token: str, timeout: float = REQUEST_TIMEOUT_S):
+        self.port = port
+        self.token = token
+        self.timeout = timeout
+        self.info: Dict = {}  # Status reported when the daemon was found
+        self._idle: List["http.client.HTTPConnection"] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _set_timeout(conn: "http.client.HTTPConnection", timeout: float):
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+
+    def _acquire(self, timeout: Optional[float] = None):
+        """A pooled (or new) connection, waiting at most ``timeout`` for this request"""
+        import http.client
+        with self._lock:
+            conn, reused = (self._idle.pop(), True) if self._idle else (None, False)
+        if conn is None:
+            conn = http.client.HTTPConnection(HOST, self.port, timeout=self.timeout)
+        if timeout is not None:
+            self._set_timeout(conn, timeout)
+        return conn, reused
+
+    def _release(self, conn: "http.client.HTTPConnection"):
+        self._set_timeout(conn, self.timeout)
+        with self._lock:
+            if len(self._idle) < MAX_IDLE_CONNECTIONS:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _send(self, method: str, path: str, payload: Optional[Dict] = None, timeout: Optional[float] = None):
+        """(connection, response) for a request; the caller reads and releases it"""
+        import http.client
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {TOKEN_HEADER: self.token}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        while True:
+            conn, reused = self._acquire(timeout)
+            try:
+                conn.request(method, path, body, headers)
+                return conn, conn.getresponse()
+            except (ConnectionResetError, BrokenPipeError, http.client.BadStatusLine) as e:
+                conn.close()
+                if not reused:
+                    self._lost(e)
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                self._lost(e)
+
+    def _lost(self, error: Exception):
+        _forget(self)
+        raise DaemonUnavailable(f"Generation daemon on port {self.port} is not answering: {error}")
+
+    def _call(self, method: str, path: str, payload: Optional[Dict] = None,
+              timeout: Optional[float] = None) -> Dict:
+        import http.client
+        with metrics.span("daemon", path=path):
+            conn, response = self._send(method, path, payload, timeout)
+            try:
+                data = json.loads(response.read())
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                conn.close()
+                self._lost(e)
+            self._release(conn)
+        if response.status != 200:
+            if data.get("type") == "NoBackendAvailable":
+                from router import NoBackendAvailable
+                raise NoBackendAvailable(data.get("error"))
+            raise DaemonError(data.get("error") or f"Daemon returned HTTP {response.status}")
+        return data
+
+    def status(self, timeout: Optional[float] = None) -> Dict:
+        """Daemon status, waiting at most ``timeout`` (default ``STATUS_TIMEOUT_S``)"""
+        return self._call("GET", "/status", timeout=STATUS_TIMEOUT_S if timeout is None else timeout)
+
+    def generate(self, request, use_ai: bool = False, info: Optional[Dict] = None) -> str:
+        data = self._call("POST", "/generate", dict(_payload(request), use_ai=use_ai))
+        if info is not None:
+            info.update(source=data.get("source"), backend=data.get("backend"))
+        return data["code"]
+
+    def stream(self, request, info: Optional[Dict] = None) -> Iterator[str]:
+        """Yield chunks as the daemon streams them; closing the iterator cancels the request
+
+        ``info`` receives the code's source and backend when the stream ends.
+        """
+        import http.client
+        conn, response = self._send("POST", "/stream", _payload(request))
+        if response.status != 200:
+            data = json.loads(response.read() or b"{}")
+            self._release(conn)
+            raise DaemonError(data.get("error") or f"Daemon returned HTTP {response.status}")
+        finished = False
+        try:
+            while True:
+                try:
+                    line = response.readline()
+                except (OSError, http.client.HTTPException) as e:
+                    self._lost(e)
+                if not line:
+                    self._lost(ConnectionResetError("stream ended early"))
+                event = json.loads(line)
+                if "chunk" in event:
+                    yield event["chunk"]
+                elif "error" in event:
+                    raise DaemonError(event["error"])
+                else:
+                    if info is not None:
+                        info.update(source=event.get("source"), backend=event.get("backend"))
+                    finished = True
+                    break
+        finally:
+            if finished and not response.read():
+                self._release(conn)
+            else:
+                conn.close()  # Abandoned mid-stream: the daemon sees the connection drop
+
+    def complete(self, prompt: str, max_tokens: int, backends: List[str]):
+        """Run a completion on the daemon's router over ``backends``"""
+        from router import RoutedResponse
+        data = self._call("POST", "/complete", {"prompt": prompt, "max_tokens": max_tokens,
+                                                "backends": backends})
+        return RoutedResponse(data["text"], data["backend"], data["latency"], data["hedged"])
+
+    def shutdown(self):
+        self._call("POST", "/shutdown", {})
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+def find_daemon() -> Optional[DaemonClient]:
+    """Client for the daemon named in the state file if it answers, else None"""
+    state = read_state()
+    if not state:
+        return None
+    client = DaemonClient(state["port"], state["token"])
+    try:
+        client.info = client.status()
+    except (DaemonUnavailable, DaemonError):
+        client.close()
+        return None
+    return client
+
+_client: Optional[DaemonClient] = None
+_checked_at: Optional[float] = None
+_client_lock = threading.Lock()
+
+def get_daemon_client() -> Optional[DaemonClient]:
+    """Return the client for the running daemon, or None when there is none
+
+    Looks for a daemon at most every ``RETRY_AFTER_S`` seconds, so one started while
+    a GUI is open is picked up. Set CATIA_AI_DAEMON=off to always generate in-process.
+    """
+    global _client, _checked_at
+    if _disabled():
+        return None
+    with _client_lock:
+        now = time.monotonic()
+        if _client is not None or (_checked_at is not None and now - _checked_at < RETRY_AFTER_S):
+            return _client
+        _checked_at = now
+    # Outside the lock: a daemon that does not answer calls _forget, which takes it
+    client = find_daemon()
+    with _client_lock:
+        if _client is None:
+            _client = client
+        elif client is not None:
+            client.close()  # Another thread found it first
+        return _client
+
+def _forget(client: DaemonClient):
+    """Stop using a client whose daemon stopped answering"""
+    global _client, _checked_at
+    with _client_lock:
+        if _client is client:
+            _client = None
+            _checked_at = time.monotonic()
+    client.close()
+
+class DaemonGenerator:
+    """Generator for the CLI and GUI: the daemon when one is running, else in-process
+
+    Offers the parts of ``AICodeGenerator`` those front ends use. Each request goes to
+    the daemon if there is one and runs on a local ``AICodeGenerator`` (created the
+    first time it is needed, with ``options``) if there is none or it stops answering.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+
+    @cached_property
+    def local(self):
+        """In-process generator, created on first use"""
+        from main import AICodeGenerator
+        return AICodeGenerator(**self.options)
+
+    @property
+    def client(self) -> Optional[DaemonClient]:
+        return get_daemon_client()
+
+    @property
+    def remote(self) -> bool:
+        """True when requests currently go to the daemon"""
+        return self.client is not None
+
+    @property
+    def ai_available(self) -> bool:
+        """Whether AI generation is possible, as the daemon reported when it was found
+
+        Looking for a daemon can still take up to ``STATUS_TIMEOUT_S``, so GUIs ask
+        from a background thread.
+        """
+        client = self.client
+        if client is not None:
+            if "ai_available" in client.info:
+                return client.info["ai_available"]
+            try:
+                client.info = client.status()
+                return client.info["ai_available"]
+            except (DaemonUnavailable, DaemonError):
+                pass
+        return self.local.ai_available
+
+    @property
+    def history(self):
+        from history import get_history
+        return get_history()
+
+    def warm_up(self):
+        """Warm up the in-process generator unless a (warm) daemon is running"""
+        if self.client is None:
+            self.local.warm_up()
+
+    def _generate(self, request, use_ai: bool, info: Optional[Dict]) -> str:
+        client = self.client
+        if client is not None:
+            try:
+                return client.generate(request, use_ai, info)
+            except DaemonUnavailable as e:
+                print(f"{e} - generating in-process")
+        if use_ai:
+            return self.local.generate_code_with_ai(request, info)
+        return self.local.generate_local_code(request, info)
+
+    def generate_code_with_ai(self, request, info: Optional[Dict] = None) -> str:
+        return self._generate(request, True, info)
+
+    def generate_local_code(self, request, info: Optional[Dict] = None) -> str:
+        return self._generate(request, False, info)
+
+    def stream_code_with_ai(self, request, info: Optional[Dict] = None) -> Iterator[str]:
+        client = self.client
+        if client is not None:
+            streamed = False
+            try:
+                with closing(client.stream(request, info)) as chunks:
+                    for chunk in chunks:
+                        streamed = True
+                        yield chunk
+                return
+            except DaemonUnavailable as e:
+                if streamed:
+                    raise  # Part of the answer is already out; starting over would repeat it
+                print(f"{e} - generating in-process")
+        yield from self.local.stream_code_with_ai(request, info)
+
+def get_generator(**options) -> DaemonGenerator:
+    """Generator for front ends; see ``DaemonGenerator``"""
+    return DaemonGenerator(**options)
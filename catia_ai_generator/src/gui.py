@@ -7,12 +7,106 @@ A user-friendly interface for generating CATIA V5 automation code
 import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog, messagebox
 import os
+import queue
+import threading
+import time
 from pathlib import Path
 
 # Import our main generator
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from main import AICodeGenerator, CodeRequest
+from generation_daemon import get_generator
+from main import CodeRequest
+from executor import BackgroundExecutor
+import metrics
+
+# Streamed tokens are flushed into the output widget at most once per frame
+STREAM_FRAME_MS = 16
+
+# Jobs that run longer than this are abandoned and reported as timed out
+GENERATION_TIMEOUT_S = 120
+
+# History searches run this long after the last keystroke
+SEARCH_DELAY_MS = 150
+
+# How the status bar names each source of generated code
+SOURCE_LABELS = {
+    "ai": "AI-powered generation",
+    "cache": "a cached AI response",
+    "similar": "a cached AI response to a similar request",
+    "offline": "offline generation",
+    "template": "a code template",
+}
+
+class HistoryWindow:
+    """Search panel over past generations; loading an entry puts it back in the main window"""
+    
+    def __init__(self, app, history):
+        self.app = app
+        self.history = history
+        self.entries = []
+        self.pending = None
+        
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Generation History")
+        self.window.geometry("760x520")
+        
+        search_frame = tk.Frame(self.window)
+        tk.Label(search_frame, text="Search:", font=("Arial", 10, "bold")).pack(side=tk.LEFT)
+        self.query_var = tk.StringVar()
+        self.query_var.trace_add("write", lambda *_: self.schedule_search())
+        query_entry = tk.Entry(search_frame, textvariable=self.query_var, width=60)
+        query_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        search_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        self.results = tk.Listbox(self.window, height=10, font=("Courier", 9))
+        self.results.bind("<<ListboxSelect>>", lambda _: self.show_selected())
+        self.results.bind("<Double-Button-1>", lambda _: self.load_selected())
+        self.results.pack(fill=tk.X, padx=10)
+        
+        self.preview = scrolledtext.ScrolledText(self.window, height=15, wrap=tk.NONE, font=("Courier", 9))
+        self.preview.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        bottom = tk.Frame(self.window)
+        self.summary_var = tk.StringVar()
+        tk.Label(bottom, textvariable=self.summary_var, anchor=tk.W).pack(side=tk.LEFT)
+        tk.Button(bottom, text="Load", command=self.load_selected, width=10).pack(side=tk.RIGHT)
+        bottom.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        query_entry.focus_set()
+        self.search()
+    
+    def schedule_search(self):
+        if self.pending is not None:
+            self.window.after_cancel(self.pending)
+        self.pending = self.window.after(SEARCH_DELAY_MS, self.search)
+    
+    def search(self):
+        self.pending = None
+        query = self.query_var.get().strip()
+        start = time.perf_counter()
+        self.entries = self.history.search(query, limit=50) if query else self.history.recent(50)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.results.delete(0, tk.END)
+        for entry in self.entries:
+            self.results.insert(tk.END, f"{entry.when}  {entry.language:<6} {entry.source:<8} {entry.description}")
+        self.preview.delete(1.0, tk.END)
+        self.summary_var.set(f"{len(self.entries)} entries in {elapsed:.1f} ms")
+    
+    def selected(self):
+        selection = self.results.curselection()
+        return self.entries[selection[0]] if selection else None
+    
+    def show_selected(self):
+        entry = self.selected()
+        if entry:
+            self.preview.delete(1.0, tk.END)
+            self.preview.insert(tk.END, entry.code)
+    
+    def load_selected(self):
+        entry = self.selected()
+        if entry:
+            self.app.load_history_entry(entry)
 
 class CatiaCodeGeneratorGUI:
     """GUI application for CATIA V5 code generation"""
@@ -22,11 +116,19 @@ class CatiaCodeGeneratorGUI:
         self.root.title("CATIA V5 AI Code Generator")
         self.root.geometry("800x700")
         
-        # Initialize the code generator
-        self.generator = AICodeGenerator()
+        # The generation daemon when one is running, else an in-process generator
+        # (clients and templates are created lazily)
+        self.generator = get_generator()
+        
+        # Generation runs off the UI thread; results come back through root.after
+        self.executor = BackgroundExecutor(root)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
         
         self.create_widgets()
         self.setup_layout()
+        
+        # Warm up the generator once the window is on screen
+        self.root.after(0, self.start_warm_up)
     
     def create_widgets(self):
         """Create all GUI widgets"""
@@ -82,6 +184,16 @@ class CatiaCodeGeneratorGUI:
             font=("Arial", 12, "bold"),
             width=15
         )
+        self.cancel_btn = tk.Button(
+            self.button_frame, 
+            text="Cancel", 
+            command=self.cancel_generation,
+            bg="red", 
+            fg="white", 
+            font=("Arial", 12),
+            width=10,
+            state=tk.DISABLED
+        )
         self.clear_btn = tk.Button(
             self.button_frame, 
             text="Clear", 
@@ -100,6 +212,15 @@ class CatiaCodeGeneratorGUI:
             font=("Arial", 12),
             width=10
         )
+        self.history_btn = tk.Button(
+            self.button_frame, 
+            text="History", 
+            command=self.open_history,
+            bg="purple", 
+            fg="white", 
+            font=("Arial", 12),
+            width=10
+        )
         
         # Output area
         self.output_label = tk.Label(self.root, text="Generated Code:", font=("Arial", 10, "bold"))
@@ -167,8 +288,10 @@ class CatiaCodeGeneratorGUI:
         
         # Buttons
         self.generate_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
         self.clear_btn.pack(side=tk.LEFT, padx=5)
         self.save_btn.pack(side=tk.LEFT, padx=5)
+        self.history_btn.pack(side=tk.LEFT, padx=5)
         self.button_frame.pack(pady=10)
         
         # Output
@@ -178,6 +301,17 @@ class CatiaCodeGeneratorGUI:
         # Status bar
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
     
+    def start_warm_up(self):
+        """Compile templates and create clients in the background (unless the daemon has them)"""
+        thread = threading.Thread(target=self._warm_up, daemon=True)
+        thread.start()
+    
+    def _warm_up(self):
+        try:
+            self.generator.warm_up()
+        except Exception as e:
+            print(f"Generator warm-up failed: {e}")
+    
     def load_example(self, description):
         """Load an example description"""
         self.desc_text.delete(1.0, tk.END)
@@ -191,39 +325,127 @@ class CatiaCodeGeneratorGUI:
             messagebox.showwarning("Warning", "Please enter a description of what you want to create!")
             return
         
-        # Update status
+        # Create code request
+        request = CodeRequest(
+            description=description,
+            language=self.language_var.get(),
+            complexity=self.complexity_var.get()
+        )
+        
+        # Any job still running is replaced by this one; its results are dropped
+        self.output_text.delete(1.0, tk.END)
+        self.cancel_btn.config(state=tk.NORMAL)
+        
+        # Stream AI output into the widget as it arrives (the job falls back to local
+        # generation when no AI backend is available; asking may wait for the daemon)
+        if self.ai_var.get():
+            self.start_streaming(request)
+            return
+        
         self.status_var.set("Generating code...")
-        self.root.update()
+        info = {}
+        job = self.executor.submit(
+            lambda job: self.generator.generate_local_code(request, info),
+            on_done=lambda code: self.show_generated_code(code, info.get("source"), job),
+            on_error=self.generation_failed,
+            timeout=GENERATION_TIMEOUT_S
+        )
+    
+    def show_generated_code(self, code, source, job):
+        """Display finished code (runs on the UI thread)"""
+        metrics.record("ui_generation", time.monotonic() - job.started, source=source)
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.output_text.delete(1.0, tk.END)
+        self.output_text.insert(tk.END, code)
+        self.status_var.set(f"Code generated successfully using {SOURCE_LABELS.get(source, 'local generation')}!")
+    
+    def generation_failed(self, error):
+        """Report a failed or timed-out job (runs on the UI thread)"""
+        self.cancel_btn.config(state=tk.DISABLED)
+        if isinstance(error, TimeoutError):
+            self.status_var.set(f"Code generation timed out after {GENERATION_TIMEOUT_S}s")
+            return
+        messagebox.showerror("Error", f"Failed to generate code: {str(error)}")
+        self.status_var.set("Error occurred during code generation")
+    
+    def cancel_generation(self):
+        """Stop the running job and discard anything it produces"""
+        if self.executor.cancel():
+            self.status_var.set("Code generation cancelled")
+        self.cancel_btn.config(state=tk.DISABLED)
+    
+    def start_streaming(self, request):
+        """Stream AI-generated code into the output widget a block at a time"""
+        self.status_var.set("Waiting for AI model...")
         
+        chunks = queue.Queue()
+        self.first_token = None
+        job = self.executor.submit(
+            lambda job: self._stream_worker(job, request, chunks),
+            on_done=lambda info: self._finish_stream(job, chunks, info),
+            on_error=self.generation_failed,
+            timeout=GENERATION_TIMEOUT_S
+        )
+        self.root.after(STREAM_FRAME_MS, self._drain_stream, job, chunks)
+    
+    def _stream_worker(self, job, request, chunks):
+        """Background job: push streamed chunks onto the queue until done or cancelled
+
+        Returns the generator's ``info`` (source and backend); code is generated locally
+        when no AI backend is available.
+        """
+        info = {}
+        if not self.generator.ai_available:
+            code = self.generator.generate_local_code(request, info)
+            job.check()
+            chunks.put(code)
+            return info
+        stream = self.generator.stream_code_with_ai(request, info)
         try:
-            # Create code request
-            request = CodeRequest(
-                description=description,
-                language=self.language_var.get(),
-                complexity=self.complexity_var.get()
-            )
-            
-            # Generate code
-            if self.ai_var.get() and self.generator.client:
-                generated_code = self.generator.generate_code_with_ai(request)
-                generation_method = "AI-powered"
-            else:
-                generated_code = self.generator.generate_template_code(request)
-                generation_method = "Template-based"
-            
-            # Display code
-            self.output_text.delete(1.0, tk.END)
-            self.output_text.insert(tk.END, generated_code)
-            
-            # Update status
-            self.status_var.set(f"Code generated successfully using {generation_method} generation!")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate code: {str(e)}")
-            self.status_var.set("Error occurred during code generation")
+            for chunk in stream:
+                job.check()
+                chunks.put(chunk)
+        finally:
+            stream.close()  # Closes the HTTP stream when the job is cancelled early
+        return info
+    
+    def _drain_stream(self, job, chunks):
+        """Insert everything received since the last frame with a single widget update"""
+        if not job.active:
+            return  # Finished, cancelled, timed out or replaced by a newer job
+        self._flush_chunks(job, chunks)
+        self.root.after(STREAM_FRAME_MS, self._drain_stream, job, chunks)
+    
+    def _flush_chunks(self, job, chunks):
+        pieces = []
+        while True:
+            try:
+                pieces.append(chunks.get_nowait())
+            except queue.Empty:
+                break
+        
+        if pieces:
+            if self.first_token is None:
+                self.first_token = time.monotonic() - job.started
+                self.status_var.set(f"Receiving AI code (first block after {self.first_token:.2f}s)...")
+            self.output_text.insert(tk.END, "".join(pieces))
+            self.output_text.see(tk.END)
+    
+    def _finish_stream(self, job, chunks, info):
+        self.cancel_btn.config(state=tk.DISABLED)
+        self._flush_chunks(job, chunks)
+        source = info.get("source")
+        total = time.monotonic() - job.started
+        backend = {"backend": info["backend"]} if info.get("backend") else {}
+        metrics.record("ui_generation", total, source=source, first_block_s=self.first_token, **backend)
+        message = f"Code generated successfully using {SOURCE_LABELS.get(source, 'local generation')}!"
+        if source == "ai":
+            message += f" (first block {self.first_token or total:.2f}s, total {total:.2f}s)"
+        self.status_var.set(message)
     
     def clear_all(self):
         """Clear all input and output fields"""
+        self.cancel_generation()
         self.desc_text.delete(1.0, tk.END)
         self.output_text.delete(1.0, tk.END)
         self.language_var.set("VBA")
@@ -259,6 +481,31 @@ class CatiaCodeGeneratorGUI:
                 self.status_var.set(f"Code saved to: {os.path.basename(file_path)}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save file: {str(e)}")
+    
+    def open_history(self):
+        """Open the search panel over past generations"""
+        history = self.generator.history
+        if history is None:
+            messagebox.showwarning("Warning", "Generation history is disabled or unavailable.")
+            return
+        HistoryWindow(self, history)
+    
+    def load_history_entry(self, entry):
+        """Show a past generation in the main window"""
+        self.cancel_generation()
+        self.desc_text.delete(1.0, tk.END)
+        self.desc_text.insert(tk.END, entry.description)
+        self.language_var.set(entry.language)
+        if entry.complexity:
+            self.complexity_var.set(entry.complexity)
+        self.output_text.delete(1.0, tk.END)
+        self.output_text.insert(tk.END, entry.code)
+        self.status_var.set(f"Loaded from history ({entry.when}, {entry.source})")
+    
+    def close(self):
+        """Abandon any running job and close the window"""
+        self.executor.shutdown()
+        self.root.destroy()
 
 def main():
     """Main function to run the GUI application"""
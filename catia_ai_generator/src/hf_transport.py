@@ -0,0 +1,155 @@
+"""
+CATIA V5 AI Code Generator - HuggingFace Transport
+Pooled, keep-alive HTTP transport with retries and a circuit breaker for the inference API
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_URL = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
+
+class TransportError(Exception):
+    """Raised when the inference endpoint did not return a usable response"""
+
+class CircuitOpenError(TransportError):
+    """Raised without touching the network while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker
+
+    After ``failure_threshold`` consecutive failures the circuit opens and every call
+    fails immediately. Once ``reset_timeout`` seconds have passed a single trial call
+    is let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Return True if a call may be attempted now"""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+class HuggingFaceTransport:
+    """HTTP transport for the HuggingFace inference API
+
+    Uses one persistent ``requests.Session`` with a connection pool, separate connect
+    and read timeouts, jittered retries for 503 "model loading" and 429 responses
+    (honoring ``estimated_time`` / ``Retry-After``), and a circuit breaker so callers
+    fail fast while the endpoint is known to be down.
+    """
+
+    RETRY_STATUSES = (429, 503)
+
+    def __init__(self, api_url: Optional[str] = None, token: Optional[str] = None,
+                 connect_timeout: float = 3.05, read_timeout: float = 30.0,
+                 max_retries: int = 3, backoff_base: float = 1.0, max_backoff: float = 20.0,
+                 retry_budget: float = 45.0, pool_size: int = 4,
+                 breaker: Optional[CircuitBreaker] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.api_url = api_url or os.getenv("HF_API_URL", DEFAULT_API_URL)
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.retry_budget = retry_budget
+        self.breaker = breaker or CircuitBreaker()
+        self.sleep = sleep
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        token = token or os.getenv("HF_API_TOKEN")
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def retry_delay(self, attempt: int, response: requests.Response) -> float:
+        """Jittered backoff that honors the server's own estimate when it gives one"""
+        hint = None
+        try:
+            hint = float(response.json().get("estimated_time"))
+        except (ValueError, TypeError, AttributeError):
+            pass
+        if hint is None:
+            try:
+                hint = float(response.headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                pass
+
+        if hint is not None:
+            return min(self.max_backoff, hint) * random.uniform(0.8, 1.2)
+        return random.uniform(0, min(self.max_backoff, self.backoff_base * 2 ** attempt))
+
+    def post(self, payload: Dict[str, Any]) -> Any:
+        """POST a payload and return the decoded JSON body
+
+        Every outcome settles the circuit breaker, so a half-open trial call always
+        closes or re-opens it.
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("HuggingFace endpoint unavailable (circuit open)")
+
+        deadline = time.monotonic() + self.retry_budget
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                self.breaker.record_failure()
+                raise TransportError(f"HuggingFace request failed: {e}") from e
+
+            if response.status_code == 200:
+                self.breaker.record_success()
+                try:
+                    return response.json()
+                except ValueError as e:
+                    raise TransportError("HuggingFace returned invalid JSON") from e
+
+            if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                delay = self.retry_delay(attempt, response)
+                if time.monotonic() + delay <= deadline:
+                    self.sleep(delay)
+                    continue
+
+            if response.status_code >= 500 or response.status_code in self.RETRY_STATUSES:
+                self.breaker.record_failure()
+            else:
+                # A definite answer such as 400/401/404: the endpoint is up, the request is wrong
+                self.breaker.record_success()
+            raise TransportError(f"HuggingFace returned HTTP {response.status_code}")
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,219 @@
+"""
+CATIA V5 AI Code Generator - Generation History
+Every generated macro with its request, source, backend and latency, searchable with FTS5
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from paths import get_cache_dir
+
+# Code of entries older than this is stored zlib-compressed
+COMPACT_AFTER = 7 * 24 * 3600
+# Every this many recorded entries, a batch of old entries is compacted
+COMPACT_EVERY = 500
+COMPACT_BATCH = 2000
+
+# Search ranks the newest entries first and widens the window until it has enough matches
+SEARCH_WINDOW = 5000
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+@dataclass
+class HistoryEntry:
+    id: int
+    created_at: float
+    description: str
+    language: str
+    complexity: Optional[str]
+    source: str
+    backend: Optional[str]
+    latency: float
+    code: str
+
+    @property
+    def when(self) -> str:
+        return time.strftime("%Y-%m-%d %H:%M", time.localtime(self.created_at))
+
+def match_query(text: str, any_term: bool = False) -> Optional[str]:
+    """FTS5 query for free text: every word (or any word), the last one as a prefix"""
+    tokens = [token.lower() for token in _TOKEN.findall(text)]
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    return (" OR " if any_term else " ").join(terms)
+
+def _unpack(code) -> str:
+    return zlib.decompress(code).decode("utf-8") if isinstance(code, bytes) else code
+
+class HistoryStore:
+    """SQLite store of past generations with a contentless FTS5 index
+
+    Descriptions and code are indexed for full-text search but not copied into the
+    index (``content=''``, column-level detail), so the index stays a fraction of the
+    data size. Search ranks with BM25, weighting the description above the code, and
+    returns newer entries first among equal scores. Code older than ``COMPACT_AFTER``
+    is compressed in place with zlib. Like the response cache, the database runs in
+    WAL mode so the CLI and both GUIs can share it.
+    """
+
+    def __init__(self, path: str, compact_after: Optional[float] = COMPACT_AFTER):
+        self.path = path
+        self.compact_after = compact_after
+        self._recorded = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS generations (
+                id INTEGER PRIMARY KEY,
+                created_at REAL NOT NULL,
+                description TEXT NOT NULL,
+                language TEXT NOT NULL,
+                complexity TEXT,
+                source TEXT NOT NULL,
+                backend TEXT,
+                latency REAL NOT NULL,
+                code BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_generations_created ON generations(created_at);
+            CREATE VIRTUAL TABLE IF NOT EXISTS generations_fts USING fts5(
+                description, code, content='', detail=column, tokenize='porter unicode61'
+            );
+        """)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def record(self, description: str, code: str, language: str = "VBA",
+               complexity: Optional[str] = None, source: str = "ai",
+               backend: Optional[str] = None, latency: float = 0.0) -> int:
+        """Store one generation and return its id"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO generations(created_at, description, language, complexity, source, "
+                "backend, latency, code) VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), description, language, complexity, source, backend, latency, code))
+            entry_id = cursor.lastrowid
+            conn.execute("INSERT INTO generations_fts(rowid, description, code) VALUES(?, ?, ?)",
+                         (entry_id, description, code))
+        self._recorded += 1
+        if self._recorded % COMPACT_EVERY == 0:
+            self.compact(limit=COMPACT_BATCH)
+        return entry_id
+
+    def search(self, query: str, limit: int = 20, language: Optional[str] = None) -> List[HistoryEntry]:
+        """Best matches for free text, falling back to any-word matches when all words find nothing
+
+        Ranking every match of a common word over hundreds of thousands of entries takes
+        too long, so matches are ranked among the newest ``SEARCH_WINDOW`` entries first,
+        and the window grows fourfold until it holds ``limit`` matches or everything.
+        """
+        if language:
+            sql = ("SELECT generations_fts.rowid FROM generations_fts "
+                   "JOIN generations g ON g.id = generations_fts.rowid "
+                   "WHERE generations_fts MATCH ? AND generations_fts.rowid > ? AND g.language = ?")
+        else:
+            sql = "SELECT rowid FROM generations_fts WHERE generations_fts MATCH ? AND rowid > ?"
+        sql += " ORDER BY bm25(generations_fts, 4.0, 1.0), generations_fts.rowid DESC LIMIT ?"
+
+        with self._lock:
+            newest = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM generations").fetchone()[0]
+        ids = []
+        for any_term in (False, True):
+            expression = match_query(query, any_term)
+            if expression is None:
+                return []
+            window = SEARCH_WINDOW
+            while True:
+                params = [expression, newest - window] + ([language] if language else []) + [limit]
+                with self._lock:
+                    ids = [row[0] for row in self._conn.execute(sql, params)]
+                if len(ids) >= limit or window >= newest:
+                    break
+                window *= 4
+            if ids or len(_TOKEN.findall(query)) < 2:
+                break
+        with self._lock:
+            rows = {row[0]: row for row in self._conn.execute(
+                f"SELECT * FROM generations WHERE id IN ({','.join('?' * len(ids))})", ids)}
+        return [HistoryEntry(*rows[i][:8], _unpack(rows[i][8])) for i in ids if i in rows]
+
+    def recent(self, limit: int = 20) -> List[HistoryEntry]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM generations ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [HistoryEntry(*row[:8], _unpack(row[8])) for row in rows]
+
+    def get(self, entry_id: int) -> Optional[HistoryEntry]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM generations WHERE id = ?", (entry_id,)).fetchone()
+        return HistoryEntry(*row[:8], _unpack(row[8])) if row else None
+
+    def compact(self, limit: Optional[int] = None) -> int:
+        """Compress the code of entries older than ``compact_after``; returns how many"""
+        if self.compact_after is None:
+            return 0
+        cutoff = time.time() - self.compact_after
+        sql = "SELECT id, code FROM generations WHERE created_at < ? AND typeof(code) = 'text' ORDER BY id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._transaction() as conn:
+            rows = conn.execute(sql, (cutoff,)).fetchall()
+            conn.executemany("UPDATE generations SET code = ? WHERE id = ?",
+                             [(zlib.compress(code.encode("utf-8"), 9), entry_id) for entry_id, code in rows])
+        return len(rows)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count, compacted = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(typeof(code) = 'blob'), 0) FROM generations").fetchone()
+        return {"entries": count, "compacted": compacted, "bytes": os.path.getsize(self.path)}
+
+    def clear(self):
+        """Remove every entry"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM generations")
+            conn.execute("INSERT INTO generations_fts(generations_fts) VALUES('delete-all')")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_shared_history: Optional[HistoryStore] = None
+_shared_lock = threading.Lock()
+
+def get_history() -> Optional[HistoryStore]:
+    """Return the shared history store, or None if it is disabled or unavailable
+
+    Set CATIA_AI_HISTORY=off to stop recording generations.
+    """
+    global _shared_history
+    if os.getenv("CATIA_AI_HISTORY", "").lower() in ("0", "off", "false", "no"):
+        return None
+    with _shared_lock:
+        if _shared_history is None:
+            directory = get_cache_dir()
+            if not directory:
+                return None
+            try:
+                _shared_history = HistoryStore(os.path.join(directory, "history.sqlite3"))
+            except sqlite3.Error as e:
+                print(f"Generation history unavailable: {e}")
+                return None
+        return _shared_history
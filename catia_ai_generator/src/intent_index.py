@@ -0,0 +1,91 @@
+"""
+CATIA V5 AI Code Generator - Intent Index
+Inverted keyword index that ranks templates for a natural language description
+"""
+
+import re
+from collections import defaultdict
+from typing import Container, Dict, List, Mapping, Optional, Set, Tuple
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+def stem(word: str) -> str:
+    """Very small plural stemmer so "parts"/"part" and "sketches"/"sketch" match"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+class IntentIndex:
+    """Maps keywords and synonyms to weighted templates
+
+    Descriptions are tokenized once (unigrams plus bigrams), and each token is looked
+    up in the inverted index, so ranking cost depends on the description and the
+    matching postings rather than on the number of registered templates.
+    """
+
+    def __init__(self, synonyms: Optional[Mapping[str, str]] = None):
+        self.synonyms: Dict[str, str] = {}
+        self._postings: Dict[str, List[Tuple[str, float]]] = defaultdict(list)
+        self._priority: Dict[str, int] = {}
+        for word, canonical in (synonyms or {}).items():
+            self.add_synonym(word, canonical)
+
+    @classmethod
+    def from_keywords(cls, keywords: Mapping[str, Mapping[str, float]],
+                      synonyms: Optional[Mapping[str, str]] = None) -> "IntentIndex":
+        """Build an index from a {template: {keyword: weight}} table"""
+        index = cls(synonyms)
+        for template, template_keywords in keywords.items():
+            index.add(template, template_keywords)
+        return index
+
+    def add_synonym(self, word: str, canonical: str):
+        """Treat ``word`` as ``canonical`` in descriptions and keywords"""
+        self.synonyms[stem(word.lower())] = stem(canonical.lower())
+
+    def _normalize(self, word: str) -> str:
+        word = stem(word)
+        return self.synonyms.get(word, word)
+
+    def tokenize(self, text: str) -> Set[str]:
+        """Return the distinct unigram and bigram terms of a text"""
+        words = [self._normalize(word) for word in _WORD.findall(text.lower())]
+        terms = set(words)
+        terms.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+        return terms
+
+    def add(self, template: str, keywords: Mapping[str, float]):
+        """Register a template with keyword (or two-word phrase) weights
+
+        Templates added earlier win ties, so registration order sets precedence.
+        """
+        self._priority.setdefault(template, len(self._priority))
+        for keyword, weight in keywords.items():
+            term = " ".join(self._normalize(word) for word in _WORD.findall(keyword.lower()))
+            if term:
+                self._postings[term].append((template, weight))
+
+    def rank(self, text: str, limit: Optional[int] = None,
+             candidates: Optional[Container[str]] = None) -> List[Tuple[str, float]]:
+        """Return (template, score) pairs, best first, optionally restricted to ``candidates``"""
+        scores: Dict[str, float] = defaultdict(float)
+        for term in self.tokenize(text):
+            for template, weight in self._postings.get(term, ()):
+                if candidates is None or template in candidates:
+                    scores[template] += weight
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self._priority[item[0]]))
+        return ranked[:limit] if limit else ranked
+
+    def best(self, text: str, default: Optional[str] = None,
+             candidates: Optional[Container[str]] = None) -> Optional[str]:
+        """Return the highest ranked template, or ``default`` when nothing matches"""
+        ranked = self.rank(text, limit=1, candidates=candidates)
+        return ranked[0][0] if ranked else default
+
+    def __len__(self) -> int:
+        return len(self._priority)
@@ -0,0 +1,406 @@
+"""
+CATIA V5 AI Code Generator - Macro Index
+BM25 retrieval index over an in-house macro corpus, used for few-shot prompting
+
+On-disk layout of an index directory:
+    CURRENT           name of the generation directory readers should use
+    gen-*/meta.json     document table, lexicon (term -> posting offset/count) and corpus stats
+    gen-*/postings.bin  uint32 (doc_id, term_frequency) pairs, grouped by term, memory-mapped
+
+Every build writes a new generation and then replaces CURRENT, so a reader always sees
+one complete build, and files that are still memory-mapped are never overwritten.
+"""
+
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from paths import get_cache_dir
+
+INDEX_VERSION = 1
+META_FILE = "meta.json"
+POSTINGS_FILE = "postings.bin"
+CURRENT_FILE = "CURRENT"
+GENERATION_PREFIX = "gen-"
+# How often a long-lived reader checks whether a newer build was published
+REFRESH_INTERVAL = 1.0
+
+MACRO_EXTENSIONS = {
+    ".bas": "VBA",
+    ".catscript": "VBA",
+    ".catvbs": "VBA",
+    ".vbs": "VBA",
+    ".py": "Python"
+}
+
+# Language keywords that appear in nearly every macro and carry no intent
+STOPWORDS = {
+    "dim", "as", "set", "sub", "end", "function", "if", "then", "else", "for", "each",
+    "next", "to", "in", "and", "or", "not", "call", "byval", "byref", "string", "integer",
+    "double", "long", "object", "variant", "boolean", "def", "self", "return", "import",
+    "from", "try", "except", "none", "true", "false", "the", "a", "an", "of", "with",
+    "is", "on", "it", "by", "e", "print", "create", "make", "new"
+}
+
+_IDENTIFIER = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+_CAMEL_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """Split code or prose into lowercase terms, including the parts of camelCase identifiers"""
+    terms = []
+    for identifier in _IDENTIFIER.findall(text):
+        lower = identifier.lower()
+        if lower not in STOPWORDS:
+            terms.append(lower)
+        parts = _CAMEL_PART.findall(identifier)
+        if len(parts) > 1:
+            terms.extend(part.lower() for part in parts if part.lower() not in STOPWORDS)
+    return terms
+
+def estimate_tokens(text: str) -> int:
+    """Rough model token count (about four characters per token)"""
+    return (len(text) + 3) // 4
+
+def macro_language(path: str) -> Optional[str]:
+    return MACRO_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+def scan_macros(source_dir: str) -> Iterator[Tuple[str, float, int]]:
+    """Yield (relative path, mtime, size) for every macro file below source_dir"""
+    for root, _, files in os.walk(source_dir):
+        for name in files:
+            if macro_language(name):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                yield os.path.relpath(path, source_dir), stat.st_mtime, stat.st_size
+
+def current_generation(index_dir: str) -> Optional[str]:
+    """Name of the published generation, or None for an index in the old flat layout"""
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def index_exists(index_dir: str) -> bool:
+    return (os.path.exists(os.path.join(index_dir, CURRENT_FILE))
+            or os.path.exists(os.path.join(index_dir, META_FILE)))
+
+class MacroIndex:
+    """Read side of a macro index: BM25 search over memory-mapped postings
+
+    A reader kept open across builds picks up the newly published generation on its
+    next search (checked at most every ``REFRESH_INTERVAL`` seconds).
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        self._checked = time.monotonic()
+        self._load(current_generation(index_dir))
+
+    def _load(self, generation: Optional[str]):
+        """Open a generation, replacing the current one only once all of its files opened"""
+        data_dir = os.path.join(self.index_dir, generation) if generation else self.index_dir
+        with open(os.path.join(data_dir, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION or meta.get("byteorder") != sys.byteorder:
+            raise ValueError(f"Incompatible macro index in {self.index_dir}; rebuild it")
+        docs: List[Optional[list]] = meta["docs"]
+        live_docs: int = meta["live_docs"]
+        avg_length: float = meta["total_length"] / max(live_docs, 1)
+
+        # BM25 length normalization per document, None for deleted documents. One
+        # table per language filter keeps the scoring loop free of extra checks.
+        norms = [self.K1 * (1 - self.B + self.B * doc[3] / avg_length) if doc else None
+                 for doc in docs]
+        languages = [macro_language(doc[0]) if doc else None for doc in docs]
+        norm_tables = {None: norms}
+        for language in set(MACRO_EXTENSIONS.values()):
+            norm_tables[language] = [norm if lang == language else None
+                                     for norm, lang in zip(norms, languages)]
+
+        file = open(os.path.join(data_dir, POSTINGS_FILE), "rb")
+        try:
+            size = os.fstat(file.fileno()).st_size
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        except BaseException:
+            file.close()
+            raise
+        view = memoryview(mapped if mapped else b"")
+
+        (self.generation, self.source_dir, self.docs, self.terms, self.live_docs, self.avg_length,
+         self._norms, self._file, self._mmap, self._view, self.postings) = (
+            generation, meta["source_dir"], docs, meta["terms"], live_docs, avg_length,
+            norm_tables, file, mapped, view, view.cast("I"))
+
+    def refresh(self) -> bool:
+        """Switch to the newest published generation; True if it changed"""
+        self._checked = time.monotonic()
+        generation = current_generation(self.index_dir)
+        if generation == self.generation:
+            return False
+        with self._lock:
+            old = (self.postings, self._view, self._mmap, self._file)
+            try:
+                self._load(generation)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Macro index refresh failed: {e}")
+                return False
+            postings, view, mapped, file = old
+            postings.release()
+            view.release()
+            if mapped:
+                mapped.close()
+            file.close()
+        return True
+
+    def close(self):
+        self.postings.release()
+        self._view.release()
+        if self._mmap:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def search(self, query: str, k: int = 5, language: Optional[str] = None,
+               max_df_ratio: float = 0.5) -> List[Tuple[str, float]]:
+        """Return the top-k (absolute path, score) matches for a query
+
+        Terms that occur in more than ``max_df_ratio`` of the corpus are skipped; they
+        contribute almost nothing to BM25 but dominate the cost of a query.
+        """
+        if time.monotonic() - self._checked >= REFRESH_INTERVAL:
+            self.refresh()
+        with self._lock:
+            n = self.live_docs
+            if not n:
+                return []
+            norms = self._norms[language]
+            scores: Dict[int, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                entry = self.terms.get(term)
+                if not entry:
+                    continue
+                offset, count = entry
+                if count > max_df_ratio * n and n > 10:
+                    continue
+                weight = math.log(1 + (n - count + 0.5) / (count + 0.5)) * (self.K1 + 1)
+                start, end = offset * 2, (offset + count) * 2
+                for doc_id, tf in zip(self.postings[start:end:2], self.postings[start + 1:end:2]):
+                    norm = norms[doc_id]
+                    if norm is not None:
+                        scores[doc_id] += weight * tf / (tf + norm)
+
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(os.path.join(self.source_dir, self.docs[doc_id][0]), score) for doc_id, score in best]
+
+    def examples(self, query: str, k: int = 3, token_budget: int = 600,
+                 language: Optional[str] = None) -> List[str]:
+        """Return up to k relevant macro snippets that together fit the token budget"""
+        snippets = []
+        remaining = token_budget
+        for path, _ in self.search(query, k=k, language=language):
+            if remaining <= 0:
+                break
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    text = f.read(remaining * 4 + 1).strip()
+            except OSError:
+                continue
+            if estimate_tokens(text) > remaining:
+                text = text[:remaining * 4].rsplit("\n", 1)[0].rstrip()
+            if text:
+                snippets.append(text)
+                remaining -= estimate_tokens(text)
+        return snippets
+
+def _tokenize_file(path: str) -> Counter:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return Counter(tokenize(f.read()))
+
+def build_index(source_dir: str, index_dir: str, compact_ratio: float = 0.3) -> Dict[str, int]:
+    """Build or incrementally update the index for source_dir and return update counts
+
+    Unchanged files (same mtime and size) are not re-read: their postings are copied
+    from the previous index. Changed and deleted files leave tombstones that are
+    compacted away once they exceed ``compact_ratio`` of the document table.
+    """
+    source_dir = os.path.abspath(source_dir)
+    os.makedirs(index_dir, exist_ok=True)
+
+    docs: List[Optional[list]] = []
+    old_terms: Dict[str, List[int]] = {}
+    old_postings = array("I")
+    try:
+        with MacroIndex(index_dir) as old:
+            if old.source_dir == source_dir:
+                docs, old_terms = old.docs, old.terms
+                old_postings.frombytes(old.postings.tobytes())
+    except (OSError, ValueError, KeyError):
+        pass
+
+    stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    path_ids = {doc[0]: doc_id for doc_id, doc in enumerate(docs) if doc}
+    new_postings: Dict[str, array] = defaultdict(lambda: array("I"))
+
+    for rel_path, mtime, size in scan_macros(source_dir):
+        doc_id = path_ids.pop(rel_path, None)
+        if doc_id is not None:
+            if docs[doc_id][1] == mtime and docs[doc_id][2] == size:
+                stats["unchanged"] += 1
+                continue
+            docs[doc_id] = None
+            stats["updated"] += 1
+        else:
+            stats["added"] += 1
+
+        counts = _tokenize_file(os.path.join(source_dir, rel_path))
+        new_id = len(docs)
+        docs.append([rel_path, mtime, size, sum(counts.values())])
+        for term, tf in counts.items():
+            new_postings[term].extend((new_id, tf))
+
+    for doc_id in path_ids.values():
+        docs[doc_id] = None
+        stats["removed"] += 1
+
+    if not (stats["added"] or stats["updated"] or stats["removed"]) and old_terms:
+        return stats
+
+    # Merge old and new postings term by term
+    merged: Dict[str, array] = {}
+    for term in set(old_terms) | set(new_postings):
+        postings = array("I")
+        if term in old_terms:
+            offset, count = old_terms[term]
+            postings.extend(old_postings[offset * 2:(offset + count) * 2])
+        postings.extend(new_postings.get(term, ()))
+        merged[term] = postings
+
+    tombstones = sum(1 for doc in docs if doc is None)
+    if tombstones and tombstones > compact_ratio * len(docs):
+        docs, merged = _compact(docs, merged)
+
+    _write_index(index_dir, source_dir, docs, merged)
+    return stats
+
+def _compact(docs: List[Optional[list]], postings: Dict[str, array]):
+    """Drop tombstoned documents and renumber the rest"""
+    remap = {}
+    live = []
+    for doc_id, doc in enumerate(docs):
+        if doc is not None:
+            remap[doc_id] = len(live)
+            live.append(doc)
+
+    compacted = {}
+    for term, pairs in postings.items():
+        kept = array("I")
+        for i in range(0, len(pairs), 2):
+            new_id = remap.get(pairs[i])
+            if new_id is not None:
+                kept.extend((new_id, pairs[i + 1]))
+        if kept:
+            compacted[term] = kept
+    return live, compacted
+
+def _write_index(index_dir: str, source_dir: str, docs: List[Optional[list]], postings: Dict[str, array]):
+    """Write postings and metadata to a new generation directory, then publish it"""
+    previous = current_generation(index_dir)
+    generation_dir = tempfile.mkdtemp(prefix=GENERATION_PREFIX, dir=index_dir)
+    terms = {}
+    offset = 0
+    with open(os.path.join(generation_dir, POSTINGS_FILE), "wb") as f:
+        for term in sorted(postings):
+            pairs = postings[term]
+            count = len(pairs) // 2
+            terms[term] = [offset, count]
+            pairs.tofile(f)
+            offset += count
+
+    live = [doc for doc in docs if doc is not None]
+    meta = {
+        "version": INDEX_VERSION,
+        "byteorder": sys.byteorder,
+        "source_dir": source_dir,
+        "live_docs": len(live),
+        "total_length": sum(doc[3] for doc in live),
+        "docs": docs,
+        "terms": terms
+    }
+    with open(os.path.join(generation_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, separators=(",", ":"))
+
+    generation = os.path.basename(generation_dir)
+    _publish(index_dir, generation)
+    _remove_stale(index_dir, keep={generation, previous})
+
+def _publish(index_dir: str, generation: str):
+    """Point CURRENT at a generation with a single atomic rename"""
+    fd, pointer_tmp = tempfile.mkstemp(prefix=CURRENT_FILE + ".", suffix=".tmp", dir=index_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(generation)
+    for attempt in range(20):
+        try:
+            os.replace(pointer_tmp, os.path.join(index_dir, CURRENT_FILE))
+            return
+        except PermissionError:
+            # Windows refuses while a reader has CURRENT open; readers only hold it briefly
+            if attempt == 19:
+                os.remove(pointer_tmp)
+                raise
+            time.sleep(0.05)
+
+def _remove_stale(index_dir: str, keep):
+    """Delete older generations and the old flat layout
+
+    The previous generation is kept for readers that have just read CURRENT. Files
+    still memory-mapped by another process cannot be deleted on Windows; they are
+    tried again after the next build.
+    """
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        if name.startswith(GENERATION_PREFIX) and name not in keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif name in (META_FILE, POSTINGS_FILE):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def default_index_dir() -> Optional[str]:
+    """Index location: CATIA_MACRO_INDEX, or macro_index/ in the cache directory"""
+    return os.getenv("CATIA_MACRO_INDEX") or get_cache_dir("macro_index")
+
+_macro_index: Optional[MacroIndex] = None
+
+def get_macro_index() -> Optional[MacroIndex]:
+    """Open the default macro index once per process, or return None if none was built"""
+    global _macro_index
+    if _macro_index is None:
+        index_dir = default_index_dir()
+        if index_dir and index_exists(index_dir):
+            try:
+                _macro_index = MacroIndex(index_dir)
+            except (OSError, ValueError) as e:
+                print(f"Macro index unavailable: {e}")
+    return _macro_index
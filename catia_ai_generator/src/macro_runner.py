@@ -0,0 +1,110 @@
+"""
+CATIA V5 AI Code Generator - Macro Runner
+Executes generated VBA macros directly in CATIA through the automation API
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, List, Optional
+
+from catia_session import CatiaSessionManager, get_catia_session
+
+# SystemService.ExecuteScript library type for a plain directory of script files
+CAT_SCRIPT_LIBRARY_TYPE_DIRECTORY = 1
+
+_PROCEDURE = re.compile(r"^[ \t]*(?:Public[ \t]+|Private[ \t]+)?(?:Sub|Function)[ \t]+(\w+)",
+                        re.IGNORECASE | re.MULTILINE)
+
+@dataclass
+class ExecutionResult:
+    """Outcome of running one macro in CATIA"""
+    ok: bool
+    entry_point: Optional[str] = None
+    result: Any = None
+    error: Optional[str] = None
+    duration: float = 0.0
+    index: int = 0
+
+def find_entry_point(code: str) -> Optional[str]:
+    """Return the procedure to call: CATMain if defined, else the first Sub/Function"""
+    names = _PROCEDURE.findall(code)
+    for name in names:
+        if name.lower() == "catmain":
+            return name
+    return names[0] if names else None
+
+def describe_error(error: BaseException) -> str:
+    """Turn a COM error into the message CATIA reported, if it reported one"""
+    args = getattr(error, "args", ())
+    # pywintypes.com_error: (hresult, text, excepinfo, argerror)
+    if len(args) >= 3 and isinstance(args[2], tuple) and len(args[2]) > 2 and args[2][2]:
+        return str(args[2][2]).strip()
+    return str(error)
+
+class MacroRunner:
+    """Runs macro source through ``SystemService.ExecuteScript``
+
+    Each macro is written as a CATScript file to a private scratch directory and its
+    entry point is called through the shared CATIA session, so several macros can be
+    run back to back without opening the VBA editor.
+    """
+
+    def __init__(self, session: Optional[CatiaSessionManager] = None, script_dir: Optional[str] = None):
+        self.session = session or get_catia_session()
+        self._own_dir = script_dir is None
+        self.script_dir = script_dir or tempfile.mkdtemp(prefix="catia_macros_")
+        self._counter = 0
+
+    def run(self, code: str, entry_point: Optional[str] = None, index: int = 0) -> ExecutionResult:
+        """Execute one macro and report its result, error and duration"""
+        start = time.perf_counter()
+        entry_point = entry_point or find_entry_point(code)
+        if not entry_point:
+            return ExecutionResult(False, error="No Sub or Function found to run", index=index)
+
+        self._counter += 1
+        name = f"macro_{os.getpid()}_{self._counter}.CATScript"
+        path = os.path.join(self.script_dir, name)
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(code)
+            app = self.session.application()
+            result = app.SystemService.ExecuteScript(
+                self.script_dir, CAT_SCRIPT_LIBRARY_TYPE_DIRECTORY, name, entry_point, []
+            )
+            return ExecutionResult(True, entry_point, result, duration=time.perf_counter() - start, index=index)
+        except Exception as e:
+            return ExecutionResult(False, entry_point, error=describe_error(e),
+                                   duration=time.perf_counter() - start, index=index)
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def run_many(self, macros: Iterable[str], stop_on_error: bool = False) -> Iterator[ExecutionResult]:
+        """Run macros one after another, yielding each result as soon as it is known"""
+        for index, code in enumerate(macros):
+            result = self.run(code, index=index)
+            yield result
+            if stop_on_error and not result.ok:
+                break
+
+    def close(self):
+        if self._own_dir:
+            shutil.rmtree(self.script_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def summarize(results: List[ExecutionResult]) -> str:
+    ok = sum(1 for r in results if r.ok)
+    total = sum(r.duration for r in results)
+    return f"{ok}/{len(results)} macros succeeded in {total:.2f}s"
@@ -4,17 +4,37 @@ A tool that converts natural language descriptions into CATIA V5 automation code
 """
 
 import os
+import sqlite3
 import sys
-import json
-from typing import Dict, List, Optional
+import time
+from functools import cached_property
+from typing import Dict, Iterator, List, Optional
 from dataclasses import dataclass
-import click
-from jinja2 import Template
-from openai import OpenAI
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+import metrics
+from code_extractor import iter_code
+from response_cache import ResponseCache, get_response_cache, make_key, normalize_request
+from intent_index import IntentIndex
+from macro_index import MacroIndex, get_macro_index
+from param_parser import TEMPLATE_SCOPES, parse, to_code
+from prompt_builder import DEFAULT_INPUT_BUDGET, Prompt, PromptBuilder
+from backends import build_backends, configured_backend_names
+from router import Router
+from single_flight import SingleFlight
+from templates import TEMPLATE_KEYWORDS, TEMPLATE_SYNONYMS, AdvancedCatiaTemplates
+
+# openai, jinja2 and python-dotenv are imported on first use so that template-only
+# runs and GUI startup do not pay for them
+
+_environment_loaded = False
+
+def load_environment():
+    """Load variables from a .env file once per process"""
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
 
 @dataclass
 class CodeRequest:
@@ -122,6 +142,20 @@ def create_sketch(part_doc):
         print(f"Error creating sketch: {e}")
         ''',
         
+        "extrude_operation": '''
+def create_extrude(part_doc):
+    """Create an extrude feature in CATIA V5 part"""
+    try:
+        part = part_doc.Part
+        bodies = part.Bodies
+        body = bodies.Item("PartBody")
+        
+        # {{ custom_code }}
+        
+    except Exception as e:
+        print(f"Error creating extrude: {e}")
+        ''',
+        
         "automation_framework": '''
 import win32com.client
 import logging
@@ -147,155 +181,437 @@ class CATIAAutomation:
         '''
     }
 
+# All templates available per language, basic templates first
+TEMPLATE_SETS = {
+    "VBA": {**CatiaCodeTemplates.VBA_TEMPLATES, **AdvancedCatiaTemplates.VBA_ADVANCED},
+    "Python": {**CatiaCodeTemplates.PYTHON_TEMPLATES, **AdvancedCatiaTemplates.PYTHON_ADVANCED}
+}
+
+# Values for template placeholders that are not filled with the custom snippet
+TEMPLATE_DEFAULTS = {
+    "part_number": "GeneratedAssembly",
+    "revision": "A"
+}
+
+_template_registry = None
+_intent_index: Optional[IntentIndex] = None
+
+def get_template_registry():
+    """Return the process-wide registry of compiled code templates"""
+    global _template_registry
+    if _template_registry is None:
+        from template_registry import TemplateRegistry
+        _template_registry = TemplateRegistry(TEMPLATE_SETS)
+    return _template_registry
+
+def get_intent_index() -> IntentIndex:
+    """Return the process-wide intent index used to select templates"""
+    global _intent_index
+    if _intent_index is None:
+        _intent_index = IntentIndex.from_keywords(TEMPLATE_KEYWORDS, TEMPLATE_SYNONYMS)
+    return _intent_index
+
+# Identical in-flight AI requests from any thread in this process share one upstream call
+_ai_flights = SingleFlight()
+
+class _Outcome:
+    """Forwards attributes to a span and keeps the source and backend for the history"""
+    
+    __slots__ = ("span", "source", "backend")
+    
+    def __init__(self, span):
+        self.span = span
+        self.source: Optional[str] = None
+        self.backend: Optional[str] = None
+    
+    @property
+    def active(self) -> bool:
+        return self.span.active
+    
+    def set(self, **attrs):
+        self.source = attrs.get("source", self.source)
+        self.backend = attrs.get("backend", self.backend)
+        self.span.set(**attrs)
+    
+    def report(self, info: Optional[Dict]):
+        """Copy the source and backend into a caller's ``info`` dict"""
+        if info is not None:
+            info.update(source=self.source, backend=self.backend)
+
 class AICodeGenerator:
     """AI-powered code generator for CATIA V5"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    MODEL = "gpt-3.5-turbo"
+    SYSTEM_MESSAGE = "You are an expert CATIA V5 automation developer."
+    TEMPERATURE = 0.3
+    
+    # Token budget for few-shot examples pulled from the macro index
+    EXAMPLE_TOKEN_BUDGET = 600
+    EXAMPLE_COUNT = 3
+    
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[ResponseCache] = None,
+                 macro_index: Optional[MacroIndex] = None, prompt_budget: Optional[int] = None):
+        load_environment()
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=self.api_key) if self.api_key else None
+        self.prompt_budget = prompt_budget or int(os.getenv("CATIA_AI_PROMPT_BUDGET", DEFAULT_INPUT_BUDGET))
+        self.backend_names = configured_backend_names(self.api_key)
         self.templates = CatiaCodeTemplates()
+        self.intent_index = get_intent_index()
+        self.flights = _ai_flights
+        # Explicit arguments replace the lazily created defaults below
+        if cache is not None:
+            self.cache = cache
+        if macro_index is not None:
+            self.macro_index = macro_index
+    
+    @property
+    def ai_available(self) -> bool:
+        """True when at least one AI backend is configured (CATIA_AI_BACKENDS)"""
+        return bool(self.backend_names)
+    
+    @cached_property
+    def client(self):
+        """OpenAI client, created on first use"""
+        if not self.api_key:
+            return None
+        from openai import OpenAI
+        return OpenAI(api_key=self.api_key)
+    
+    @cached_property
+    def registry(self):
+        """Compiled template registry, created on first use"""
+        return get_template_registry()
+    
+    @cached_property
+    def cache(self) -> Optional[ResponseCache]:
+        """Shared response cache, opened on first use"""
+        return get_response_cache()
+    
+    @cached_property
+    def similar(self):
+        """Near-duplicate index in front of the response cache, loaded on first use"""
+        from semantic_cache import get_semantic_cache
+        return get_semantic_cache(self.cache)
+    
+    @cached_property
+    def history(self):
+        """Generation history, opened on first use"""
+        from history import get_history
+        return get_history()
+    
+    @cached_property
+    def macro_index(self) -> Optional[MacroIndex]:
+        """Few-shot macro index, opened on first use"""
+        return get_macro_index()
+    
+    @cached_property
+    def prompt_builder(self) -> PromptBuilder:
+        """Prompt builder with the model's tokenizer, created on first use"""
+        return PromptBuilder(self.MODEL, input_budget=self.prompt_budget,
+                             example_budget=self.EXAMPLE_TOKEN_BUDGET)
+    
+    @cached_property
+    def offline(self):
+        """Snippet assembler used without (or when failing over from) the AI backends, loaded on first use"""
+        from offline_backend import get_offline_backend
+        return get_offline_backend()
+    
+    @cached_property
+    def router(self) -> Router:
+        """Router over the configured AI backends, created on first use"""
+        backends = build_backends(self.backend_names, self.api_key, model=self.MODEL,
+                                  temperature=self.TEMPERATURE, system_message=self.SYSTEM_MESSAGE,
+                                  client=self.client)
+        return Router(backends)
+    
+    def warm_up(self):
+        """Create clients and compile templates ahead of the first request"""
+        self.registry.compile_all()
+        self.cache
+        self.macro_index
+        self.prompt_builder
+        self.offline
+        if self.ai_available:
+            self.client
+    
+    def build_prompt(self, request: CodeRequest) -> Prompt:
+        """Build the prompt for a request, with its token count and completion budget"""
+        builder = self.prompt_builder
+        examples = []
+        if self.macro_index:
+            budget = builder.example_budget_for(request.language, request.complexity, request.description)
+            if budget:
+                examples = self.macro_index.examples(
+                    request.description, k=self.EXAMPLE_COUNT, token_budget=budget,
+                    language=builder.language(request.language)
+                )
+        return builder.build(request.description, request.language, request.complexity, examples)
     
     def generate_prompt(self, request: CodeRequest) -> str:
         """Generate a detailed prompt for the AI model"""
-        prompt = f"""
-You are an expert CATIA V5 automation developer. Generate {request.language} code for the following requirement:
-
-Description: {request.description}
-Language: {request.language}
-Complexity Level: {request.complexity}
-
-Requirements:
-1. Generate clean, well-commented code
-2. Include error handling where appropriate
-3. Use CATIA V5 best practices
-4. Make the code modular and reusable
-5. Only return the code, no additional explanation
-
-If using VBA:
-- Use proper CATIA V5 object model
-- Include necessary variable declarations
-- Use appropriate error handling
+        return self.build_prompt(request).text
+    
+    def timed_prompt(self, request: CodeRequest) -> Prompt:
+        """build_prompt, recorded as the pipeline's prompt stage with its token count"""
+        with metrics.span("prompt", language=request.language) as span:
+            prompt = self.build_prompt(request)
+            if span.active:
+                span.set(tokens=prompt.tokens, budget=prompt.budget, examples=prompt.examples,
+                         truncated=prompt.truncated, max_tokens=prompt.max_tokens)
+            return prompt
+    
+    def build_messages(self, prompt: str) -> List[Dict[str, str]]:
+        """Build the chat messages sent to the model"""
+        return [
+            {"role": "system", "content": self.SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def cache_key(self, request: CodeRequest, prompt: Prompt) -> str:
+        """Content address of an AI response for this request"""
+        return make_key(
+            ",".join(self.backend_names),
+            normalize_request(request.description, request.language, request.complexity),
+            prompt.text,
+            self.MODEL,
+            {"max_tokens": prompt.max_tokens, "temperature": self.TEMPERATURE}
+        )
+    
+    def generate_code_with_ai(self, request: CodeRequest, info: Optional[Dict] = None) -> str:
+        """Generate code using AI model
+        
+        ``info``, if given, receives the code's ``source`` ("ai", "cache", "similar",
+        "offline" or "template") and ``backend``.
+        """
+        started = time.perf_counter()
+        with metrics.span("generate") as span:
+            outcome = _Outcome(span)
+            code = self._generate(request, outcome)
+        self.record_history(request, code, outcome.source, outcome.backend, time.perf_counter() - started)
+        outcome.report(info)
+        return code
+    
+    def _generate(self, request: CodeRequest, span) -> str:
+        if not self.ai_available:
+            span.set(fallback_reason="no_backend")
+            return self.local_code(request, span=span)
+        
+        try:
+            prompt = self.timed_prompt(request)
+            
+            key = self.cache_key(request, prompt)
+            if self.cache:
+                cached = self.cache.get(key)
+                span.set(cache_hit=cached is not None)
+                if cached is not None:
+                    span.set(source="cache")
+                    return cached
+                similar = self.similar_code(request, span)
+                if similar is not None:
+                    return similar
+            
+            span.set(source="ai")
+            code = self.flights.do(key, lambda: self._complete(prompt, key, span))
+            self.remember(request, key)
+            return code
+            
+        except Exception as e:
+            print(f"AI generation failed: {e}")
+            span.set(fallback_reason=type(e).__name__)
+            return self.local_code(request, span=span)
 
-If using Python:
-- Use win32com.client for COM interface
-- Include try-catch blocks
-- Follow Python best practices
+    def _complete(self, prompt: Prompt, key: str, span=metrics.NOOP_SPAN) -> str:
+        """Run one completion on the fastest healthy backend and store the result in the cache"""
+        routed = self.router.complete(prompt.text, prompt.max_tokens)
+        span.set(backend=routed.backend, hedged=routed.hedged)
+        if self.cache:
+            self.cache.put(key, routed.text)
+        return routed.text
+    
+    def record_history(self, request: CodeRequest, code: str, source: Optional[str],
+                       backend: Optional[str] = None, latency: float = 0.0):
+        """Add a generation to the searchable history"""
+        if not code or self.history is None:
+            return
+        try:
+            self.history.record(request.description, code, request.language, request.complexity,
+                                source or "template", backend, latency)
+        except sqlite3.Error as e:
+            print(f"Recording history failed: {e}")
+    
+    def similar_code(self, request: CodeRequest, span=metrics.NOOP_SPAN) -> Optional[str]:
+        """Cached code for a reworded version of this request, or None"""
+        if self.similar is None:
+            return None
+        with metrics.span("similar") as lookup:
+            hit = self.similar.get(request.description, request.language, request.complexity)
+            lookup.set(hit=hit is not None)
+        if hit is None:
+            return None
+        span.set(source="similar", distance=hit.distance, substituted=hit.substituted)
+        return hit.code
+    
+    def remember(self, request: CodeRequest, key: str):
+        """Let reworded versions of this request find its cached response"""
+        if self.similar is not None:
+            self.similar.put(request.description, request.language, request.complexity, key)
+    
+    def stream_code_with_ai(self, request: CodeRequest, info: Optional[Dict] = None) -> Iterator[str]:
+        """Generate code using AI model, yielding each code block as soon as the model finishes it
+        
+        ``info`` is filled in as for ``generate_code_with_ai`` once the stream is exhausted.
         """
-        return prompt
-    
-    def generate_code_with_ai(self, request: CodeRequest) -> str:
-        """Generate code using AI model"""
-        if not self.client:
-            return self.generate_template_code(request)
+        started = time.perf_counter()
+        chunks = []
+        with metrics.span("generate_stream", backend="openai") as span:
+            outcome = _Outcome(span)
+            for chunk in self._stream_code(request, outcome):
+                chunks.append(chunk)
+                yield chunk
+        self.record_history(request, "".join(chunks), outcome.source, outcome.backend,
+                            time.perf_counter() - started)
+        outcome.report(info)
+    
+    def _stream_code(self, request: CodeRequest, span) -> Iterator[str]:
+        if not self.ai_available:
+            span.set(fallback_reason="no_backend")
+            yield self.local_code(request, span=span)
+            return
         
+        chunks = []
         try:
-            prompt = self.generate_prompt(request)
+            prompt = self.timed_prompt(request)
+            
+            key = self.cache_key(request, prompt)
+            if self.cache:
+                cached = self.cache.get(key)
+                span.set(cache_hit=cached is not None)
+                if cached is not None:
+                    span.set(source="cache")
+                    yield cached
+                    return
+                similar = self.similar_code(request, span)
+                if similar is not None:
+                    yield similar
+                    return
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert CATIA V5 automation developer."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=2000,
-                temperature=0.3
-            )
+            span.set(source="ai")
+            if self.client is None or "openai" not in self.backend_names:
+                # Only OpenAI streams; the other backends answer through the router in one piece
+                yield self.flights.do(key, lambda: self._complete(prompt, key, span))
+                self.remember(request, key)
+                return
+            span.set(backend="openai")
+            started = time.perf_counter()
             
-            return response.choices[0].message.content.strip()
+            # Identical requests streaming at the same time share one OpenAI stream
+            for block in self.flights.stream(key, lambda: self._stream_openai(prompt, key, request.language)):
+                if not chunks:
+                    span.set(first_block_ms=round((time.perf_counter() - started) * 1000, 1))
+                chunks.append(block)
+                yield block
             
         except Exception as e:
             print(f"AI generation failed: {e}")
-            return self.generate_template_code(request)
+            if not chunks:
+                span.set(fallback_reason=type(e).__name__)
+                yield self.local_code(request, span=span)
+            return
+        
+        if "".join(chunks).strip():
+            self.remember(request, key)
     
-    def generate_template_code(self, request: CodeRequest) -> str:
-        """Generate code using templates (fallback method)"""
-        templates = (self.templates.VBA_TEMPLATES if request.language.upper() == "VBA" 
-                    else self.templates.PYTHON_TEMPLATES)
+    def _stream_openai(self, prompt: Prompt, key: str, language: str) -> Iterator[str]:
+        """Stream the code in one OpenAI completion and store it in the cache when done
         
-        # Simple keyword matching for template selection
-        description_lower = request.description.lower()
+        Each code block is yielded as soon as the model has finished it; prose around
+        the code is dropped on the way.
+        """
+        stream = self.client.chat.completions.create(
+            model=self.MODEL,
+            messages=self.build_messages(prompt.text),
+            max_tokens=prompt.max_tokens,
+            temperature=self.TEMPERATURE,
+            stream=True
+        )
         
-        if "sketch" in description_lower:
-            template_key = "sketch_creation"
-        elif "extrude" in description_lower or "pad" in description_lower:
-            template_key = "extrude_operation"
-        elif "part" in description_lower:
-            template_key = "part_creation"
-        else:
-            template_key = list(templates.keys())[0]  # Default to first template
+        def deltas():
+            for event in stream:
+                if event.choices and event.choices[0].delta.content:
+                    yield event.choices[0].delta.content
         
-        template = templates.get(template_key, templates[list(templates.keys())[0]])
+        chunks = []
+        for block in iter_code(deltas(), language):
+            chunks.append(block)
+            yield block
         
-        # Generate custom code snippet based on description
-        custom_code = self.generate_custom_snippet(request, template_key)
+        generated_code = "".join(chunks).strip()
+        if self.cache and generated_code:
+            self.cache.put(key, generated_code)
+    
+    def assemble(self, request: CodeRequest):
+        """Stitch a macro from the snippet library, or None if no operation matched"""
+        with metrics.span("offline", language=request.language) as span:
+            assembly = self.offline.assemble(request.description, request.language)
+            if span.active and assembly is not None:
+                span.set(operations=len(assembly.operations), unmatched=len(assembly.unmatched))
+            return assembly
+    
+    def generate_local_code(self, request: CodeRequest, info: Optional[Dict] = None) -> str:
+        """Generate code without a model and record it in the history
         
-        return Template(template).render(custom_code=custom_code)
+        ``info`` is filled in as for ``generate_code_with_ai``.
+        """
+        started = time.perf_counter()
+        outcome = _Outcome(metrics.NOOP_SPAN)
+        code = self.local_code(request, span=outcome)
+        self.record_history(request, code, outcome.source, None, time.perf_counter() - started)
+        outcome.report(info)
+        return code
+    
+    def local_code(self, request: CodeRequest, assembly=None, span=metrics.NOOP_SPAN) -> str:
+        """Code without a model: the offline assembly, else a template"""
+        if assembly is None:
+            assembly = self.assemble(request)
+        if assembly is not None:
+            span.set(source="offline")
+            return assembly.code
+        span.set(source="template")
+        return self.generate_template_code(request)
+    
+    def select_template(self, request: CodeRequest) -> str:
+        """Pick the best matching template key for the request's language"""
+        language = "VBA" if request.language.upper() == "VBA" else "Python"
+        templates = TEMPLATE_SETS[language]
+        default = next(iter(templates))  # Default to first template
+        return self.intent_index.best(request.description, default=default, candidates=templates)
+    
+    def generate_template_code(self, request: CodeRequest) -> str:
+        """Generate code using templates (fallback method)"""
+        with metrics.span("render", language=request.language) as span:
+            language = "VBA" if request.language.upper() == "VBA" else "Python"
+            template_key = self.select_template(request)
+            name = self.registry.template_name(language, template_key)
+            if span.active:
+                span.set(template=template_key)
+            
+            # Generate custom code snippet based on description
+            custom_code = self.generate_custom_snippet(request, template_key)
+            
+            context = {variable: TEMPLATE_DEFAULTS.get(variable, custom_code)
+                       for variable in self.registry.variables(name)}
+            return self.registry.render(name, **context)
     
     def generate_custom_snippet(self, request: CodeRequest, template_type: str) -> str:
-        """Generate custom code snippet based on description"""
-        description = request.description.lower()
+        """Generate custom code snippet based on description
         
-        if template_type == "sketch_creation":
-            return '''
-    ' Create a new sketch
-    Dim sketch As Sketch
-    Set sketch = sketches.Add(bodies.Item("PartBody").OriginElements.PlaneYZ)
-    
-    ' Add geometric elements based on requirements
-    ' TODO: Implement specific sketch geometry
-            '''
-        elif template_type == "part_creation":
-            return '''
-    ' Set part properties
-    part.PartNumber = "GeneratedPart"
-    part.Revision = "A"
-    
-    ' TODO: Add specific part creation logic
-            '''
-        else:
-            return "' TODO: Implement specific functionality based on requirements"
-
-@click.command()
-@click.option('--description', '-d', required=True, help='Description of the code you want to generate')
-@click.option('--language', '-l', default='VBA', type=click.Choice(['VBA', 'Python']), help='Programming language')
-@click.option('--complexity', '-c', default='basic', type=click.Choice(['basic', 'intermediate', 'advanced']), help='Code complexity level')
-@click.option('--output', '-o', help='Output file path')
-@click.option('--use-ai', is_flag=True, help='Use AI model for code generation (requires OpenAI API key)')
-def generate_code(description: str, language: str, complexity: str, output: Optional[str], use_ai: bool):
-    """Generate CATIA V5 automation code from natural language description"""
-    
-    print(f"🔧 Generating {language} code for: {description}")
-    print(f"📊 Complexity level: {complexity}")
-    
-    # Create code request
-    request = CodeRequest(
-        description=description,
-        language=language,
-        complexity=complexity
-    )
-    
-    # Initialize code generator
-    generator = AICodeGenerator()
-    
-    # Generate code
-    if use_ai and generator.client:
-        print("🤖 Using AI model for code generation...")
-        generated_code = generator.generate_code_with_ai(request)
-    else:
-        print("📋 Using template-based code generation...")
-        generated_code = generator.generate_template_code(request)
-    
-    # Output results
-    if output:
-        with open(output, 'w') as f:
-            f.write(generated_code)
-        print(f"💾 Code saved to: {output}")
-    else:
-        print("\n" + "="*50)
-        print("GENERATED CODE:")
-        print("="*50)
-        print(generated_code)
-        print("="*50)
+        For the basic templates, the shapes, dimensions, plane and operations in the
+        description are compiled to code (see ``param_parser``).
+        """
+        if template_type in TEMPLATE_SCOPES:
+            return to_code(parse(request.description), request.language, template_type)
+        return "' TODO: Implement specific functionality based on requirements"
 
 if __name__ == "__main__":
-    generate_code()
+    from cli import cli
+    cli()
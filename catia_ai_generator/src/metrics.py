@@ -0,0 +1,272 @@
+"""
+CATIA V5 AI Code Generator - Metrics
+Per-stage spans and counters for the generation pipeline, exported as JSON lines and
+a Prometheus text file
+
+Disabled unless CATIA_AI_METRICS_DIR is set (or ``configure`` is called); while
+disabled, ``span`` returns a shared no-op object so instrumented code pays only for
+a function call.
+"""
+
+import atexit
+import glob
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+# Histogram buckets for stage durations, in seconds
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Span attributes that become Prometheus labels; everything else only goes to JSON lines
+LABELS = ("backend",)
+
+JSONL_FILE = "metrics.jsonl"
+PROMETHEUS_FILE = "metrics.{pid}.prom"  # One per process, so workers never overwrite each other
+_PROMETHEUS_PID = re.compile(r"metrics\.(\d+)\.prom$")
+
+def _escape(value: str) -> str:
+    """Escape a label value for the Prometheus text format"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _process_running(pid: int) -> bool:
+    """True while a process with this id exists"""
+    if os.name == "nt":
+        import ctypes  # os.kill(pid, 0) would terminate the process on Windows
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        try:
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class _NoopSpan:
+    __slots__ = ()
+    active = False  # Lets hot paths skip computing attributes nobody records
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class Span:
+    """Times one pipeline stage; attributes can be added while it runs"""
+
+    __slots__ = ("recorder", "name", "attrs", "start")
+    active = True
+
+    def __init__(self, recorder: "Recorder", name: str, attrs: dict):
+        self.recorder = recorder
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is GeneratorExit:
+            self.attrs.setdefault("cancelled", True)  # A streaming consumer stopped early
+        elif exc_type is not None:
+            self.attrs.setdefault("error", exc_type.__name__)
+        self.recorder.record(self.name, time.perf_counter() - self.start, self.attrs)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+class Recorder:
+    """Aggregates spans into counters and histograms and appends them to a JSON lines file
+
+    Each process exports only what it recorded itself: a forked child starts from empty
+    histograms, its Prometheus file is removed when it closes, and files left behind by
+    processes that died without closing are removed when the next recorder starts.
+    """
+
+    def __init__(self, directory: str, prometheus_interval: float = 10.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.jsonl_path = os.path.join(directory, JSONL_FILE)
+        self.prometheus_interval = prometheus_interval
+        self._lock = threading.Lock()
+        self._jsonl = open(self.jsonl_path, "a", encoding="utf-8")
+        self._written_at = time.monotonic()
+        self.durations: Dict[Tuple, list] = {}
+        self.counters: Dict[Tuple, float] = defaultdict(float)
+        self.prune()
+
+    def prune(self):
+        """Remove the Prometheus files of processes that are no longer running"""
+        for path in glob.glob(os.path.join(self.directory, PROMETHEUS_FILE.format(pid="*"))):
+            match = _PROMETHEUS_PID.search(path)
+            if match and int(match.group(1)) != os.getpid() and not _process_running(int(match.group(1))):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Removed by another process, or still being replaced
+
+    def _before_fork(self):
+        with self._lock:
+            self._jsonl.flush()  # Lines still buffered would otherwise be written by both processes
+
+    def _after_fork_in_child(self):
+        self._lock = threading.Lock()
+        self._written_at = time.monotonic()
+        self.durations = {}
+        self.counters = defaultdict(float)
+
+    @property
+    def prometheus_path(self) -> str:
+        """This process's Prometheus file; looked up per flush so forked workers get their own"""
+        return os.path.join(self.directory, PROMETHEUS_FILE.format(pid=os.getpid()))
+
+    def span(self, name: str, attrs: dict) -> Span:
+        return Span(self, name, attrs)
+
+    def record(self, name: str, seconds: float, attrs: dict):
+        labels = (("stage", name),) + tuple((key, str(attrs[key])) for key in LABELS if key in attrs)
+        line = json.dumps({"ts": round(time.time(), 3), "stage": name,
+                           "duration_ms": round(seconds * 1000, 3), **attrs}, default=str)
+        with self._lock:
+            histogram = self.durations.get(labels)
+            if histogram is None:
+                histogram = self.durations[labels] = [0] * len(BUCKETS) + [0, 0.0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+            if "cache_hit" in attrs:
+                result = "hit" if attrs["cache_hit"] else "miss"
+                self.counters[("catia_ai_cache_lookups_total", labels + (("result", result),))] += 1
+            if attrs.get("fallback_reason"):
+                reason = (("reason", str(attrs["fallback_reason"])),)
+                self.counters[("catia_ai_fallbacks_total", labels + reason)] += 1
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if attrs.get(kind):
+                    self.counters[("catia_ai_tokens_total", labels + (("kind", kind[:-7]),))] += attrs[kind]
+            if "error" in attrs:
+                self.counters[("catia_ai_errors_total", labels)] += 1
+
+            self._jsonl.write(line + "\n")
+            due = time.monotonic() - self._written_at >= self.prometheus_interval
+        if due:
+            self.flush()
+
+    def prometheus_text(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        def fmt(labels):
+            return ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+
+        lines = ["# HELP catia_ai_stage_duration_seconds Time spent in each pipeline stage",
+                 "# TYPE catia_ai_stage_duration_seconds histogram"]
+        with self._lock:
+            for labels, histogram in sorted(self.durations.items()):
+                for bound, count in zip(BUCKETS, histogram):
+                    lines.append(f'catia_ai_stage_duration_seconds_bucket{{{fmt(labels)},le="{bound}"}} {count}')
+                lines.append(f'catia_ai_stage_duration_seconds_bucket{{{fmt(labels)},le="+Inf"}} {histogram[-2]}')
+                lines.append(f"catia_ai_stage_duration_seconds_sum{{{fmt(labels)}}} {histogram[-1]:.6f}")
+                lines.append(f"catia_ai_stage_duration_seconds_count{{{fmt(labels)}}} {histogram[-2]}")
+            declared = set()
+            for (metric, labels), value in sorted(self.counters.items()):
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} counter")
+                    declared.add(metric)
+                lines.append(f"{metric}{{{fmt(labels)}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Flush JSON lines and rewrite the Prometheus file"""
+        text = self.prometheus_text()
+        with self._lock:
+            self._jsonl.flush()
+            self._written_at = time.monotonic()
+        path = self.prometheus_path
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Writing metrics failed: {e}")
+
+    def close(self):
+        """Flush the JSON lines and remove this process's Prometheus file"""
+        with self._lock:
+            self._jsonl.close()
+        try:
+            os.remove(self.prometheus_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Removing metrics failed: {e}")
+
+_recorder: Optional[Recorder] = None
+
+def configure(directory: Optional[str]) -> Optional[Recorder]:
+    """Enable metrics export to a directory, or disable metrics with None"""
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+    if directory:
+        try:
+            _recorder = Recorder(directory)
+        except OSError as e:
+            print(f"Metrics disabled: {e}")
+    return _recorder
+
+def span(name: str, **attrs):
+    """Context manager that times a pipeline stage (a no-op while metrics are disabled)"""
+    recorder = _recorder
+    if recorder is None:
+        return NOOP_SPAN
+    return recorder.span(name, attrs)
+
+def record(name: str, seconds: float, **attrs):
+    """Record a stage that was timed elsewhere, e.g. across UI callbacks"""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.record(name, seconds, attrs)
+
+def enabled() -> bool:
+    return _recorder is not None
+
+@atexit.register
+def _flush_at_exit():
+    configure(None)
+
+def _before_fork():
+    if _recorder is not None:
+        _recorder._before_fork()
+
+def _after_fork_in_child():
+    if _recorder is not None:
+        _recorder._after_fork_in_child()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_before_fork, after_in_child=_after_fork_in_child)
+
+if os.getenv("CATIA_AI_METRICS_DIR"):
+    configure(os.getenv("CATIA_AI_METRICS_DIR"))
@@ -0,0 +1,262 @@
+"""
+CATIA V5 AI Code Generator - Offline Backend
+Answers requests without a model: splits the description into operations, looks up a
+code fragment for each in the snippet library and stitches them into one macro
+"""
+
+import re
+from dataclasses import dataclass, field
+from string import Template
+from typing import Dict, List, Optional, Tuple
+
+from backends import Backend, BackendError
+from intent_index import IntentIndex
+from param_parser import AmbiguousDimensions, assign, normalize, request_unit
+from snippet_library import (ACTIVE_PROVIDERS, CLOSERS, DEFAULT_PROVIDERS, SNIPPETS, Snippet)
+
+# A clause ends at punctuation, "then", or an "and" that starts a new operation
+_CLAUSE_SPLIT = re.compile(
+    r"[;\n]|\.(?=\s|$)|,|\bthen\b|\band\s+(?=(?:add|create|draw|make|pad|extrude|pocket|cut|fillet|"
+    r"chamfer|drill|revolve|save|insert|sketch)\b)", re.IGNORECASE)
+_NUMBER = re.compile(r"(?<![\w.])(\d+(?:\.\d+)?)\s*(mm|cm|m|in|inch|inches|\")?(?![\w.])", re.IGNORECASE)
+_BY = re.compile(r"(\d)\s*[x\u00d7*]\s*(?=\d)", re.IGNORECASE)
+_UNIT_MM = {None: 1.0, "mm": 1.0, "cm": 10.0, "m": 1000.0, "in": 25.4, "inch": 25.4, "inches": 25.4, '"': 25.4}
+_PLANE = re.compile(r"\b(xy|yz|zx|xz)\b", re.IGNORECASE)
+_NAME = re.compile(r"\b(?:called|named)\s+[\"']?([A-Za-z_][\w.-]*)", re.IGNORECASE)
+_VIEW = re.compile(r"\b(front|top|bottom|left|right|side|rear|isometric)\s+view\b", re.IGNORECASE)
+_FILE = re.compile(r"\b([\w-]+)\.catpart\b", re.IGNORECASE)
+_WORD = re.compile(r"[a-z]{3,}")
+_CUBE = re.compile(r"\bcubes?\b", re.IGNORECASE)
+
+# A snippet must score at least this much against a clause to be used for it
+MIN_SCORE = 2.0
+# Longer requests are assembled from their first clauses only and left to the AI backends
+MAX_CLAUSES = 40
+
+@dataclass
+class Assembly:
+    """A macro stitched together from snippets"""
+    code: str
+    operations: List[str]
+    clauses: int
+    unmatched: List[str] = field(default_factory=list)
+    truncated: bool = False
+
+    @property
+    def complete(self) -> bool:
+        """True when every operation in the request was recognised"""
+        return not self.unmatched and not self.truncated
+
+    @property
+    def coverage(self) -> float:
+        return 1.0 - len(self.unmatched) / self.clauses if self.clauses else 0.0
+
+def split_clauses(description: str) -> List[str]:
+    return [clause.strip() for clause in _CLAUSE_SPLIT.split(description) if clause and clause.strip()]
+
+def numbers_in(clause: str) -> List[float]:
+    """Numbers in a clause converted to millimetres ("2 cm" -> 20.0)"""
+    values = []
+    for number, unit in _NUMBER.findall(_BY.sub(r"\1 x ", clause)):
+        values.append(float(number) * _UNIT_MM[unit.lower() if unit else None])
+    return values
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+class _Macro:
+    """Variable bindings and emitted lines while one macro is being assembled"""
+
+    def __init__(self, language: str, providers: Dict[str, str], library: Dict[str, Snippet]):
+        self.language = language
+        self.column = 0 if language == "VBA" else 1
+        self.providers = providers
+        self.library = library
+        self.bindings: Dict[str, str] = {}
+        self.used_names: Dict[str, int] = {}
+        self.lines: List[str] = []
+        self.open_context: Optional[Tuple[str, Dict[str, str]]] = None
+        self.operations: List[str] = []
+
+    def new_name(self, base: str) -> str:
+        count = self.used_names.get(base.lower(), 0) + 1
+        self.used_names[base.lower()] = count
+        return base if count == 1 else f"{base}{count}"
+
+    def close_context(self):
+        if self.open_context:
+            role, names = self.open_context
+            self.lines.append(Template(CLOSERS[role][self.language]).substitute(names))
+            self.bindings.pop(role, None)
+            self.open_context = None
+
+    def emit(self, snippet: Snippet, values: Dict[str, object]):
+        for role in snippet.requires:
+            if role not in self.bindings:
+                provider = self.library[self.providers[role]]
+                self.emit(provider, values)
+        if self.open_context and self.open_context[0] not in snippet.requires:
+            self.close_context()
+
+        names = {role: self.bindings[role] for role in snippet.requires}
+        provided = {role: self.new_name(bases[self.column]) for role, bases in snippet.provides.items()}
+        names.update(provided)
+
+        params = {name: values.get(name, default) for name, default in snippet.params}
+        params.update(values)
+        if snippet.derive:
+            params.update(snippet.derive(params))
+        mapping = {key: _format(value) for key, value in params.items() if value is not None}
+        mapping.update(names)
+
+        for line in snippet.code[self.language].split("\n"):
+            try:
+                self.lines.append(Template(line).substitute(mapping))
+            except KeyError:
+                continue  # Optional line whose parameter has no value
+        self.operations.append(snippet.name)
+
+        for role in snippet.consumes:
+            self.bindings.pop(role, None)
+        self.bindings.update(provided)
+        if snippet.opens:
+            self.open_context = (snippet.opens, dict(names))
+
+class OfflineBackend(Backend):
+    """Retrieval-and-assembly generator that needs no network or GPU
+
+    Each clause of the description ("draw a 120 x 40 mm rectangle", "pad it 15 mm")
+    is matched against the snippet library with an intent index, numbers and units are
+    taken from the clause as parameters, and the fragments are stitched into one macro:
+    missing prerequisites (a part, a sketch) are inserted, variables are shared between
+    fragments and renamed when an operation repeats, and sketches are closed before
+    the features that use them.
+    """
+
+    name = "offline"
+
+    def __init__(self, snippets: Optional[List[Snippet]] = None):
+        self.library = {snippet.name: snippet for snippet in (snippets or SNIPPETS)}
+        self.index = IntentIndex.from_keywords(
+            {snippet.name: snippet.keywords for snippet in self.library.values() if snippet.keywords})
+
+    def match(self, clause: str) -> List[Snippet]:
+        """Snippets for a clause, expanded and in stage order"""
+        matched: Dict[str, Snippet] = {}
+        for name, score in self.index.rank(clause):
+            if score < MIN_SCORE:
+                break
+            snippet = self.library[name]
+            for part in snippet.expands or (name,):
+                matched.setdefault(part, self.library[part])
+        return sorted(matched.values(), key=lambda snippet: snippet.stage)
+
+    def clause_values(self, clause: str) -> Dict[str, object]:
+        values: Dict[str, object] = {"clause": clause.lower()}
+        plane = _PLANE.search(clause)
+        values["plane"] = {"XZ": "ZX"}.get(plane.group(1).upper(), plane.group(1).upper()) if plane else "XY"
+        name = _NAME.search(clause)
+        if name:
+            values["part_name"] = values["component_name"] = values["view_name"] = name.group(1)
+        view = _VIEW.search(clause)
+        if view:
+            values["view_name"] = f"{view.group(1).title()} View"
+        file_match = _FILE.search(clause)
+        if file_match:
+            values["file_name"] = file_match.group(1) + ".CATPart"
+        return values
+
+    def assemble(self, description: str, language: str = "VBA") -> Optional[Assembly]:
+        """Build a macro for the description, or None if no operation was recognised
+        or its dimensions cannot be told apart ("a hole 8 mm diameter 20 mm")"""
+        language = "VBA" if language.upper() == "VBA" else "Python"
+        steps = []
+        unmatched = []
+        clauses = split_clauses(description)
+        truncated = len(clauses) > MAX_CLAUSES
+        clauses = clauses[:MAX_CLAUSES]
+        unit = None
+        for clause in clauses:
+            snippets = self.match(clause)
+            if not snippets:
+                if _WORD.search(clause.lower()):
+                    unmatched.append(clause)
+                continue
+            # Labelled numbers ("diameter 6") fill the parameter they name, the rest go in order
+            unit = unit or request_unit("\n".join(clauses))
+            try:
+                assigned = assign(normalize(clause), [(snippet.name, [name for name, _ in snippet.params])
+                                                      for snippet in snippets], unit)
+            except AmbiguousDimensions:
+                return None
+            cube = _CUBE.search(clause) is not None
+            for snippet, params in zip(snippets, assigned):
+                if (cube and snippet.name == "pad" and "length" not in params
+                        and steps and steps[-1][0].name == "rectangle"):
+                    # A cube is as tall as it is wide, like param_parser's cubes
+                    rectangle, rectangle_values = steps[-1]
+                    params["length"] = rectangle_values.get("width", dict(rectangle.params)["width"])
+                values = self.clause_values(clause)
+                values.update(params)
+                steps.append((snippet, values))
+        if not steps:
+            return None
+
+        providers = dict(DEFAULT_PROVIDERS)
+        if steps[0][0].modifies:
+            providers.update(ACTIVE_PROVIDERS)
+        macro = _Macro(language, providers, self.library)
+        defaults = {"component_name": "Part1", "view_name": "Front View"}
+        for snippet, values in steps:
+            values = {**defaults, **values}
+            values.setdefault("file_name", f"{values.get('part_name') or 'Part1'}.CATPart")
+            macro.emit(snippet, values)
+        macro.close_context()
+
+        return Assembly(self.render(description, macro, unmatched), macro.operations,
+                        len(clauses), unmatched, truncated)
+
+    def render(self, description: str, macro: _Macro, unmatched: List[str]) -> str:
+        summary = " ".join(description.split())
+        if len(summary) > 100:
+            summary = summary[:97] + "..."
+        if macro.language == "VBA":
+            lines = ["' Assembled offline from the CATIA snippet library",
+                     f"' Request: {summary}",
+                     "Sub CATMain()"]
+            lines += [f"    ' Not recognised: {clause}" for clause in unmatched]
+            lines += macro.lines
+            if "part" in macro.bindings:
+                lines.append(f"    {macro.bindings['part']}.Update")
+            lines.append("End Sub")
+        else:
+            lines = ['"""Assembled offline from the CATIA snippet library', "",
+                     f"Request: {summary.replace(chr(34) * 3, '')}", '"""', "",
+                     "import win32com.client", "", "def main():",
+                     '    catia = win32com.client.Dispatch("CATIA.Application")']
+            lines += [f"    # Not recognised: {clause}" for clause in unmatched]
+            lines += macro.lines
+            if "part" in macro.bindings:
+                lines.append(f"    {macro.bindings['part']}.Update()")
+            lines += ["", 'if __name__ == "__main__":', "    main()"]
+        return "\n".join(lines) + "\n"
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        """Backend interface: assemble from the prompt's description line"""
+        match = re.search(r"^Description: (.+)$", prompt, re.MULTILINE)
+        language = "Python" if re.match(r"\s*Generate Python\b", prompt) else "VBA"
+        assembly = self.assemble(match.group(1) if match else prompt, language)
+        if assembly is None:
+            raise BackendError("No operation in the request matches the snippet library")
+        return assembly.code
+
+_offline_backend: Optional[OfflineBackend] = None
+
+def get_offline_backend() -> OfflineBackend:
+    """Return the process-wide offline backend (the snippet index is built once)"""
+    global _offline_backend
+    if _offline_backend is None:
+        _offline_backend = OfflineBackend()
+    return _offline_backend
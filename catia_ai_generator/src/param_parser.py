@@ -0,0 +1,601 @@
+"""
+CATIA V5 AI Code Generator - Parameter Parser
+Pulls shapes, dimensions, units, planes and operations out of a description and
+compiles them to VBA or Python for the basic code templates
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+UNITS_MM = {"mm": 1.0, "cm": 10.0, "m": 1000.0, "in": 25.4}
+
+_BY = re.compile(r"(\d)\s*[x×*]\s*(?=\d)", re.IGNORECASE)
+_QUANTITY = re.compile(
+    r"(?<![\w.])(?:([rdø⌀])\s*[=:]?\s*)?((?:\d+\s+)?\d+/[1-9]\d*|\d+(?:\.\d+)?)"
+    r"(?:\s*(mm|millimet(?:er|re)s?|cm|centimet(?:er|re)s?|met(?:er|re)s?|m"
+    r"|inch(?:es)?|in(?!\s+(?:the|a|an|this|that|front|place)\b)|\"|°|deg(?:ree)?s?))?(?![\w./])",
+    re.IGNORECASE)
+_PAIR = re.compile(r"\s*(?:x|×|\*|by)\s*$", re.IGNORECASE)
+_NEXT_WORD = re.compile(r"\s*([a-z]+)\b")
+# What may stand between a label and its number: "radius: 5", "r = 5", "diameter of about 8"
+_GAP = re.compile(r"(?:[\s:=]+|(?:of|is|to|about|around|approximately)\b)*")
+_WORD = re.compile(r"[a-z]+", re.IGNORECASE)
+_DIGIT = re.compile(r"\d")
+_CLAUSE_SPLIT = re.compile(
+    r"[;\n]|\.(?=\s|$)|,|\bthen\b|\band\s+(?=(?:add|create|draw|make|pad|extrude|pocket|cut|fillet|"
+    r"chamfer|drill|revolve|sketch)\b)", re.IGNORECASE)
+_PLANE = re.compile(r"\b(xy|yz|zx|xz)\b", re.IGNORECASE)
+_NAME = re.compile(r"\b(?:called|named)\s+[\"']?([A-Za-z_][\w.-]*)", re.IGNORECASE)
+
+# Words that say what a number measures, before it ("radius 5") or after it ("5 mm deep")
+LABEL_WORDS = {
+    "width": "width", "wide": "width", "length": "length", "long": "length",
+    "height": "height", "high": "height", "tall": "height", "depth": "depth", "deep": "depth",
+    "thickness": "thickness", "thick": "thickness", "radius": "radius", "diameter": "diameter",
+    "dia": "diameter", "angle": "angle", "degrees": "angle",
+}
+_PREFIX_LABELS = {"r": "radius", "d": "diameter", "ø": "diameter", "⌀": "diameter"}
+_FILLER = frozenset(("of", "is", "to", "about", "around", "approximately"))
+
+# Words naming a shape or an operation; a box is a padded rectangle, a cylinder a padded circle
+FEATURE_WORDS = {
+    word: kinds
+    for words, kinds in [
+        ("rectangle rectangles rectangular square squares", ("rectangle",)),
+        ("circle circles circular disc discs disk disks", ("circle",)),
+        ("line lines segment segments", ("line",)),
+        ("box boxes block blocks cube cubes plate plates", ("rectangle", "pad")),
+        ("cylinder cylinders rod rods pin pins", ("circle", "pad")),
+        ("pad pads padded extrude extrudes extruded extruding extrusion", ("pad",)),
+        ("pocket pockets pocketed cut cuts cutout cutouts", ("pocket",)),
+        ("hole holes drill drills drilled bore bores", ("hole",)),
+        ("fillet fillets filleted round rounded", ("fillet",)),
+        ("chamfer chamfers chamfered bevel bevels bevelled", ("chamfer",)),
+        ("revolve revolves revolved revolution shaft", ("shaft",)),
+    ]
+    for word in words.split()
+}
+
+# Plural feature words: a bare whole number before one is a count ("3 holes"), not a size
+COUNTED_WORDS = frozenset(word for word in FEATURE_WORDS
+                          if word.endswith("s") and (word[:-1] in FEATURE_WORDS or word[:-2] in FEATURE_WORDS))
+
+# Only the start of very long descriptions is parsed; pasted specifications go to the AI
+MAX_LENGTH = 4000
+MAX_CLAUSES = 40
+
+# Parameters of each feature in the order bare numbers fill them, and the labels (with a
+# conversion factor) that name each one. Keys also cover the snippet library's names.
+PARAMETERS = {
+    "rectangle": ("width", "height"),
+    "circle": ("diameter",),
+    "line": ("length",),
+    "pad": ("length",),
+    "pocket": ("depth",),
+    "shaft": ("angle",),
+    "hole": ("diameter", "depth"),
+    "fillet": ("radius",),
+    "chamfer": ("length", "angle"),
+}
+LABELS = {
+    "rectangle": {"width": {"width": 1.0, "length": 1.0}, "height": {"height": 1.0, "length": 1.0}},
+    "circle": {"diameter": {"diameter": 1.0, "radius": 2.0}, "size": {"diameter": 1.0, "radius": 2.0}},
+    "line": {"length": {"length": 1.0}},
+    "pad": {"length": {"thickness": 1.0, "height": 1.0, "depth": 1.0, "length": 1.0}},
+    "pocket": {"depth": {"depth": 1.0, "thickness": 1.0, "height": 1.0, "length": 1.0}},
+    "shaft": {"angle": {"angle": 1.0}},
+    "hole": {"diameter": {"diameter": 1.0, "radius": 2.0}, "depth": {"depth": 1.0, "length": 1.0}},
+    "fillet": {"radius": {"radius": 1.0, "diameter": 0.5}},
+    "chamfer": {"length": {"length": 1.0, "width": 1.0}, "angle": {"angle": 1.0}},
+}
+OPERATIONS = frozenset(("pad", "pocket", "shaft", "hole", "fillet", "chamfer"))
+STAGES = {"rectangle": 20, "circle": 20, "line": 20, "pad": 30, "pocket": 30, "shaft": 30,
+          "hole": 40, "fillet": 50, "chamfer": 50}
+DEFAULTS = {
+    "rectangle": {"width": 50.0}, "circle": {"diameter": 20.0}, "line": {"length": 50.0},
+    "pad": {"length": 20.0}, "pocket": {"depth": 10.0}, "shaft": {"angle": 360.0},
+    "hole": {"diameter": 10.0, "depth": 20.0}, "fillet": {"radius": 2.0},
+    "chamfer": {"length": 1.0, "angle": 45.0},
+}
+
+class AmbiguousDimensions(ValueError):
+    """The numbers in a request cannot be matched to what they measure with confidence"""
+
+@dataclass(frozen=True)
+class Quantity:
+    value: float                 # Millimetres, or degrees for angles
+    label: Optional[str] = None  # What it measures, when the request says so
+    start: int = 0
+    end: int = 0
+    paired: bool = False         # Second number of "50 x 30"
+    unit: Optional[str] = None   # As written: mm, cm, m, in or deg
+    ambiguous: bool = False      # A label between two numbers could name either
+
+@dataclass
+class Feature:
+    kind: str
+    params: Dict[str, float] = field(default_factory=dict)
+
+    def get(self, name: str) -> float:
+        value = self.params.get(name)
+        return DEFAULTS[self.kind].get(name) if value is None else value
+
+    def describe(self) -> str:
+        if self.kind == "rectangle":
+            return f"{self.get('width'):g} x {self.params.get('height', self.get('width')):g} mm rectangle"
+        if self.kind in ("circle", "hole"):
+            text = f"{self.kind} of diameter {self.get('diameter'):g} mm"
+            return text + (f", {self.get('depth'):g} mm deep" if self.kind == "hole" else "")
+        if self.kind == "shaft":
+            return f"shaft of {self.get('angle'):g} degrees"
+        if self.kind == "chamfer":
+            return f"chamfer {self.get('length'):g} mm at {self.get('angle'):g} degrees"
+        return f"{self.kind} {self.get(PARAMETERS[self.kind][0]):g} mm"
+
+@dataclass
+class ParsedRequest:
+    features: List[Feature]
+    plane: str = "XY"
+    part_name: Optional[str] = None
+    ambiguous: bool = False      # Some dimension could not be bound to a parameter with confidence
+
+    @property
+    def shapes(self) -> List[Feature]:
+        return [feature for feature in self.features if feature.kind not in OPERATIONS]
+
+    @property
+    def operations(self) -> List[Feature]:
+        return [feature for feature in self.features if feature.kind in OPERATIONS]
+
+    def summary(self) -> str:
+        features = "; ".join(feature.describe() for feature in self.features)
+        return f"{features} on the {self.plane} plane" if self.shapes else features
+
+def normalize(text: str) -> str:
+    """Spell out "50x30" as "50 x 30" so both numbers are found"""
+    return _BY.sub(r"\1 x ", text)
+
+@lru_cache(maxsize=64)
+def _unit_key(unit: Optional[str]) -> Optional[str]:
+    if not unit:
+        return None
+    unit = unit.lower()
+    if unit in ("°",) or unit.startswith("deg"):
+        return "deg"
+    if unit.startswith("milli"):
+        return "mm"
+    if unit.startswith("centi"):
+        return "cm"
+    if unit.startswith("met"):
+        return "m"
+    if unit.startswith("in") or unit == '"':
+        return "in"
+    return unit
+
+def _single_unit(units) -> str:
+    units = set(units) - {None, "deg"}
+    return units.pop() if len(units) == 1 else "mm"
+
+def request_unit(description: str) -> str:
+    """The length unit for bare numbers: the only unit the request uses, else millimetres"""
+    return _single_unit(_unit_key(match.group(3)) for match in _QUANTITY.finditer(normalize(description)))
+
+def _to_float(text: str) -> float:
+    """3, 2.5, 1/2 or 1 1/2"""
+    whole, _, fraction = text.rpartition(" ") if "/" in text else ("", "", text)
+    if "/" in fraction:
+        numerator, denominator = fraction.split("/")
+        return float(whole or 0) + int(numerator) / int(denominator)
+    return float(fraction)
+
+def _label_before(lower: str, start: int) -> Optional[Tuple[int, str]]:
+    """(position, label) of a label word just before a number, skipping fillers, ':' and '='"""
+    window = max(0, start - 40)
+    for match in reversed(list(_WORD.finditer(lower, window, start))):
+        if match.group() in _FILLER:
+            continue
+        if match.start() == window and window and lower[window - 1].isalpha():
+            return None  # Cut off by the window
+        label = LABEL_WORDS.get(match.group())
+        if label and _GAP.fullmatch(lower, match.end(), start):
+            return match.start(), label
+        return None
+    return None
+
+def _label_after(lower: str, end: int) -> Optional[Tuple[int, str]]:
+    """(position, label) of a label word right after a number and its unit ("20 mm deep")"""
+    match = _NEXT_WORD.match(lower, end)
+    label = LABEL_WORDS.get(match.group(1)) if match else None
+    return (match.start(1), label) if label else None
+
+def _bind_labels(raw: List[list]) -> None:
+    """Decide which number each label word names; raw rows are [label, before, after, ambiguous]
+
+    A label word between two numbers ("8 mm diameter 20 mm deep", "diameter 8 mm depth
+    20 mm") is read the way the rest of the request is written: it names the next number
+    when the previous one has its own label in front, the previous number when the next
+    one has its own label behind, and is ambiguous otherwise.
+    """
+    count = len(raw)
+    shared = [i + 1 < count and raw[i][2] is not None and raw[i + 1][1] is not None
+              and raw[i][2][0] == raw[i + 1][1][0] for i in range(count)]
+    goes_next = [False] * count
+    goes_prev = [False] * count
+    for i in range(count):
+        if not shared[i]:
+            continue
+        before_own = raw[i][0] is not None or (raw[i][1] is not None and not (i and shared[i - 1]))
+        after_own = raw[i + 1][0] is not None or (raw[i + 1][2] is not None and not shared[i + 1])
+        if before_own and not after_own:
+            goes_next[i] = True
+        elif after_own and not before_own:
+            goes_prev[i] = True
+        elif not before_own:
+            raw[i][3] = raw[i + 1][3] = True
+    for i, row in enumerate(raw):
+        if row[0] is not None or row[3]:
+            continue
+        before = row[1] if row[1] is not None and (not i or not shared[i - 1] or goes_next[i - 1]) else None
+        after = row[2] if row[2] is not None and (not shared[i] or goes_prev[i]) else None
+        if before and after and before[1] != after[1]:
+            row[3] = True  # "diameter 8 mm deep"
+        else:
+            row[0] = (before or after or (None, None))[1]
+
+def quantities(text: str, unit: str = "mm") -> List[Quantity]:
+    """Numbers in normalized text in millimetres (degrees for angles), with what they measure
+
+    Counts ("3 holes") are left out. A label may come before its number ("radius 5",
+    "r=5", "ø8") or after it ("20 mm deep").
+    """
+    lower = text.lower()
+    raw = []  # [value, unit, start, end, paired]
+    labels = []  # [label, before, after, ambiguous]
+    for match in _QUANTITY.finditer(text):
+        prefix, number, written = match.groups()
+        if not prefix and not written and number.isdigit():
+            following = _NEXT_WORD.match(lower, match.end())
+            if following and following.group(1) in COUNTED_WORDS:
+                continue
+        key = _unit_key(written)
+        label = "angle" if key == "deg" else _PREFIX_LABELS.get((prefix or "").lower())
+        # "50 x 30 mm": the unit after a pair applies to both numbers
+        paired = bool(raw) and _PAIR.match(text, raw[-1][3], match.start()) is not None
+        if paired and key and raw[-1][1] is None:
+            raw[-1][1] = key
+        raw.append([_to_float(number), key, match.start(), match.end(), paired])
+        if label:
+            labels.append([label, None, None, False])
+        else:
+            labels.append([None, _label_before(lower, match.start()), _label_after(lower, match.end()), False])
+    _bind_labels(labels)
+    found = []
+    for (value, key, start, end, paired), (label, _, _, ambiguous) in zip(raw, labels):
+        factor = 1.0 if key == "deg" else UNITS_MM.get(key or unit, 1.0)
+        found.append(Quantity(value * factor, label, start, end, paired, key, ambiguous))
+    return found
+
+def feature_positions(text: str) -> List[Tuple[int, int, Tuple[str, ...]]]:
+    """(start, end, kinds) of every word naming a shape or an operation"""
+    positions = []
+    for match in _WORD.finditer(text):
+        kinds = FEATURE_WORDS.get(match.group().lower())
+        if kinds:
+            positions.append((match.start(), match.end(), kinds))
+    return positions
+
+def _owners(text: str, found: List[Quantity], positions) -> List[Optional[int]]:
+    """The feature word each number belongs to: the one fewest words away, the one before on a tie"""
+    starts = [start for start, _, _ in positions]
+    owners: List[Optional[int]] = []
+    for n, quantity in enumerate(found):
+        if quantity.paired and owners:
+            owners.append(owners[-1])
+            continue
+        last = n
+        while last + 1 < len(found) and found[last + 1].paired:
+            last += 1
+        index = bisect_right(starts, quantity.start)
+        candidates = []
+        if index > 0:
+            start, end, _ = positions[index - 1]
+            candidates.append((len(_WORD.findall(text, end, quantity.start)), 0, start))
+        if index < len(positions) and positions[index][0] >= found[last].end:
+            start, _, _ = positions[index]
+            candidates.append((len(_WORD.findall(text, found[last].end, start)), 1, start))
+        owners.append(min(candidates)[2] if candidates else None)
+    return owners
+
+def assign(text: str, features: Sequence[Tuple[str, Sequence[str]]], unit: str = "mm") -> List[Dict[str, float]]:
+    """Values for the parameters of each feature mentioned in one clause of normalized text
+
+    A number belongs to the feature word fewest words away, "50 x 30" counting as one
+    number: "a 50x30 rectangle extruded 20 mm", "a cube with a 10 mm hole". Numbers named by a label
+    ("radius 5", "10 mm deep") go to a parameter with that label, operations first, so
+    the height of a box is its pad length; bare numbers then fill the parameters in
+    order, and numbers left over go to any feature with parameters still open.
+    Raises AmbiguousDimensions when a label could name either of two numbers.
+    """
+    if not _DIGIT.search(text) or not any(params for _, params in features):
+        return [{} for _ in features]
+    found = quantities(text, unit)
+    if any(quantity.ambiguous for quantity in found):
+        raise AmbiguousDimensions(text)
+    return _assign(text, features, found, feature_positions(text))
+
+def _assign(text: str, features, found: List[Quantity], positions) -> List[Dict[str, float]]:
+    if not found:
+        return [{} for _ in features]
+    homes = [{start for start, _, kinds in positions if kind in kinds} for kind, _ in features]
+    owners = _owners(text, found, positions)
+
+    values: List[Dict[str, float]] = [{} for _ in features]
+    used = [False] * len(found)
+
+    def take(index: int, param: str, labelled: bool, local: bool):
+        kind = features[index][0]
+        if labelled:
+            for label, factor in LABELS.get(kind, {}).get(param, {}).items():
+                for n, quantity in enumerate(found):
+                    if not used[n] and quantity.label == label and (not local or owners[n] in homes[index]):
+                        used[n] = True
+                        values[index][param] = quantity.value * factor
+                        return
+        else:
+            for n, quantity in enumerate(found):
+                if not used[n] and quantity.label is None and (not local or owners[n] in homes[index]):
+                    used[n] = True
+                    values[index][param] = quantity.value
+                    return
+
+    operations = [n for n, (kind, _) in enumerate(features) if kind in OPERATIONS]
+    shapes = [n for n, (kind, _) in enumerate(features) if kind not in OPERATIONS]
+    for local in (True, False):
+        for labelled, order in ((True, operations), (True, shapes), (False, range(len(features)))):
+            for index in order:
+                for param in features[index][1]:
+                    if param not in values[index]:
+                        take(index, param, labelled, local)
+    return values
+
+def parse(description: str) -> ParsedRequest:
+    """Shapes and operations with their dimensions, the sketch plane and the part name"""
+    description = description[:MAX_LENGTH]
+    text = normalize(description)
+    # Numbers and feature words are found once, then handed out clause by clause
+    found = quantities(text)
+    unit = _single_unit(quantity.unit for quantity in found)
+    if unit != "mm":
+        found = [replace(quantity, value=quantity.value * UNITS_MM[unit]) if quantity.unit is None else quantity
+                 for quantity in found]
+    positions = feature_positions(text)
+    number_starts = [quantity.start for quantity in found]
+    word_starts = [start for start, _, _ in positions]
+
+    features = []
+    clause_start = 0
+    clauses = 0
+    for boundary in [*_CLAUSE_SPLIT.finditer(text), None]:
+        clause_end = boundary.start() if boundary else len(text)
+        words = positions[bisect_left(word_starts, clause_start):bisect_left(word_starts, clause_end)]
+        if text[clause_start:clause_end].strip():
+            clauses += 1
+        if words:
+            kinds = []
+            for _, _, found_kinds in words:
+                kinds.extend(kind for kind in found_kinds if kind not in kinds)
+            # "... and extrude it to make a box": the box is the shape already drawn
+            shape_words = [found_kinds for _, _, found_kinds in words if found_kinds[0] not in OPERATIONS]
+            if (shape_words and all(len(found_kinds) > 1 for found_kinds in shape_words)
+                    and features and features[-1].kind not in OPERATIONS):
+                kinds = [kind for kind in kinds if kind in OPERATIONS]
+            kinds.sort(key=STAGES.get)
+            numbers = found[bisect_left(number_starts, clause_start):bisect_left(number_starts, clause_end)]
+            assigned = _assign(text, [(kind, PARAMETERS[kind]) for kind in kinds], numbers, words)
+            cube = any(text[start:end].lower() in ("cube", "cubes") for start, end, _ in words)
+            for kind, params in zip(kinds, assigned):
+                if cube and kind == "pad" and "length" not in params and features and features[-1].kind == "rectangle":
+                    params["length"] = features[-1].get("width")
+                features.append(Feature(kind, params))
+        if boundary is None or clauses >= MAX_CLAUSES:
+            break
+        clause_start = boundary.end()
+    plane = _PLANE.search(description)
+    name = _NAME.search(description)
+    return ParsedRequest(features,
+                         {"XZ": "ZX"}.get(plane.group(1).upper(), plane.group(1).upper()) if plane else "XY",
+                         name.group(1) if name else None,
+                         any(quantity.ambiguous for quantity in found))
+
+# Variables each basic template already declares before its custom code
+TEMPLATE_SCOPES = {
+    "part_creation": {"VBA": {"doc": "partDoc"}, "Python": {"doc": "part_doc"}},
+    "sketch_creation": {"VBA": {"doc": "partDoc", "part": "part", "body": "body", "sketches": "sketches"},
+                        "Python": {"doc": "part_doc", "part": "part", "body": "body", "sketches": "sketches"}},
+    "extrude_operation": {"VBA": {"doc": "partDoc", "part": "part", "body": "body"},
+                          "Python": {"doc": "part_doc", "part": "part", "body": "body"}},
+}
+
+class _Code:
+    """Lines of VBA or Python being written into a template, and the variables in scope"""
+
+    def __init__(self, language: str, names: Dict[str, str]):
+        self.vba = language == "VBA"
+        self.indent = " " * (4 if self.vba else 8)
+        self.names = dict(names)
+        self.counts: Dict[str, int] = {}
+        self.lines: List[str] = []
+        self.editing: Optional[str] = None   # Sketch whose edition is open
+        self.profile: Optional[str] = None   # Closed sketch no feature has used yet
+        self.solid: Optional[str] = None     # Last solid feature
+
+    def line(self, text: str = ""):
+        self.lines.append(self.indent + text if text else "")
+
+    def comment(self, text: str):
+        self.line(("' " if self.vba else "# ") + text)
+
+    def call(self, target: str, method: str, *args):
+        arguments = ", ".join(_number(arg) for arg in args)
+        self.line(f"{target}.{method} {arguments}".rstrip() if self.vba else f"{target}.{method}({arguments})")
+
+    def new(self, base: str, vba_type: str, expression: str) -> str:
+        count = self.counts[base] = self.counts.get(base, 0) + 1
+        name = base if count == 1 else f"{base}{count}"
+        if self.vba:
+            self.line(f"Dim {name} As {vba_type}")
+            self.line(f"Set {name} = {expression}")
+        else:
+            self.line(f"{name} = {expression}")
+        return name
+
+    def role(self, role: str) -> str:
+        """Variable for a role, declared the first time it is needed"""
+        if role not in self.names:
+            if role == "part":
+                self.names[role] = self.new("part", "Part", f"{self.names['doc']}.Part")
+            elif role == "body":
+                self.names[role] = self.new("body", "Body", f"{self.role('part')}.MainBody")
+            else:
+                self.names[role] = self.new("shapeFactory" if self.vba else "shape_factory", "ShapeFactory",
+                                            f"{self.role('part')}.ShapeFactory")
+        return self.names[role]
+
+    def open_sketch(self, plane: str) -> str:
+        if self.editing is None:
+            part = self.role("part")
+            sketches = self.names.get("sketches") or f"{self.role('body')}.Sketches"
+            self.comment(f"Sketch on the {plane} plane")
+            sketch = self.new("sketch", "Sketch", f"{sketches}.Add({part}.OriginElements.Plane{plane})")
+            self.editing = sketch
+            self.names["factory2d"] = self.new("factory2D" if self.vba else "factory_2d", "Factory2D",
+                                               f"{sketch}.OpenEdition()")
+        return self.names["factory2d"]
+
+    def close_sketch(self):
+        if self.editing is not None:
+            self.call(self.editing, "CloseEdition")
+            self.profile, self.editing = self.editing, None
+
+    def take_profile(self) -> str:
+        """The sketch a pad or pocket uses: the one just drawn, else the last in the body"""
+        self.close_sketch()
+        if self.profile is None:
+            body = self.role("body")
+            self.comment("Use the last sketch of the body")
+            self.profile = self.new("sketch", "Sketch", f"{body}.Sketches.Item({body}.Sketches.Count)")
+        profile, self.profile = self.profile, None
+        return profile
+
+    def take_solid(self) -> str:
+        if self.solid is None:
+            body = self.role("body")
+            self.solid = self.new("shape", "Shape", f"{body}.Shapes.Item({body}.Shapes.Count)")
+        return self.solid
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        text = f"{value:.4f}".rstrip("0").rstrip(".")
+        return "0" if text == "-0" else text
+    return str(value)
+
+def _edge_treatment(code: _Code, feature: Feature):
+    """Fillet or chamfer on every edge of the last solid feature"""
+    solid = code.take_solid()
+    factory = code.role("factory")
+    nothing = "Nothing" if code.vba else "None"
+    if feature.kind == "fillet":
+        code.comment(f"Constant radius fillet on the edges of {solid} (1 = tangency propagation)")
+        treatment = code.new("fillet", "ConstRadEdgeFillet",
+                             f"{factory}.AddNewSolidEdgeFilletWithConstantRadius({nothing}, 1, "
+                             f"{_number(feature.get('radius'))})")
+        add = "AddObjectToFillet"
+    else:
+        code.comment(f"Length/angle chamfer on the edges of {solid} (1 = tangency propagation)")
+        treatment = code.new("chamfer", "Chamfer",
+                             f"{factory}.AddNewChamfer({nothing}, 1, 0, 0, {_number(feature.get('length'))}, "
+                             f"{_number(feature.get('angle'))})")
+        add = "AddElementToChamfer"
+    selection = code.names.get("selection") or code.new("selection", "Selection", f"{code.names['doc']}.Selection")
+    code.names["selection"] = selection
+    code.call(selection, "Clear")
+    code.call(selection, "Add", solid)
+    code.call(selection, "Search", '"Topology.REdge,sel"')
+    if code.vba:
+        if "index" not in code.names:
+            code.line("Dim i As Integer")
+            code.names["index"] = "i"
+        code.line(f"For i = 1 To {selection}.Count")
+        code.line(f"    {treatment}.{add} {selection}.Item(i).Reference")
+        code.line("Next")
+    else:
+        code.line(f"for i in range(1, {selection}.Count + 1):")
+        code.line(f"    {treatment}.{add}({selection}.Item(i).Reference)")
+    code.call(selection, "Clear")
+
+def to_code(parsed: ParsedRequest, language: str = "VBA", template_type: str = "sketch_creation") -> str:
+    """Code for the custom code placeholder of a basic template"""
+    language = "VBA" if language.upper() == "VBA" else "Python"
+    code = _Code(language, TEMPLATE_SCOPES[template_type][language])
+    # Guessed geometry is worse than none: leave the template's own code and say why
+    features = [] if parsed.ambiguous else list(parsed.features)
+    if parsed.ambiguous:
+        code.comment("The dimensions in the request could not be matched to shapes; add the geometry here")
+    elif template_type == "extrude_operation" and not any(f.kind in ("pad", "pocket", "shaft") for f in features):
+        features.append(Feature("pad"))
+    if features:
+        code.comment(f"Parsed from the request: {ParsedRequest(features, parsed.plane).summary()}")
+
+    if template_type == "part_creation":
+        doc = code.names["doc"]
+        code.line(f'{doc}.Product.PartNumber = "{parsed.part_name or "GeneratedPart"}"')
+        code.line(f'{doc}.Product.Revision = "A"')
+    elif template_type == "sketch_creation" and not parsed.shapes:
+        code.open_sketch(parsed.plane)
+
+    for feature in features:
+        kind = feature.kind
+        if kind == "rectangle":
+            factory2d = code.open_sketch(parsed.plane)
+            half_width = feature.get("width") / 2
+            half_height = feature.params.get("height", feature.get("width")) / 2
+            code.comment("Rectangle centred on the origin")
+            for x1, y1, x2, y2 in ((-1, -1, 1, -1), (1, -1, 1, 1), (1, 1, -1, 1), (-1, 1, -1, -1)):
+                code.call(factory2d, "CreateLine", x1 * half_width, y1 * half_height,
+                          x2 * half_width, y2 * half_height)
+        elif kind == "circle":
+            code.call(code.open_sketch(parsed.plane), "CreateClosedCircle", 0, 0, feature.get("diameter") / 2)
+        elif kind == "line":
+            code.call(code.open_sketch(parsed.plane), "CreateLine", 0, 0, feature.get("length"), 0)
+        elif kind in ("pad", "pocket", "shaft"):
+            profile = code.take_profile()
+            factory = code.role("factory")
+            if kind == "pad":
+                code.solid = code.new("pad", "Pad", f"{factory}.AddNewPad({profile}, {_number(feature.get('length'))})")
+            elif kind == "pocket":
+                code.solid = code.new("pocket", "Pocket",
+                                      f"{factory}.AddNewPocket({profile}, {_number(feature.get('depth'))})")
+            else:
+                part = code.role("part")
+                code.solid = code.new("shaft", "Shaft", f"{factory}.AddNewShaft({profile})")
+                code.line(f"{code.solid}.FirstAngle.Value = {_number(feature.get('angle'))}")
+                code.line(f"{code.solid}.RevoluteAxis = "
+                          f"{part}.CreateReferenceFromObject({profile}.AbsoluteAxis.HorizontalReference)")
+        elif kind == "hole":
+            code.close_sketch()
+            part = code.role("part")
+            factory = code.role("factory")
+            hole = code.new("hole", "Hole",
+                            f"{factory}.AddNewHoleFromPoint(0, 0, 0, {part}.CreateReferenceFromObject("
+                            f"{part}.OriginElements.Plane{parsed.plane}), {_number(feature.get('depth'))})")
+            code.line(f"{hole}.Diameter.Value = {_number(feature.get('diameter'))}")
+        else:
+            code.close_sketch()
+            _edge_treatment(code, feature)
+    code.close_sketch()
+    if "part" in code.names:
+        code.line(f"{code.names['part']}.Update" + ("" if code.vba else "()"))
+    return "\n" + "\n".join(code.lines) + "\n"
@@ -0,0 +1,28 @@
+"""
+CATIA V5 AI Code Generator - Local Paths
+Shared locations for on-disk caches used by the CLI and GUIs
+"""
+
+import os
+from typing import Optional
+
+
+def get_cache_dir(subdir: Optional[str] = None) -> Optional[str]:
+    """Return (and create) the cache directory, or None if it is not writable
+
+    The location can be overridden with the CATIA_AI_CACHE_DIR environment variable.
+    """
+    base_dir = os.getenv("CATIA_AI_CACHE_DIR")
+    if not base_dir:
+        if os.name == "nt":
+            root = os.getenv("LOCALAPPDATA") or os.path.expanduser("~")
+        else:
+            root = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        base_dir = os.path.join(root, "catia_ai_generator")
+
+    directory = os.path.join(base_dir, subdir) if subdir else base_dir
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        return None
+    return directory
@@ -0,0 +1,205 @@
+"""
+CATIA V5 AI Code Generator - Prompt Builder
+Builds model prompts from the sections that apply to a request and keeps them within a
+token budget
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from macro_index import estimate_tokens
+
+# Instructions shared by every request. Everything before the examples and the
+# description only depends on (language, complexity), so the prefix stays byte-identical
+# between requests and provider-side prompt caching can reuse it.
+BASE_SECTION = """Generate {language} code for the requirement at the end of this message.
+
+Requirements:
+1. Generate clean, well-commented code
+2. Include error handling where appropriate
+3. Use CATIA V5 best practices
+4. Make the code modular and reusable
+5. Only return the code, no additional explanation
+"""
+
+LANGUAGE_SECTIONS = {
+    "VBA": """
+VBA:
+- Use proper CATIA V5 object model
+- Include necessary variable declarations
+- Use appropriate error handling
+- Put the entry point in Sub CATMain()
+""",
+    "Python": """
+Python:
+- Use win32com.client for COM interface
+- Include try/except blocks
+- Follow Python best practices
+""",
+}
+
+COMPLEXITY_SECTIONS = {
+    "basic": """
+Complexity: basic
+- A single short procedure that does exactly what is asked
+""",
+    "intermediate": """
+Complexity: intermediate
+- Split the work into a few helper procedures with parameters
+- Validate that the active document has the expected type
+""",
+    "advanced": """
+Complexity: advanced
+- Structure the code into reusable procedures with parameters
+- Validate inputs and report failures with clear messages
+- Clean up partially created geometry when a step fails
+""",
+}
+
+EXAMPLES_HEADER = "\nRelevant examples from our existing macros (follow their conventions):\n"
+
+# Completion budget per complexity level, instead of one fixed ceiling for every request
+MAX_TOKENS_BY_COMPLEXITY = {"basic": 800, "intermediate": 1400, "advanced": 2000}
+DEFAULT_MAX_TOKENS = 2000
+
+DEFAULT_INPUT_BUDGET = 1500
+# A truncated description keeps at least this much, even if the budget is tighter
+MIN_DESCRIPTION_TOKENS = 64
+
+class Tokenizer:
+    """Counts model tokens with tiktoken when it is installed, otherwise estimates them"""
+
+    def __init__(self, model: str):
+        self.name = "estimate"
+        self._encoding = None
+        try:
+            import tiktoken
+            self._encoding = tiktoken.encoding_for_model(model)
+            self.name = self._encoding.name
+        except ImportError:
+            pass
+        except Exception as e:
+            print(f"Token counting falls back to estimates: {e}")
+
+    def count(self, text: str) -> int:
+        if self._encoding is None:
+            return estimate_tokens(text)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, tokens: int) -> str:
+        """The longest prefix of text that fits in the given number of tokens"""
+        if tokens <= 0:
+            return ""
+        if self._encoding is None:
+            return text[:tokens * 4]
+        encoded = self._encoding.encode(text, disallowed_special=())
+        return text if len(encoded) <= tokens else self._encoding.decode(encoded[:tokens])
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model: str) -> Tokenizer:
+    """Return the shared tokenizer for a model (loading an encoding is slow)"""
+    return Tokenizer(model)
+
+@dataclass
+class Prompt:
+    """A built prompt with its token accounting"""
+    text: str
+    prefix: str
+    tokens: int
+    max_tokens: int
+    budget: int
+    examples: int = 0
+    truncated: bool = False
+    sections: List[str] = field(default_factory=list)
+
+class PromptBuilder:
+    """Assembles prompts from the sections for a request's language and complexity
+
+    The static prefix comes first and the request-specific parts (few-shot examples,
+    then the description) last. The description is always kept, truncated only if it
+    does not fit ``input_budget`` next to the prefix; examples get whatever budget remains.
+    """
+
+    def __init__(self, model: str, input_budget: int = DEFAULT_INPUT_BUDGET,
+                 example_budget: int = 600, tokenizer: Optional[Tokenizer] = None):
+        self.model = model
+        self.input_budget = input_budget
+        self.example_budget = example_budget
+        self.tokenizer = tokenizer or get_tokenizer(model)
+        self._prefixes: Dict[Tuple[str, str], Tuple[str, int, List[str]]] = {}
+
+    @staticmethod
+    def language(name: str) -> str:
+        return "VBA" if name.upper() == "VBA" else "Python"
+
+    @staticmethod
+    def max_tokens(complexity: str) -> int:
+        return MAX_TOKENS_BY_COMPLEXITY.get(complexity, DEFAULT_MAX_TOKENS)
+
+    def prefix(self, language: str, complexity: str) -> Tuple[str, int, List[str]]:
+        """The static prefix for a language and complexity, with its token count and sections"""
+        key = (self.language(language), complexity)
+        cached = self._prefixes.get(key)
+        if cached is None:
+            sections = ["base", f"language:{key[0]}"]
+            text = BASE_SECTION.format(language=key[0]) + LANGUAGE_SECTIONS[key[0]]
+            if complexity in COMPLEXITY_SECTIONS:
+                sections.append(f"complexity:{complexity}")
+                text += COMPLEXITY_SECTIONS[complexity]
+            cached = self._prefixes[key] = (text, self.tokenizer.count(text), sections)
+        return cached
+
+    def example_budget_for(self, language: str, complexity: str, description: str) -> int:
+        """Tokens left for examples once the prefix and description are in"""
+        prefix_tokens = self.prefix(language, complexity)[1]
+        used = prefix_tokens + self.tokenizer.count(self.description_section(description))
+        return max(0, min(self.example_budget, self.input_budget - used))
+
+    @staticmethod
+    def description_section(description: str) -> str:
+        return f"\nDescription: {description}\n"
+
+    def build(self, description: str, language: str, complexity: str,
+              examples: Iterable[str] = ()) -> Prompt:
+        """Build a prompt that fits the input budget"""
+        description = " ".join(description.split())
+        prefix, prefix_tokens, sections = self.prefix(language, complexity)
+        count = self.tokenizer.count
+
+        truncated = False
+        description_tokens = count(self.description_section(description))
+        if prefix_tokens + description_tokens > self.input_budget:
+            # Leave a few tokens for the section label around the description
+            room = max(MIN_DESCRIPTION_TOKENS,
+                       self.input_budget - prefix_tokens - count(self.description_section("")))
+            shortened = self.tokenizer.truncate(description, room)
+            truncated = shortened != description
+            description = shortened
+            description_tokens = count(self.description_section(description))
+
+        tokens = prefix_tokens + description_tokens
+        remaining = min(self.example_budget, self.input_budget - tokens)
+        example_text = ""
+        included = 0
+        for example in examples:
+            block = f"\n```\n{example}\n```\n"
+            cost = count(block) + (0 if included else count(EXAMPLES_HEADER))
+            if cost > remaining:
+                break
+            example_text += block if included else EXAMPLES_HEADER + block
+            remaining -= cost
+            tokens += cost
+            included += 1
+
+        text = prefix + example_text + self.description_section(description)
+        return Prompt(
+            text=text,
+            prefix=prefix,
+            tokens=tokens,
+            max_tokens=self.max_tokens(complexity),
+            budget=self.input_budget,
+            examples=included,
+            truncated=truncated,
+            sections=sections + (["examples"] if included else []) + ["description"]
+        )
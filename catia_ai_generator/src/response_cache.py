@@ -0,0 +1,225 @@
+"""
+CATIA V5 AI Code Generator - Response Cache
+Content-addressed, cross-process cache of AI responses backed by SQLite in WAL mode
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from paths import get_cache_dir
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Hit/miss counters and access times are written in batches, not on every lookup
+ACCOUNTING_BATCH = 100
+ACCOUNTING_INTERVAL = 30.0
+
+def normalize_request(description: str, language: str = "VBA", complexity: Optional[str] = "basic") -> Dict:
+    """Normalize request fields so trivially different requests share a cache entry"""
+    return {
+        "description": re.sub(r"\s+", " ", description).strip(),
+        "language": "VBA" if language.upper() == "VBA" else "Python",
+        "complexity": complexity.lower() if complexity else None
+    }
+
+def make_key(backend: str, request: Dict, prompt: str, model: str, params: Dict) -> str:
+    """Build a content address from the normalized request, prompt, model and sampling parameters"""
+    payload = json.dumps({
+        "backend": backend,
+        "request": request,
+        "prompt": prompt,
+        "model": model,
+        "params": params
+    }, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """SQLite-backed response cache with LRU eviction, TTL and hit/miss counters
+
+    The database runs in WAL mode so the CLI, the GUIs and the assistant can read and
+    write the same file concurrently. Lookups are plain reads that never wait for the
+    write lock; the hits, misses and access times they produce are kept in memory and
+    written with the next ``put``, every ``ACCOUNTING_BATCH`` lookups or
+    ``ACCOUNTING_INTERVAL`` seconds, and by ``flush``. Counters are stored in the
+    database, so they reflect every process using the cache.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl: Optional[float] = DEFAULT_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        self._hits = 0
+        self._misses = 0
+        self._touched: Dict[str, float] = {}
+        self._accounted_at = time.monotonic()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _count(self, name: str, amount: int = 1):
+        self._conn.execute(
+            "INSERT INTO counters(name, value) VALUES(?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+    def _write_accounting(self):
+        """Write the pending counters and access times; the caller holds a write transaction"""
+        hits, misses, touched = self._hits, self._misses, self._touched
+        self._hits = self._misses = 0
+        self._touched = {}
+        self._accounted_at = time.monotonic()
+        if hits:
+            self._count("hits", hits)
+        if misses:
+            self._count("misses", misses)
+        if touched:
+            self._conn.executemany("UPDATE responses SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                                   [(when, key) for key, when in touched.items()])
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl is not None and now - row[1] > self.ttl:
+                row = None  # Deleted by the next put's eviction
+            if row is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._touched[key] = now
+            due = (self._hits + self._misses >= ACCOUNTING_BATCH
+                   or time.monotonic() - self._accounted_at >= ACCOUNTING_INTERVAL)
+        if due:
+            self.flush()
+        return row[0] if row else None
+
+    def flush(self):
+        """Write the batched hit/miss counters and access times"""
+        if not (self._hits or self._misses or self._touched):
+            return
+        try:
+            with self._transaction():
+                self._write_accounting()
+        except sqlite3.Error as e:
+            print(f"Writing cache counters failed: {e}")
+
+    def put(self, key: str, value: str):
+        """Store a value and evict expired and least recently used entries"""
+        now = time.time()
+        with self._transaction():
+            self._write_accounting()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses(key, value, size, created_at, accessed_at) "
+                "VALUES(?, ?, ?, ?, ?)", (key, value, len(value.encode("utf-8")), now, now))
+            self._evict(now)
+
+    def _evict(self, now: float):
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        for _ in evicted:
+            self._count("evictions")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current size of the cache"""
+        self.flush()
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "entries": count,
+            "bytes": total
+        }
+
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        with self._transaction():
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("DELETE FROM counters")
+            self._hits = self._misses = 0
+            self._touched = {}
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the shared on-disk cache, or None if it is disabled or unavailable
+
+    Set CATIA_AI_RESPONSE_CACHE=off to disable caching.
+    """
+    global _shared_cache
+    if os.getenv("CATIA_AI_RESPONSE_CACHE", "").lower() in ("0", "off", "false", "no"):
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            directory = get_cache_dir()
+            if not directory:
+                return None
+            try:
+                _shared_cache = ResponseCache(os.path.join(directory, "responses.sqlite3"))
+            except sqlite3.Error as e:
+                print(f"Response cache unavailable: {e}")
+                return None
+            atexit.register(_shared_cache.flush)
+        return _shared_cache
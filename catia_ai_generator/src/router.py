@@ -0,0 +1,195 @@
+"""
+CATIA V5 AI Code Generator - Backend Router
+Sends each request to the fastest healthy backend, failing over on errors and hedging
+slow calls with a duplicate request to the runner-up
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import metrics
+from backends import Backend
+
+class NoBackendAvailable(Exception):
+    """Raised when every backend failed (callers fall back to local templates)"""
+
+class BackendStats:
+    """EWMA latency and error rate of one backend, plus recent latencies for hedging"""
+
+    def __init__(self, alpha: float = 0.2, window: int = 100):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples: deque = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self.last_failure: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, ok: bool, seconds: float, now: float):
+        with self._lock:
+            self.calls += 1
+            self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+            if ok:
+                self.samples.append(seconds)
+                if self.latency is None:
+                    self.latency = seconds
+                else:
+                    self.latency += self.alpha * (seconds - self.latency)
+            else:
+                self.failures += 1
+                self.last_failure = now
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+@dataclass
+class RoutedResponse:
+    text: str
+    backend: str
+    latency: float
+    hedged: bool = False
+    errors: List[str] = field(default_factory=list)
+
+class Router:
+    """Routes completions across backends by observed latency and error rate
+
+    Backends whose error-rate EWMA is above ``max_error_rate`` are skipped until
+    ``probe_after`` seconds after their last failure, when one request may probe them
+    again. Backends that have not answered yet are tried first so every backend gets
+    measured, and every ``explore_every``-th request goes to the runner-up first so a
+    backend that had one slow call is not ignored forever. With ``hedge`` on, a request
+    still running after the primary's ``hedge_quantile`` latency is duplicated to the
+    next backend and the first answer wins; the slower call finishes in the background
+    and still updates the stats.
+    """
+
+    def __init__(self, backends: Sequence[Backend], alpha: float = 0.2,
+                 max_error_rate: float = 0.5, probe_after: float = 30.0,
+                 hedge: bool = True, hedge_quantile: float = 0.95, min_hedge_samples: int = 5,
+                 min_hedge_delay: float = 0.01, explore_every: int = 20,
+                 clock: Callable[[], float] = time.monotonic):
+        self.backends = list(backends)
+        self.max_error_rate = max_error_rate
+        self.probe_after = probe_after
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_samples = min_hedge_samples
+        self.min_hedge_delay = min_hedge_delay
+        self.explore_every = explore_every
+        self.requests = 0
+        self.clock = clock
+        self.stats: Dict[str, BackendStats] = {backend.name: BackendStats(alpha) for backend in self.backends}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def names(self) -> List[str]:
+        return [backend.name for backend in self.backends]
+
+    def healthy(self, backend: Backend) -> bool:
+        stats = self.stats[backend.name]
+        if stats.error_rate <= self.max_error_rate:
+            return True
+        return stats.last_failure is None or self.clock() - stats.last_failure >= self.probe_after
+
+    def ranked(self) -> List[Backend]:
+        """Healthy backends fastest first, then unhealthy ones as a last resort"""
+        def speed(backend):
+            latency = self.stats[backend.name].latency
+            return (latency is not None, latency or 0.0)
+
+        healthy = sorted((b for b in self.backends if self.healthy(b)), key=speed)
+        unhealthy = sorted((b for b in self.backends if not self.healthy(b)),
+                           key=lambda b: self.stats[b.name].error_rate)
+        return healthy + unhealthy
+
+    def hedge_delay(self, backend: Backend) -> Optional[float]:
+        """How long to wait for a backend before hedging, or None to not hedge"""
+        stats = self.stats[backend.name]
+        if not self.hedge or len(stats.samples) < self.min_hedge_samples:
+            return None
+        return max(self.min_hedge_delay, stats.quantile(self.hedge_quantile))
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Room for concurrent callers (async generation, the daemon) and for hedged
+                # calls still finishing in the background; threads are only started on demand
+                self._pool = ThreadPoolExecutor(max_workers=32 + 4 * len(self.backends),
+                                                thread_name_prefix="router")
+            return self._pool
+
+    def _call(self, backend: Backend, prompt: str, max_tokens: int) -> str:
+        start = self.clock()
+        try:
+            text = backend.complete(prompt, max_tokens)
+        except BaseException:
+            self.stats[backend.name].record(False, self.clock() - start, self.clock())
+            raise
+        self.stats[backend.name].record(True, self.clock() - start, self.clock())
+        return text
+
+    def complete(self, prompt: str, max_tokens: int) -> RoutedResponse:
+        """Return the first successful completion, trying backends fastest first"""
+        with metrics.span("route") as span:
+            queue = self.ranked()
+            if not queue:
+                raise NoBackendAvailable("No AI backend is configured")
+            self.requests += 1
+            if (self.explore_every and self.requests % self.explore_every == 0
+                    and len(queue) > 1 and self.healthy(queue[1])):
+                queue[0], queue[1] = queue[1], queue[0]
+
+            start = self.clock()
+            pending: Dict[Future, Backend] = {}
+            errors: List[str] = []
+            hedged = False
+
+            def launch():
+                backend = queue.pop(0)
+                pending[self.pool.submit(self._call, backend, prompt, max_tokens)] = backend
+
+            launch()
+            while pending:
+                timeout = None
+                if not hedged and queue and len(pending) == 1:
+                    delay = self.hedge_delay(next(iter(pending.values())))
+                    if delay is not None:
+                        timeout = max(0.0, delay - (self.clock() - start))
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    launch()
+                    continue
+                for future in done:
+                    backend = pending.pop(future)
+                    try:
+                        text = future.result()
+                    except Exception as e:
+                        errors.append(f"{backend.name}: {e}")
+                        continue
+                    span.set(backend=backend.name, hedged=hedged, failovers=len(errors))
+                    return RoutedResponse(text, backend.name, self.clock() - start, hedged, errors)
+                if not pending and queue:
+                    launch()  # Fail over to the next backend right away
+
+            span.set(failovers=len(errors))
+            raise NoBackendAvailable("; ".join(errors))
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+        for backend in self.backends:
+            backend.close()
@@ -0,0 +1,298 @@
+"""
+CATIA V5 AI Code Generator - Semantic Cache
+Serves cached AI responses for reworded requests, matched by SimHash with LSH buckets
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import weakref
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from intent_index import stem
+from param_parser import PARAMETERS, AmbiguousDimensions, assign, normalize, parse, quantities, request_unit
+from response_cache import ResponseCache
+from templates import TEMPLATE_SYNONYMS
+
+BITS = 64
+BANDS = 4
+BAND_BITS = BITS // BANDS
+# With 4 bands, two signatures at most 3 bits apart always share a band
+DEFAULT_MAX_DISTANCE = BANDS - 1
+
+_MASK = (1 << BITS) - 1
+_BAND_MASK = (1 << BAND_BITS) - 1
+_NUMBER_TEXT = re.compile(r"\d+(?:\.\d+)?(?:\s*[x×*]\s*\d+(?:\.\d+)?)*", re.IGNORECASE)
+_WORD = re.compile(r"[a-z]+")
+_LITERAL = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+
+# Words that do not change what is being asked for ("create a" / "make me a"), and units,
+# which are folded into the dimensions
+STOP_WORDS = frozenset("""
+    a an the of to in on at by with and or for from into onto it its this that these is are be as
+    then also some please can could would you i me my we our us want need like should
+    create make add draw generate build write give get do new using use code macro script
+    vba python catia v5 x mm cm m inch inches millimeter millimeters millimetre millimetres
+""".split())
+
+# (label, millimetres) sorted by label: "hole1.diameter" for a number bound to what it
+# measures, "?0", "?1"... in order of appearance when the request cannot be bound
+Dimensions = Tuple[Tuple[str, float], ...]
+
+@dataclass(frozen=True)
+class Signature:
+    simhash: int
+    dims: Dimensions
+    scope: Tuple[str, Optional[str]]  # (language, complexity)
+
+@dataclass
+class SimilarHit:
+    code: str
+    key: str
+    distance: int
+    substituted: bool = False
+
+@lru_cache(maxsize=4096)
+def _feature_votes(term: str) -> Tuple[int, ...]:
+    """+1/-1 per bit of the term's 64-bit hash"""
+    value = int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "big")
+    return tuple(1 if value >> bit & 1 else -1 for bit in range(BITS))
+
+def terms(description: str) -> List[str]:
+    """Content words of a description, stemmed and with synonyms folded"""
+    text = _NUMBER_TEXT.sub(" ", description.lower())
+    words = (stem(word) for word in _WORD.findall(text) if word not in STOP_WORDS)
+    return sorted({TEMPLATE_SYNONYMS.get(word, word) for word in words if word not in STOP_WORDS})
+
+def simhash(features: List[str]) -> int:
+    if not features:
+        return 0
+    counts = map(sum, zip(*(_feature_votes(feature) for feature in features)))
+    return sum(1 << bit for bit, count in enumerate(counts) if count > 0)
+
+def dimensions(description: str) -> Dimensions:
+    """Numbers of a request keyed by what they measure, so that word order does not matter"""
+    text = normalize(description)
+    unit = request_unit(description)
+    found = quantities(text, unit)
+    if not found:
+        return ()
+    features = [(feature.kind, PARAMETERS[feature.kind]) for feature in parse(description).features]
+    try:
+        assigned = assign(text, features, unit)
+    except AmbiguousDimensions:
+        assigned = []
+    labelled = []
+    counts: Dict[str, int] = {}
+    for (kind, _), params in zip(features, assigned):
+        counts[kind] = counts.get(kind, 0) + 1
+        labelled.extend((f"{kind}{counts[kind]}.{param}", value) for param, value in params.items())
+    if len(labelled) < len(found):
+        return tuple((f"?{n}", quantity.value) for n, quantity in enumerate(found))
+    return tuple(sorted(labelled))
+
+def _unbound(dims: Dimensions) -> bool:
+    return any(label.startswith("?") for label, _ in dims)
+
+def signature(description: str, language: str = "VBA", complexity: Optional[str] = "basic",
+              with_dims: bool = True) -> Signature:
+    """Word-order independent fingerprint of a request; its dimensions must match exactly"""
+    scope = ("VBA" if language.upper() == "VBA" else "Python", complexity.lower() if complexity else None)
+    return Signature(simhash(terms(description)), dimensions(description) if with_dims else (), scope)
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def resubstitute(code: str, old: Dimensions, new: Dimensions) -> Optional[str]:
+    """Swap old dimensions for new ones in code, or None when that is not unambiguous
+
+    Only done when both requests measure the same things ("hole1.diameter",
+    "hole1.depth"), every number in both is bound to what it measures, the old values
+    are all different, the new ones are not the old ones reordered (which literal is
+    which cannot be told from the code), and every dimension that changes appears in
+    the code exactly once as a literal; derived values (a half width) or a repeated
+    literal make it unsafe.
+    """
+    if old == new:
+        return code
+    before_values, after_values = dict(old), dict(new)
+    if (before_values.keys() != after_values.keys() or _unbound(old)
+            or len(set(before_values.values())) != len(old)
+            or sorted(before_values.values()) == sorted(after_values.values())):
+        return None
+    changes = {before_values[label]: after_values[label] for label in before_values
+               if before_values[label] != after_values[label]}
+    literals = _LITERAL.findall(code)
+    for before in changes:
+        if sum(1 for literal in literals if float(literal) == before) != 1:
+            return None
+
+    def swap(match):
+        value = float(match.group(0))
+        return f"{changes[value]:g}" if value in changes else match.group(0)
+
+    return _LITERAL.sub(swap, code)
+
+def _load_dims(stored: str) -> Dimensions:
+    dims = json.loads(stored)
+    # Rows written before dimensions were labelled hold bare numbers in order
+    return tuple((f"?{n}", dim) if isinstance(dim, (int, float)) else (dim[0], dim[1])
+                 for n, dim in enumerate(dims))
+
+class SemanticIndex:
+    """In-memory SimHash index over past requests
+
+    Each signature is split into ``BANDS`` bands of 16 bits, and each band value is a
+    bucket. A lookup only compares the query with entries sharing a bucket, so its cost
+    depends on bucket sizes (about n / 65536 per band) rather than on the number of
+    entries: well under a millisecond at a million entries.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.entries: List[Optional[Tuple[str, Signature]]] = []
+        self.positions: Dict[str, int] = {}
+        self.buckets: List[Dict[int, List[int]]] = [{} for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add(self, key: str, sig: Signature):
+        self.remove(key)
+        position = len(self.entries)
+        self.entries.append((key, sig))
+        self.positions[key] = position
+        for band, bucket in enumerate(self.buckets):
+            bucket.setdefault(sig.simhash >> (band * BAND_BITS) & _BAND_MASK, []).append(position)
+
+    def remove(self, key: str):
+        position = self.positions.pop(key, None)
+        if position is not None:
+            self.entries[position] = None  # Bucket lists skip removed entries
+
+    def candidates(self, sig: Signature) -> List[Tuple[int, str, Signature]]:
+        """(distance, key, signature) of entries within ``max_distance``, nearest first"""
+        seen = set()
+        found = []
+        for band, bucket in enumerate(self.buckets):
+            for position in bucket.get(sig.simhash >> (band * BAND_BITS) & _BAND_MASK, ()):
+                if position in seen:
+                    continue
+                seen.add(position)
+                entry = self.entries[position]
+                if entry is None or entry[1].scope != sig.scope:
+                    continue
+                bits = distance(entry[1].simhash, sig.simhash)
+                if bits <= self.max_distance:
+                    found.append((bits, -position, entry))
+        found.sort(key=lambda item: item[:2])  # Nearest, then most recent
+        return [(bits, key, other) for bits, _, (key, other) in found]
+
+class SemanticCache:
+    """Near-duplicate lookup in front of the response cache
+
+    Maps the signature of every request answered by the AI to the response cache key
+    of its answer, in a table next to the responses. A reworded request ("sketch a
+    rectangle 50 by 30 mm" after "create a 50x30 rectangle sketch") with the same
+    dimensions, matched by what they measure rather than by position, gets the stored
+    code; with different dimensions, only when they can be swapped in safely (see
+    ``resubstitute``). The index is loaded into memory on first
+    use; entries added by other processes afterwards are seen by the next process.
+    """
+
+    def __init__(self, cache: ResponseCache, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.cache = cache
+        self.index = SemanticIndex(max_distance)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _open(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.cache.path, timeout=5.0, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS similar (
+                    key TEXT PRIMARY KEY,
+                    simhash INTEGER NOT NULL,
+                    dims TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    complexity TEXT
+                )""")
+            # Forget requests whose responses were evicted or cleared
+            conn.execute("DELETE FROM similar WHERE key NOT IN (SELECT key FROM responses)")
+            for key, value, dims, language, complexity in conn.execute(
+                    "SELECT key, simhash, dims, language, complexity FROM similar ORDER BY rowid"):
+                self.index.add(key, Signature(value & _MASK, _load_dims(dims), (language, complexity)))
+            self._conn = conn
+        return self._conn
+
+    def get(self, description: str, language: str = "VBA",
+            complexity: Optional[str] = "basic") -> Optional[SimilarHit]:
+        """Return the code of a near-duplicate request, or None"""
+        sig = signature(description, language, complexity, with_dims=False)
+        if not sig.simhash:
+            return None  # Nothing but numbers and filler words to compare
+        with self._lock:
+            self._open()
+            candidates = self.index.candidates(sig)
+        if not candidates:
+            return None
+        # Binding numbers to what they measure costs more than the lookup itself
+        sig = replace(sig, dims=dimensions(description))
+        # Same dimensions first, then ones that can be substituted
+        candidates.sort(key=lambda item: item[2].dims != sig.dims)
+        for bits, key, other in candidates:
+            code = self.cache.get(key)
+            if code is None:
+                with self._lock:
+                    self.index.remove(key)
+                continue
+            if other.dims == sig.dims:
+                return SimilarHit(code, key, bits)
+            substituted = resubstitute(code, other.dims, sig.dims)
+            if substituted is not None:
+                return SimilarHit(substituted, key, bits, substituted=True)
+        return None
+
+    def put(self, description: str, language: str, complexity: Optional[str], key: str):
+        """Remember the response cache key of the answer to a request"""
+        sig = signature(description, language, complexity)
+        if not sig.simhash:
+            return
+        stored = sig.simhash - (1 << BITS) if sig.simhash >> (BITS - 1) else sig.simhash  # SQLite is signed
+        with self._lock:
+            conn = self._open()
+            conn.execute("INSERT OR REPLACE INTO similar(key, simhash, dims, language, complexity) "
+                         "VALUES(?, ?, ?, ?, ?)", (key, stored, json.dumps(sig.dims), *sig.scope))
+            self.index.add(key, sig)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._open()
+            return len(self.index)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_semantic_caches: "weakref.WeakKeyDictionary[ResponseCache, SemanticCache]" = weakref.WeakKeyDictionary()
+_semantic_lock = threading.Lock()
+
+def get_semantic_cache(cache: Optional[ResponseCache]) -> Optional[SemanticCache]:
+    """Return the semantic cache in front of ``cache``, or None if there is none
+
+    Set CATIA_AI_SEMANTIC_CACHE=off to only serve exact repeats from the response cache.
+    """
+    if cache is None or os.getenv("CATIA_AI_SEMANTIC_CACHE", "").lower() in ("0", "off", "false", "no"):
+        return None
+    with _semantic_lock:
+        if cache not in _semantic_caches:
+            _semantic_caches[cache] = SemanticCache(cache)
+        return _semantic_caches[cache]
@@ -0,0 +1,136 @@
+"""
+CATIA V5 AI Code Generator - Single Flight
+Coalesces concurrent identical generation requests into one upstream call
+"""
+
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+class StreamAbandoned(Exception):
+    """The caller leading a shared stream stopped reading before it finished"""
+
+class _Call:
+    """An in-flight call that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.chunks: List[str] = []  # Streamed calls: text so far, for late joiners
+        self.changed = threading.Condition()
+
+class SingleFlight:
+    """Thread-safe single-flight group
+
+    While a call for a key is running, other threads calling ``do`` with the same key
+    wait for it and receive the same result (or exception) instead of starting their
+    own call. ``stream`` does the same for calls that yield text chunks: followers get
+    the chunks received so far and then each new one as it arrives, and a ``do`` for
+    the same key gets the joined text.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def _join(self, key: str):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.executions += 1
+            return call, True
+
+    def _finish(self, key: str, call: _Call):
+        with self._lock:
+            del self._calls[key]
+        with call.changed:
+            call.done.set()
+            call.changed.notify_all()
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        call, leader = self._join(key)
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = func()
+            except BaseException as e:
+                call.error = e
+            finally:
+                self._finish(key, call)
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stream(self, key: str, func: Callable[[], Iterator[str]]) -> Iterator[str]:
+        call, leader = self._join(key)
+        if leader:
+            try:
+                for chunk in func():
+                    with call.changed:
+                        call.chunks.append(chunk)
+                        call.changed.notify_all()
+                    yield chunk
+                call.result = "".join(call.chunks)
+            except GeneratorExit:
+                call.error = StreamAbandoned(key)
+                raise
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                self._finish(key, call)
+            return
+
+        seen = 0
+        while True:
+            with call.changed:
+                while len(call.chunks) == seen and not call.done.is_set():
+                    call.changed.wait()
+                chunks = call.chunks[seen:]
+                finished = call.done.is_set()
+            seen += len(chunks)
+            yield from chunks
+            if finished:
+                break
+        if call.error is not None:
+            raise call.error
+        if not seen and call.result:
+            yield call.result  # The leader was a ``do`` call
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+class AsyncSingleFlight:
+    """Single-flight group for coroutines running on one event loop
+
+    The shared call runs as its own task and waiters are shielded from it, so one
+    caller being cancelled does not cancel the call for everyone else.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, "asyncio.Task"] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        import asyncio  # deferred so the threaded GUI/CLI path does not import asyncio
+
+        task = self._tasks.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = self._tasks[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._tasks)}
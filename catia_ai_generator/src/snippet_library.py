@@ -0,0 +1,378 @@
+"""
+CATIA V5 AI Code Generator - Snippet Library
+Code fragments for single modelling operations, assembled into macros by the offline backend
+
+Placeholders use ``$name`` (string.Template syntax, as neither VBA nor Python code
+uses ``$``). Roles are variables shared between fragments: ``requires`` lists the
+roles a fragment reads and ``provides`` the roles it creates, with the base variable
+name for VBA and Python. Parameters are filled from the numbers in the request, in
+order, and lines that use a parameter without a value are left out.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+@dataclass(frozen=True)
+class Snippet:
+    name: str
+    keywords: Dict[str, float]
+    code: Dict[str, str]
+    requires: Tuple[str, ...] = ()
+    provides: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    params: Tuple[Tuple[str, Optional[float]], ...] = ()
+    derive: Optional[Callable[[dict], dict]] = None
+    opens: Optional[str] = None       # Role of an editing context that must be closed afterwards
+    consumes: Tuple[str, ...] = ()    # Roles no later fragment may reuse (a padded sketch)
+    modifies: bool = False            # Works on existing geometry, so defaults to the active part
+    stage: int = 50                   # Order of fragments matched in the same clause
+    expands: Tuple[str, ...] = ()     # Composite operations made of other snippets
+
+# Code that closes an editing context opened by a fragment, per language
+CLOSERS = {
+    "factory2d": {"VBA": "    $sketch.CloseEdition", "Python": "    $sketch.CloseEdition()"},
+}
+
+# Fragment that supplies a role when the request did not mention one
+DEFAULT_PROVIDERS = {
+    "doc": "new_part", "part": "new_part", "body": "new_part", "factory": "new_part",
+    "sketch": "sketch", "factory2d": "sketch", "feature": "last_shape",
+    "product": "new_product", "sheet": "new_drawing",
+}
+ACTIVE_PROVIDERS = {"doc": "active_part", "part": "active_part", "body": "active_part",
+                    "factory": "active_part"}
+
+PART_ROLES = {
+    "doc": ("partDoc", "part_doc"),
+    "part": ("part", "part"),
+    "body": ("body", "body"),
+    "factory": ("shapeFactory", "shape_factory"),
+}
+
+def _circle(values):
+    return {"radius": values["size"] / 2}  # "size" is a diameter; labelled radii are converted
+
+SNIPPETS = [
+    Snippet(
+        name="new_part",
+        keywords={"a part": 2.0, "new part": 2.0, "part called": 2.0, "part named": 2.0, "new document": 2.0},
+        provides=PART_ROLES,
+        stage=0,
+        code={
+            "VBA": """    Dim $doc As PartDocument
+    Set $doc = CATIA.Documents.Add("Part")
+    $doc.Product.PartNumber = "$part_name"
+    Dim $part As Part
+    Set $part = $doc.Part
+    Dim $body As Body
+    Set $body = $part.MainBody
+    Dim $factory As ShapeFactory
+    Set $factory = $part.ShapeFactory""",
+            "Python": """    $doc = catia.Documents.Add("Part")
+    $doc.Product.PartNumber = "$part_name"
+    $part = $doc.Part
+    $body = $part.MainBody
+    $factory = $part.ShapeFactory""",
+        },
+    ),
+    Snippet(
+        name="active_part",
+        keywords={"active part": 3.0, "existing part": 3.0, "current part": 3.0, "open part": 2.0},
+        provides=PART_ROLES,
+        stage=0,
+        code={
+            "VBA": """    Dim $doc As PartDocument
+    Set $doc = CATIA.ActiveDocument
+    Dim $part As Part
+    Set $part = $doc.Part
+    Dim $body As Body
+    Set $body = $part.MainBody
+    Dim $factory As ShapeFactory
+    Set $factory = $part.ShapeFactory""",
+            "Python": """    $doc = catia.ActiveDocument
+    $part = $doc.Part
+    $body = $part.MainBody
+    $factory = $part.ShapeFactory""",
+        },
+    ),
+    Snippet(
+        name="sketch",
+        keywords={"sketch": 2.0, "profile": 1.5, "plane": 1.0},
+        requires=("part", "body"),
+        provides={"sketch": ("sketch", "sketch"), "factory2d": ("factory2D", "factory_2d")},
+        opens="factory2d",
+        stage=10,
+        code={
+            "VBA": """    Dim $sketch As Sketch
+    Set $sketch = $body.Sketches.Add($part.OriginElements.Plane$plane)
+    Dim $factory2d As Factory2D
+    Set $factory2d = $sketch.OpenEdition()""",
+            "Python": """    $sketch = $body.Sketches.Add($part.OriginElements.Plane$plane)
+    $factory2d = $sketch.OpenEdition()""",
+        },
+    ),
+    Snippet(
+        name="rectangle",
+        keywords={"rectangle": 3.0, "rectangular": 3.0, "square": 3.0},
+        requires=("factory2d",),
+        params=(("width", 50.0), ("height", None)),
+        derive=lambda values: {"half_width": values["width"] / 2,
+                               "half_height": (values["height"] or values["width"]) / 2},
+        stage=20,
+        code={
+            "VBA": """    ' Rectangle centred on the origin
+    $factory2d.CreateLine -$half_width, -$half_height, $half_width, -$half_height
+    $factory2d.CreateLine $half_width, -$half_height, $half_width, $half_height
+    $factory2d.CreateLine $half_width, $half_height, -$half_width, $half_height
+    $factory2d.CreateLine -$half_width, $half_height, -$half_width, -$half_height""",
+            "Python": """    # Rectangle centred on the origin
+    $factory2d.CreateLine(-$half_width, -$half_height, $half_width, -$half_height)
+    $factory2d.CreateLine($half_width, -$half_height, $half_width, $half_height)
+    $factory2d.CreateLine($half_width, $half_height, -$half_width, $half_height)
+    $factory2d.CreateLine(-$half_width, $half_height, -$half_width, -$half_height)""",
+        },
+    ),
+    Snippet(
+        name="circle",
+        keywords={"circle": 3.0, "circular": 3.0, "disc": 2.0, "disk": 2.0},
+        requires=("factory2d",),
+        params=(("size", 20.0),),
+        derive=_circle,
+        stage=20,
+        code={
+            "VBA": """    $factory2d.CreateClosedCircle 0, 0, $radius""",
+            "Python": """    $factory2d.CreateClosedCircle(0, 0, $radius)""",
+        },
+    ),
+    Snippet(
+        name="line",
+        keywords={"line": 2.5, "segment": 2.0},
+        requires=("factory2d",),
+        params=(("length", 50.0),),
+        stage=20,
+        code={
+            "VBA": """    $factory2d.CreateLine 0, 0, $length, 0""",
+            "Python": """    $factory2d.CreateLine(0, 0, $length, 0)""",
+        },
+    ),
+    Snippet(
+        name="pad",
+        keywords={"pad": 3.0, "extrude": 3.0, "extrusion": 3.0, "thick": 1.5, "thickness": 1.5},
+        requires=("part", "factory", "sketch"),
+        provides={"feature": ("pad", "pad")},
+        consumes=("sketch",),
+        params=(("length", 20.0),),
+        stage=30,
+        code={
+            "VBA": """    Dim $feature As Pad
+    Set $feature = $factory.AddNewPad($sketch, $length)""",
+            "Python": """    $feature = $factory.AddNewPad($sketch, $length)""",
+        },
+    ),
+    Snippet(
+        name="pocket",
+        keywords={"pocket": 3.0, "cut": 2.0, "cutout": 2.5},
+        requires=("part", "factory", "sketch"),
+        provides={"feature": ("pocket", "pocket")},
+        consumes=("sketch",),
+        params=(("depth", 10.0),),
+        modifies=True,
+        stage=30,
+        code={
+            "VBA": """    Dim $feature As Pocket
+    Set $feature = $factory.AddNewPocket($sketch, $depth)""",
+            "Python": """    $feature = $factory.AddNewPocket($sketch, $depth)""",
+        },
+    ),
+    Snippet(
+        name="shaft",
+        keywords={"shaft": 3.0, "revolve": 3.0, "revolution": 3.0, "revolved": 3.0},
+        requires=("part", "factory", "sketch"),
+        provides={"feature": ("shaft", "shaft")},
+        consumes=("sketch",),
+        params=(("angle", 360.0),),
+        stage=30,
+        code={
+            "VBA": """    Dim $feature As Shaft
+    Set $feature = $factory.AddNewShaft($sketch)
+    $feature.FirstAngle.Value = $angle
+    $feature.RevoluteAxis = $part.CreateReferenceFromObject($sketch.AbsoluteAxis.HorizontalReference)""",
+            "Python": """    $feature = $factory.AddNewShaft($sketch)
+    $feature.FirstAngle.Value = $angle
+    $feature.RevoluteAxis = $part.CreateReferenceFromObject($sketch.AbsoluteAxis.HorizontalReference)""",
+        },
+    ),
+    Snippet(
+        name="hole",
+        keywords={"hole": 3.0, "drill": 3.0, "bore": 2.0},
+        requires=("part", "factory", "feature"),
+        provides={"hole": ("hole", "hole")},
+        params=(("diameter", 10.0), ("depth", 20.0)),
+        modifies=True,
+        stage=40,
+        code={
+            "VBA": """    Dim $hole As Hole
+    Set $hole = $factory.AddNewHoleFromPoint(0, 0, 0, $part.CreateReferenceFromObject($part.OriginElements.PlaneXY), $depth)
+    $hole.Diameter.Value = $diameter""",
+            "Python": """    $hole = $factory.AddNewHoleFromPoint(0, 0, 0, $part.CreateReferenceFromObject($part.OriginElements.PlaneXY), $depth)
+    $hole.Diameter.Value = $diameter""",
+        },
+    ),
+    Snippet(
+        name="fillet",
+        keywords={"fillet": 3.0, "round": 1.5, "rounded": 1.5},
+        requires=("doc", "factory", "feature"),
+        provides={"fillet": ("fillet", "fillet"), "selection": ("selection", "selection"),
+                  "index": ("i", "i")},
+        params=(("radius", 2.0),),
+        modifies=True,
+        stage=50,
+        code={
+            "VBA": """    ' Constant radius fillet on the edges of $feature (1 = catTangencyFilletEdgePropagation)
+    Dim $fillet As ConstRadEdgeFillet
+    Set $fillet = $factory.AddNewSolidEdgeFilletWithConstantRadius(Nothing, 1, $radius)
+    Dim $selection As Selection
+    Set $selection = $doc.Selection
+    $selection.Clear
+    $selection.Add $feature
+    $selection.Search "Topology.REdge,sel"
+    Dim $index As Integer
+    For $index = 1 To $selection.Count
+        $fillet.AddObjectToFillet $selection.Item($index).Reference
+    Next
+    $selection.Clear""",
+            "Python": """    # Constant radius fillet on the edges of $feature (1 = catTangencyFilletEdgePropagation)
+    $fillet = $factory.AddNewSolidEdgeFilletWithConstantRadius(None, 1, $radius)
+    $selection = $doc.Selection
+    $selection.Clear()
+    $selection.Add($feature)
+    $selection.Search("Topology.REdge,sel")
+    for $index in range(1, $selection.Count + 1):
+        $fillet.AddObjectToFillet($selection.Item($index).Reference)
+    $selection.Clear()""",
+        },
+    ),
+    Snippet(
+        name="chamfer",
+        keywords={"chamfer": 3.0, "bevel": 2.5},
+        requires=("doc", "factory", "feature"),
+        provides={"chamfer": ("chamfer", "chamfer"), "selection": ("selection", "selection"),
+                  "index": ("i", "i")},
+        params=(("length", 1.0), ("angle", 45.0)),
+        modifies=True,
+        stage=50,
+        code={
+            "VBA": """    ' Length/angle chamfer on the edges of $feature (1 = tangency propagation, 0 = length-angle, 0 = not reversed)
+    Dim $chamfer As Chamfer
+    Set $chamfer = $factory.AddNewChamfer(Nothing, 1, 0, 0, $length, $angle)
+    Dim $selection As Selection
+    Set $selection = $doc.Selection
+    $selection.Clear
+    $selection.Add $feature
+    $selection.Search "Topology.REdge,sel"
+    Dim $index As Integer
+    For $index = 1 To $selection.Count
+        $chamfer.AddElementToChamfer $selection.Item($index).Reference
+    Next
+    $selection.Clear""",
+            "Python": """    # Length/angle chamfer on the edges of $feature (1 = tangency propagation, 0 = length-angle, 0 = not reversed)
+    $chamfer = $factory.AddNewChamfer(None, 1, 0, 0, $length, $angle)
+    $selection = $doc.Selection
+    $selection.Clear()
+    $selection.Add($feature)
+    $selection.Search("Topology.REdge,sel")
+    for $index in range(1, $selection.Count + 1):
+        $chamfer.AddElementToChamfer($selection.Item($index).Reference)
+    $selection.Clear()""",
+        },
+    ),
+    Snippet(
+        name="last_shape",
+        keywords={},
+        requires=("body",),
+        provides={"feature": ("shape", "shape")},
+        code={
+            "VBA": """    Dim $feature As Shape
+    Set $feature = $body.Shapes.Item($body.Shapes.Count)""",
+            "Python": """    $feature = $body.Shapes.Item($body.Shapes.Count)""",
+        },
+    ),
+    Snippet(
+        name="save",
+        keywords={"save": 3.0, "store": 1.5, "export": 1.5},
+        requires=("doc",),
+        modifies=True,
+        stage=90,
+        code={
+            "VBA": """    $doc.SaveAs CATIA.SystemService.Environ("TEMP") & "\\$file_name\"""",
+            "Python": """    $doc.SaveAs(catia.SystemService.Environ("TEMP") + "\\\\$file_name")""",
+        },
+    ),
+    Snippet(
+        name="new_product",
+        keywords={"assembly": 3.0, "product": 2.5, "catproduct": 2.5},
+        provides={"product_doc": ("productDoc", "product_doc"), "product": ("product", "product")},
+        stage=0,
+        code={
+            "VBA": """    Dim $product_doc As ProductDocument
+    Set $product_doc = CATIA.Documents.Add("Product")
+    Dim $product As Product
+    Set $product = $product_doc.Product
+    $product.PartNumber = "$part_name\"""",
+            "Python": """    $product_doc = catia.Documents.Add("Product")
+    $product = $product_doc.Product
+    $product.PartNumber = "$part_name\"""",
+        },
+    ),
+    Snippet(
+        name="add_component",
+        keywords={"component": 3.0, "add part": 1.5, "insert": 1.5, "subassembly": 2.0},
+        requires=("product",),
+        provides={"component": ("component", "component")},
+        stage=10,
+        code={
+            "VBA": """    Dim $component As Product
+    Set $component = $product.Products.AddNewComponent("Part", "$component_name")""",
+            "Python": """    $component = $product.Products.AddNewComponent("Part", "$component_name")""",
+        },
+    ),
+    Snippet(
+        name="new_drawing",
+        keywords={"drawing": 3.0, "catdrawing": 3.0, "sheet": 2.0},
+        provides={"drawing_doc": ("drawingDoc", "drawing_doc"), "sheet": ("sheet", "sheet")},
+        stage=0,
+        code={
+            "VBA": """    Dim $drawing_doc As DrawingDocument
+    Set $drawing_doc = CATIA.Documents.Add("Drawing")
+    Dim $sheet As DrawingSheet
+    Set $sheet = $drawing_doc.Sheets.ActiveSheet""",
+            "Python": """    $drawing_doc = catia.Documents.Add("Drawing")
+    $sheet = $drawing_doc.Sheets.ActiveSheet""",
+        },
+    ),
+    Snippet(
+        name="drawing_view",
+        keywords={"view": 2.5, "front view": 3.0, "top view": 3.0, "projection": 2.0},
+        requires=("sheet",),
+        provides={"view": ("view", "view")},
+        stage=10,
+        code={
+            "VBA": """    Dim $view As DrawingView
+    Set $view = $sheet.Views.Add("$view_name")""",
+            "Python": """    $view = $sheet.Views.Add("$view_name")""",
+        },
+    ),
+    Snippet(
+        name="box",
+        keywords={"box": 3.0, "block": 2.5, "cube": 3.0, "plate": 2.0},
+        expands=("rectangle", "pad"),
+        stage=20,
+        code={},
+    ),
+    Snippet(
+        name="cylinder",
+        keywords={"cylinder": 3.0, "rod": 2.0, "pin": 2.0},
+        expands=("circle", "pad"),
+        stage=20,
+        code={},
+    ),
+]
@@ -0,0 +1,74 @@
+"""
+CATIA V5 Template Registry
+Compiles each code template once into a shared Jinja2 environment
+"""
+
+from typing import Dict, FrozenSet, Optional
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache, Template, meta
+
+from paths import get_cache_dir
+
+
+class TemplateRegistry:
+    """Registry of compiled templates, addressed as "<language>/<template_key>"
+
+    Templates are compiled on first use and kept in memory for the lifetime of the
+    registry. Compiled bytecode is also written to an on-disk cache so that new
+    processes can skip lexing, parsing and compiling entirely.
+    """
+
+    def __init__(self, template_sets: Dict[str, Dict[str, str]],
+                 cache_dir: Optional[str] = None, use_bytecode_cache: bool = True):
+        self.sources: Dict[str, str] = {}
+        for language, templates in template_sets.items():
+            for key, source in templates.items():
+                self.sources[self.template_name(language, key)] = source
+
+        bytecode_cache = None
+        if use_bytecode_cache:
+            directory = cache_dir or get_cache_dir("jinja2")
+            if directory:
+                bytecode_cache = FileSystemBytecodeCache(directory)
+
+        self.environment = Environment(
+            loader=DictLoader(self.sources),
+            bytecode_cache=bytecode_cache,
+            auto_reload=False,
+            cache_size=-1
+        )
+        self._compiled: Dict[str, Template] = {}
+        self._variables: Dict[str, FrozenSet[str]] = {}
+
+    @staticmethod
+    def template_name(language: str, key: str) -> str:
+        """Build the registry name for a template"""
+        return f"{language}/{key}"
+
+    def get(self, name: str) -> Template:
+        """Return the compiled template, compiling it on first use"""
+        template = self._compiled.get(name)
+        if template is None:
+            template = self.environment.get_template(name)
+            self._compiled[name] = template
+        return template
+
+    def variables(self, name: str) -> FrozenSet[str]:
+        """Return the names of the placeholders used by a template"""
+        variables = self._variables.get(name)
+        if variables is None:
+            ast = self.environment.parse(self.sources[name])
+            variables = self._variables[name] = frozenset(meta.find_undeclared_variables(ast))
+        return variables
+
+    def render(self, name: str, **context) -> str:
+        """Render a registered template with the given context"""
+        return self.get(name).render(**context)
+
+    def compile_all(self) -> int:
+        """Compile every registered template up front and return the count"""
+        for name in self.sources:
+            self.get(name)
+        return len(self._compiled)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sources
@@ -148,3 +148,56 @@ class CATIAReportGenerator:
         pass
         '''
     }
+
+# Keyword weights used by the intent index to pick a template for a description.
+# Two-word phrases are matched as a unit; templates listed first win ties.
+TEMPLATE_KEYWORDS = {
+    "sketch_creation": {
+        "sketch": 3.0, "rectangle": 1.0, "circle": 1.0, "line": 0.5, "profile": 1.0,
+        "2d": 1.0, "arc": 0.5, "polygon": 1.0
+    },
+    "extrude_operation": {
+        "extrude": 2.0, "pad": 2.0, "pocket": 1.5, "height": 0.5, "thickness": 0.5
+    },
+    "part_creation": {
+        "part": 1.0, "solid": 0.5, "part number": 1.0, "revision": 0.5, "property": 0.5
+    },
+    "automation_framework": {
+        "framework": 2.5, "automation": 1.0, "class": 0.5, "connect": 0.5, "logging": 0.5
+    },
+    "assembly_creation": {
+        "assembly": 2.5, "product": 1.5, "component": 1.0, "insert": 0.5
+    },
+    "constraint_creation": {
+        "constraint": 3.0, "coincidence": 2.0, "contact": 1.0, "offset": 0.5, "fix": 0.5
+    },
+    "parametric_design": {
+        "parametric": 3.0, "parameter": 2.0, "formula": 1.5, "relation": 1.0, "design table": 2.0
+    },
+    "batch_processing": {
+        "batch": 3.0, "folder": 1.0, "directory": 1.0, "all file": 1.0, "all part": 1.0
+    },
+    "report_generation": {
+        "report": 3.0, "mass property": 1.5, "analyze": 1.0, "extract": 1.0, "count feature": 1.0
+    }
+}
+
+TEMPLATE_SYNONYMS = {
+    "extrusion": "extrude",
+    "extruded": "extrude",
+    "padding": "pad",
+    "sketching": "sketch",
+    "square": "rectangle",
+    "rectangular": "rectangle",
+    "circular": "circle",
+    "subassembly": "assembly",
+    "constrain": "constraint",
+    "constrained": "constraint",
+    "mate": "constraint",
+    "parameterized": "parametric",
+    "params": "parameter",
+    "bulk": "batch",
+    "reporting": "report",
+    "analysis": "analyze",
+    "body": "solid"
+}
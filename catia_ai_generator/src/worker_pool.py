@@ -0,0 +1,300 @@
+"""
+CATIA V5 AI Code Generator - CATIA Worker Pool
+Drives several CATIA sessions in separate processes for bulk file processing
+"""
+
+import multiprocessing
+import os
+import signal
+import time
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from multiprocessing.connection import wait
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from catia_session import CatiaSessionManager, CatiaUnavailable, Win32ComBackend
+from macro_runner import describe_error, find_entry_point, CAT_SCRIPT_LIBRARY_TYPE_DIRECTORY
+
+@dataclass
+class FileResult:
+    """Outcome of processing one file"""
+    index: int
+    path: str
+    ok: bool
+    result: Any = None
+    error: Optional[str] = None
+    duration: float = 0.0
+    worker: Optional[int] = None
+    attempts: int = 1
+
+def open_document(app, path: str) -> str:
+    """Default task: open a document and close it again (checks that it loads)"""
+    document = app.Documents.Open(path)
+    try:
+        return document.Name
+    finally:
+        document.Close()
+
+def run_macro_on_document(macro_path: str, app, path: str) -> Any:
+    """Open a document, run a macro file against it, save and close it"""
+    with open(macro_path, encoding="utf-8", errors="replace") as f:
+        entry_point = find_entry_point(f.read()) or "CATMain"
+    document = app.Documents.Open(path)
+    try:
+        result = app.SystemService.ExecuteScript(
+            os.path.dirname(os.path.abspath(macro_path)), CAT_SCRIPT_LIBRARY_TYPE_DIRECTORY,
+            os.path.basename(macro_path), entry_point, []
+        )
+        document.Save()
+        return result
+    finally:
+        document.Close()
+
+def macro_task(macro_path: str) -> Callable[[Any, str], Any]:
+    """Picklable task that applies one macro file to every document"""
+    return partial(run_macro_on_document, macro_path)
+
+def dedicated_backend() -> Win32ComBackend:
+    return Win32ComBackend(dedicated=True)
+
+def _worker_main(conn, backend_factory, task, max_tasks: int, max_memory_mb: Optional[float]):
+    """Worker process: own one CATIA session and process files sent over the pipe"""
+    backend = backend_factory()
+    session = CatiaSessionManager(backend)
+    try:
+        app = session.connect()
+    except Exception as e:
+        conn.send(("failed", describe_error(e)))
+        return
+    # The parent needs the CATIA process id to end it if this worker has to be killed
+    conn.send(("ready", backend.process_id(app)))
+
+    done = 0
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            index, path = message
+            start = time.perf_counter()
+            try:
+                result, error = task(app, path), None
+            except Exception as e:
+                result, error = None, describe_error(e)
+            duration = time.perf_counter() - start
+
+            # Retire after CATIA died, too many files, or too much memory growth
+            done += 1
+            alive = backend.is_ready(app)
+            memory = backend.memory_mb(app) if alive else None
+            retire = (not alive or done >= max_tasks
+                      or bool(max_memory_mb and memory and memory > max_memory_mb))
+            conn.send(("done", index, error is None, result, error, duration, alive, retire))
+            if retire:
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        backend.shutdown(app)
+
+class _Worker:
+    """Parent-side handle for one worker process"""
+
+    def __init__(self, pool: "CatiaWorkerPool", worker_id: int):
+        self.id = worker_id
+        self.conn, child = pool.context.Pipe()
+        self.process = pool.context.Process(
+            target=_worker_main, daemon=True, name=f"catia-worker-{worker_id}",
+            args=(child, pool.backend_factory, pool.task, pool.max_tasks_per_worker, pool.max_memory_mb)
+        )
+        self.process.start()
+        child.close()
+        self.ready = False
+        self.catia_pid: Optional[int] = None
+        self.task: Optional[Tuple[int, str]] = None
+        self.started = 0.0
+
+    def assign(self, index: int, path: str):
+        self.task = (index, path)
+        self.started = time.monotonic()
+        try:
+            self.conn.send(self.task)
+        except OSError:
+            pass  # The worker died; its sentinel fires and the file is requeued
+
+    def stop(self, kill: bool = False):
+        """Stop the worker; a killed worker cannot quit its CATIA, so that process is ended too"""
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+            kill = True
+        if kill and self.catia_pid is not None:
+            try:
+                os.kill(self.catia_pid, signal.SIGTERM)  # TerminateProcess on Windows
+            except OSError:
+                pass  # Already gone
+        self.conn.close()
+
+class CatiaWorkerPool:
+    """Process pool where every worker owns its own CATIA session
+
+    Files are handed out from a queue held by the parent, one at a time, to whichever
+    worker is idle; each worker has a private pipe, so a worker that exceeds
+    ``file_timeout`` can be killed without corrupting a shared queue. Workers are
+    replaced after a crash or timeout, after ``max_tasks_per_worker`` files, or when
+    their CATIA session grows beyond ``max_memory_mb``. Failed files are retried
+    ``retries`` times on a fresh worker.
+    """
+
+    def __init__(self, workers: Optional[int] = None, task: Callable[[Any, str], Any] = open_document,
+                 backend_factory: Callable[[], Any] = dedicated_backend, file_timeout: float = 300.0,
+                 max_tasks_per_worker: int = 200, max_memory_mb: Optional[float] = 4096.0,
+                 retries: int = 1, start_method: Optional[str] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.task = task
+        self.backend_factory = backend_factory
+        self.file_timeout = file_timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_memory_mb = max_memory_mb
+        self.retries = retries
+        self.context = multiprocessing.get_context(start_method)
+        self.recycled = 0
+
+    def imap(self, paths: Iterable[str]) -> Iterator[FileResult]:
+        """Process files and yield each result as soon as it is available"""
+        items = iter(enumerate(paths))
+        retry: Deque[Tuple[int, str]] = deque()
+        attempts: Dict[int, int] = {}
+        workers: List[_Worker] = []
+        next_id = 0
+        startup_failures = 0
+        exhausted = False
+
+        def spawn():
+            nonlocal next_id
+            workers.append(_Worker(self, next_id))
+            next_id += 1
+
+        def next_item() -> Optional[Tuple[int, str]]:
+            nonlocal exhausted
+            if retry:
+                return retry.popleft()
+            if not exhausted:
+                item = next(items, None)
+                if item is not None:
+                    return item
+                exhausted = True
+            return None
+
+        def failed(worker: _Worker, error: str) -> Optional[FileResult]:
+            """Requeue the worker's file or report it as failed"""
+            index, path = worker.task
+            worker.task = None
+            count = attempts[index] = attempts.get(index, 1) + 1
+            if count <= self.retries + 1:
+                retry.append((index, path))
+                return None
+            duration = time.monotonic() - worker.started
+            return FileResult(index, path, False, error=error, duration=duration,
+                              worker=worker.id, attempts=count - 1)
+
+        def startup_failed(worker: _Worker, reason: str):
+            nonlocal startup_failures
+            startup_failures += 1
+            if startup_failures >= self.workers * 2:
+                raise CatiaUnavailable(f"CATIA workers could not start: {reason}")
+            replace(worker, kill=False)
+
+        def replace(worker: _Worker, kill: bool):
+            workers.remove(worker)
+            worker.stop(kill=kill)
+            self.recycled += 1
+            if not (exhausted and not retry):
+                spawn()
+
+        for _ in range(self.workers):
+            spawn()
+        try:
+            while workers:
+                for worker in workers:
+                    if worker.ready and worker.task is None:
+                        item = next_item()
+                        if item is None:
+                            break
+                        worker.assign(*item)
+
+                busy = [w for w in workers if w.task is not None]
+                if exhausted and not retry and not busy:
+                    break
+
+                timeout = None
+                if busy:
+                    oldest = min(w.started for w in busy)
+                    timeout = max(0.0, oldest + self.file_timeout - time.monotonic())
+                handles = [w.conn for w in workers] + [w.process.sentinel for w in workers]
+                wait(handles, timeout)
+
+                for worker in list(workers):
+                    message = None
+                    try:
+                        if worker.conn.poll():
+                            message = worker.conn.recv()
+                    except (EOFError, OSError):
+                        pass
+
+                    if message is None:
+                        if not worker.process.is_alive():
+                            reason = f"CATIA worker exited (code {worker.process.exitcode})"
+                            if worker.task is not None:
+                                result = failed(worker, reason)
+                                if result:
+                                    yield result
+                                replace(worker, kill=False)
+                            elif not worker.ready:
+                                startup_failed(worker, reason)
+                            else:
+                                replace(worker, kill=False)
+                        elif worker.task and time.monotonic() - worker.started > self.file_timeout:
+                            result = failed(worker, f"Timed out after {self.file_timeout:g}s")
+                            if result:
+                                yield result
+                            replace(worker, kill=True)
+                        continue
+
+                    kind = message[0]
+                    if kind == "ready":
+                        worker.ready = True
+                        worker.catia_pid = message[1]
+                        startup_failures = 0
+                    elif kind == "failed":
+                        startup_failed(worker, message[1])
+                    elif kind == "done":
+                        _, index, ok, value, error, duration, alive, retire = message
+                        if not ok and not alive:
+                            # CATIA died under this file; retry it on a fresh worker
+                            result = failed(worker, error)
+                        else:
+                            result = FileResult(index, worker.task[1], ok, value, error, duration,
+                                                worker.id, attempts.get(index, 1))
+                            worker.task = None
+                        if retire:
+                            replace(worker, kill=False)
+                        if result:
+                            yield result
+        finally:
+            # Idle workers quit their CATIA themselves; busy ones are killed with theirs
+            for worker in workers:
+                worker.stop(kill=worker.task is not None)
+
+    def map(self, paths: Iterable[str]) -> List[FileResult]:
+        """Process files and return the results in input order"""
+        return sorted(self.imap(paths), key=lambda result: result.index)
@@ -0,0 +1,112 @@
+"""The assistant shows local code at once and upgrades it in place when the AI answers"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from catia_ai_assistant import CatiaAIAssistant
+
+REQUEST = "Export the bill of materials to Excel"  # Nothing in the snippet library
+AI_CODE = "Sub CATMain()\n    MsgBox \"from the AI\"\nEnd Sub"
+
+class FakeText:
+    """Just enough of a Tk text widget: one string, "end-1c" excludes the final newline"""
+
+    def __init__(self, text=""):
+        self.text = text
+
+    def get(self, start, end):
+        return self.text if end == "end-1c" else self.text + "\n"
+
+    def delete(self, start, end):
+        self.text = ""
+
+    def insert(self, index, text):
+        self.text += text
+
+class FakeWidget:
+    def __init__(self):
+        self.options = {}
+        self.visible = True
+
+    def config(self, **options):
+        self.options.update(options)
+
+    def start(self):
+        self.options["running"] = True
+
+    def stop(self):
+        self.options["running"] = False
+
+    def grid(self):
+        self.visible = True
+
+    def grid_remove(self):
+        self.visible = False
+
+class FakeExecutor:
+    """Keeps the submitted job so the test decides when and how it finishes"""
+
+    def __init__(self):
+        self.submitted = None
+
+    def submit(self, func, on_done, on_error=None, timeout=None, on_cancel=None):
+        self.submitted = (func, on_done, on_error)
+
+    def cancel(self, reason="cancelled"):
+        return False
+
+class FakeHistory:
+    def __init__(self):
+        self.records = []
+
+    def record(self, description, code, language, complexity, source, backend, latency):
+        self.records.append((description, source))
+
+@pytest.fixture
+def assistant():
+    assistant = CatiaAIAssistant.__new__(CatiaAIAssistant)  # No Tk window
+    assistant.input_text = FakeText(REQUEST)
+    assistant.output_text = FakeText()
+    assistant.result_label = FakeWidget()
+    assistant.progress = FakeWidget()
+    assistant.apply_ai_btn = FakeWidget()
+    assistant.executor = FakeExecutor()
+    assistant.history = FakeHistory()
+    assistant.shown_code = None
+    assistant.pending_ai_code = None
+    assistant.local_result = None
+    assistant.generate_code()
+    return assistant
+
+def test_template_is_shown_before_the_ai_answers(assistant):
+    assert assistant.output_text.text == assistant.generate_fallback_code(REQUEST)
+    assert assistant.progress.options["running"]
+    assert assistant.result_label.options["text"] == "Showing local code - waiting for AI result..."
+
+def test_unedited_template_is_upgraded_in_place(assistant):
+    _, on_done, _ = assistant.executor.submitted
+    on_done(AI_CODE)
+    assert assistant.output_text.text == AI_CODE
+    assert assistant.result_label.options["text"] == "Upgraded to AI-generated code"
+    assert not assistant.progress.options["running"]
+
+def test_edits_are_kept_until_the_ai_result_is_applied(assistant):
+    assistant.output_text.insert("end", "' my change\n")
+    edited = assistant.output_text.text
+    _, on_done, _ = assistant.executor.submitted
+    on_done(AI_CODE)
+    assert assistant.output_text.text == edited
+    assert assistant.apply_ai_btn.visible and assistant.pending_ai_code == AI_CODE
+    assistant.apply_ai_result()
+    assert assistant.output_text.text == AI_CODE
+    assert not assistant.apply_ai_btn.visible
+
+def test_local_code_is_recorded_when_the_ai_does_not_answer(assistant):
+    _, _, on_error = assistant.executor.submitted
+    on_error(TimeoutError())
+    assert assistant.output_text.text == assistant.generate_fallback_code(REQUEST)
+    assert assistant.result_label.options["text"] == "AI request timed out - showing local code"
+    assert assistant.history.records == [(REQUEST, "template")]
@@ -0,0 +1,97 @@
+"""Async generation goes through the router and keeps blocking work off the event loop"""
+
+import asyncio
+import threading
+
+from async_generator import AsyncCodeGenerator
+from backends import StubBackend
+from main import AICodeGenerator, CodeRequest
+from response_cache import ResponseCache
+from router import Router
+
+REQUEST = CodeRequest("Compute the moment of inertia of every body and plot it")
+
+class RecordingHistory:
+    def __init__(self):
+        self.records = []
+        self.threads = set()
+
+    def record(self, description, code, language, complexity, source, backend, latency):
+        self.records.append((source, backend))
+        self.threads.add(threading.current_thread())
+
+class ThreadCheckingCache(ResponseCache):
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.current_thread())
+        return super().get(key)
+
+def make_generator(*backends, cache=None):
+    generator = AICodeGenerator(api_key="")
+    generator.cache = cache
+    generator.similar = None
+    generator.history = RecordingHistory()
+    generator.backend_names = [backend.name for backend in backends]
+    generator.router = Router(backends, hedge=False)
+    return generator
+
+def test_records_the_backend_that_answered():
+    failing = StubBackend("huggingface", error_rate=1.0, sleep=lambda _: None)
+    answering = StubBackend("openai", sleep=lambda _: None)
+    generator = make_generator(failing, answering)
+    async_generator = AsyncCodeGenerator(generator)
+    try:
+        result = asyncio.run(async_generator.generate(REQUEST))
+    finally:
+        async_generator.close()
+    assert (result.source, result.backend, result.error) == ("ai", "openai", None)
+    assert result.code == 'Sub CATMain()\n    MsgBox "Hello from openai"\nEnd Sub'
+    assert failing.calls == 1
+    assert generator.history.records == [("ai", "openai")]
+
+def test_blocking_work_runs_off_the_event_loop(tmp_path):
+    cache = ThreadCheckingCache(str(tmp_path / "responses.sqlite3"))
+    generator = make_generator(StubBackend("openai", sleep=lambda _: None), cache=cache)
+    async_generator = AsyncCodeGenerator(generator)
+
+    async def run():
+        first = await async_generator.generate(REQUEST)
+        second = await async_generator.generate(REQUEST)
+        return threading.current_thread(), first, second
+
+    try:
+        loop_thread, first, second = asyncio.run(run())
+    finally:
+        async_generator.close()
+    assert (first.source, second.source) == ("ai", "cache")
+    assert generator.history.records == [("ai", "openai"), ("cache", None)]
+    assert cache.threads and loop_thread not in cache.threads
+    assert loop_thread not in generator.history.threads
+
+def test_falls_back_when_every_backend_fails():
+    generator = make_generator(StubBackend("openai", error_rate=1.0, sleep=lambda _: None))
+    async_generator = AsyncCodeGenerator(generator)
+    try:
+        result = asyncio.run(async_generator.generate(REQUEST))
+    finally:
+        async_generator.close()
+    assert result.source == "template" and result.backend is None
+    assert "openai failed" in result.error
+
+def test_requests_still_complete_after_a_timeout():
+    released = threading.Event()
+    hung = StubBackend("openai", sleep=lambda _: hung.calls == 1 and released.wait(10))
+    generator = make_generator(hung)
+    async_generator = AsyncCodeGenerator(generator, concurrency=1, timeout=0.2)
+    requests = [CodeRequest(f"Compute the moment of inertia of body {n} and plot it") for n in range(3)]
+    try:
+        results = asyncio.run(async_generator.generate_all(requests))
+    finally:
+        released.set()
+        async_generator.close()
+    assert [result.source for result in results] == ["template", "ai", "ai"]
+    assert results[0].error == "TimeoutError"
+    assert hung.calls == 3
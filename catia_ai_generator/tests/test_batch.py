@@ -0,0 +1,36 @@
+"""Malformed batch records become per-record errors, and every record gets its own output file"""
+
+import io
+
+from batch import iter_requests, read_records, write_results
+
+def requests(text):
+    return [record for _, record in iter_requests(read_records(io.StringIO(text), "jsonl"), "VBA", "basic")]
+
+def test_records_that_are_not_objects():
+    results = requests('"text"\n[1, 2]\n{not json\n')
+    assert [result["error"] for result in results] == [
+        "expected a JSON object, got str", "expected a JSON object, got list",
+        "line 3: invalid JSON (Expecting property name enclosed in double quotes)"]
+
+def test_fields_that_are_not_text():
+    description, language = requests('{"description": 5}\n{"description": "a pad", "language": 3}\n')
+    assert description["error"] == "description must be text" and description["description"] == ""
+    assert language["error"] == "language must be text" and language["language"] == "VBA"
+
+def test_valid_records_get_defaults():
+    (record,) = requests('{"id": "a", "description": " Create a sketch ", "complexity": "advanced"}\n')
+    assert record == {"id": "a", "description": "Create a sketch", "language": "VBA",
+                      "complexity": "advanced", "error": None}
+
+def test_duplicate_ids_get_their_own_files(tmp_path):
+    results = [{"id": "part", "index": 0, "language": "VBA", "code": "' first", "error": None},
+               {"id": "Part", "index": 1, "language": "VBA", "code": "' second", "error": None},
+               {"id": "part", "index": 2, "language": "VBA", "code": "' third", "error": None},
+               {"id": "part", "index": 3, "language": "Python", "code": "# fourth", "error": None}]
+    stats = write_results(results, output_dir=str(tmp_path))
+    assert stats.records == 4 and stats.errors == 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "Part-000001.bas", "part-000002.bas", "part.bas", "part.py"]
+    assert (tmp_path / "part.bas").read_text() == "' first"
+    assert (tmp_path / "part-000002.bas").read_text() == "' third"
@@ -0,0 +1,62 @@
+"""CatiaSessionManager against the simulated CATIA backend"""
+
+import pytest
+
+from catia_session import CatiaSessionManager, CatiaUnavailable
+from fake_catia import FakeCatiaBackend
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+def make_session(backend, clock, timeout=60.0):
+    return CatiaSessionManager(backend, timeout=timeout, clock=clock, sleep=clock.sleep)
+
+def test_launches_when_nothing_is_running():
+    clock = FakeClock()
+    backend = FakeCatiaBackend(startup_delay=10, register_delay=5, clock=clock)
+    session = make_session(backend, clock)
+    app = session.connect()
+    assert backend.launches == 1
+    assert session.launched
+    assert backend.is_ready(app)
+    assert clock.now >= 10
+
+def test_waits_for_a_registered_instance_that_is_still_starting():
+    clock = FakeClock()
+    backend = FakeCatiaBackend(startup_delay=10, register_delay=0, clock=clock)
+    backend.launch()  # Started by the user; registered in the ROT but still loading
+    session = make_session(backend, clock)
+    app = session.connect()
+    assert backend.launches == 1
+    assert not session.launched
+    assert app is backend.app
+
+def test_reuses_a_ready_instance_without_waiting():
+    clock = FakeClock()
+    backend = FakeCatiaBackend(running=True, clock=clock)
+    session = make_session(backend, clock)
+    assert session.connect() is backend.app
+    assert backend.launches == 0
+    assert clock.now == 0
+
+def test_times_out_on_an_instance_that_never_becomes_ready():
+    clock = FakeClock()
+    backend = FakeCatiaBackend(startup_delay=1000, register_delay=0, clock=clock)
+    backend.launch()
+    session = make_session(backend, clock, timeout=30)
+    with pytest.raises(CatiaUnavailable):
+        session.connect()
+    assert backend.launches == 1
+
+def test_does_not_launch_when_not_allowed():
+    clock = FakeClock()
+    session = make_session(FakeCatiaBackend(clock=clock), clock)
+    with pytest.raises(CatiaUnavailable):
+        session.connect(launch=False)
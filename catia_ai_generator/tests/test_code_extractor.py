@@ -0,0 +1,42 @@
+"""VBA blocks are only opened by real declarations, and only kept once closed"""
+
+from code_extractor import CodeExtractor, extract_code, iter_code
+
+RESPONSE = """Type the following into a new module.
+Function names should say what the macro does.
+Sub CATMain()
+    Dim partDoc As PartDocument
+    MsgBox "Sub procedures like this one"
+End Sub
+Enum Axis
+    AxisX = 1
+End Enum
+Sub procedures like CATMain are run from Tools > Macro.
+"""
+
+def test_prose_does_not_open_blocks():
+    assert extract_code(RESPONSE) == (
+        'Sub CATMain()\n    Dim partDoc As PartDocument\n    MsgBox "Sub procedures like this one"\nEnd Sub'
+        "\n\nEnum Axis\n    AxisX = 1\nEnd Enum")
+
+def test_declarations_with_modifiers_and_spacing():
+    code = "Private Function Area (width As Double) As Double\n    Area = width\nEnd Function\n"
+    assert extract_code(code) == code.rstrip("\n")
+
+def test_unclosed_block_is_dropped():
+    assert extract_code("Sub CATMain()\n    Dim part As Part\n") is None
+    extractor = CodeExtractor("VBA")
+    extractor.feed("Sub Broken()\n    x = 1\n```vba\nSub Fenced()\nEnd Sub\n```\n")
+    assert extractor.code() == "Sub Fenced()\nEnd Sub"
+    assert extractor.procedures == []
+
+def test_iter_code_yields_each_block_once_it_is_complete():
+    chunks = iter_code(iter(["Here you go:\nSub A()\n", "End Sub\nSub B()\n", "End ", "Sub\nHope this helps."]))
+    assert next(chunks) == "Sub A()\nEnd Sub"
+    assert list(chunks) == ["\n\nSub B()\nEnd Sub"]
+
+def test_iter_code_prefers_fences_and_passes_through_prose():
+    text = "```vba\nSub Fenced()\nEnd Sub\n```\nSub Repeated()\nEnd Sub\n"
+    assert "".join(iter_code([text[:9], text[9:]])) == extract_code(text) == "Sub Fenced()\nEnd Sub"
+    assert list(iter_code(["No code ", "here.\n"])) == ["No code here."]
+    assert list(iter_code([])) == []
@@ -0,0 +1,93 @@
+"""Background jobs report back on the UI thread, and only the current job is reported"""
+
+import queue
+import threading
+import time
+
+from executor import BackgroundExecutor, JobCancelled
+
+class FakeRoot:
+    """Tk stand-in whose ``after`` callbacks run when the test pumps them"""
+
+    def __init__(self):
+        self.calls = queue.Queue()
+
+    def after(self, ms, callback, *args):
+        self.calls.put((time.monotonic() + ms / 1000, callback, args))
+
+    def pump(self, until, timeout=5.0):
+        """Run due callbacks on this thread until ``until()`` holds"""
+        deadline = time.monotonic() + timeout
+        waiting = []
+        while not until():
+            assert time.monotonic() < deadline, "timed out pumping callbacks"
+            try:
+                waiting.append(self.calls.get(timeout=0.01))
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            for call in [call for call in waiting if call[0] <= now]:
+                waiting.remove(call)
+                call[1](*call[2])
+
+def test_result_is_delivered_on_the_ui_thread():
+    root = FakeRoot()
+    executor = BackgroundExecutor(root)
+    done = []
+    executor.submit(lambda job: threading.current_thread().name,
+                    on_done=lambda name: done.append((name, threading.current_thread())))
+    root.pump(lambda: done)
+    assert done == [("generation-job", threading.current_thread())]
+    assert executor.current is None
+
+def test_replaced_job_is_dropped_and_cancelled():
+    root = FakeRoot()
+    executor = BackgroundExecutor(root)
+    release = threading.Event()
+    done, cancelled = [], []
+
+    def slow(job):
+        release.wait(5)
+        job.check()
+        return "old"
+
+    first = executor.submit(slow, on_done=done.append, on_cancel=lambda: cancelled.append("old"))
+    executor.submit(lambda job: "new", on_done=done.append)
+    release.set()
+    root.pump(lambda: done and cancelled)
+    assert first.reason == "replaced" and not first.active
+    assert done == ["new"] and cancelled == ["old"]
+
+def test_errors_are_reported_but_cancellation_is_not():
+    root = FakeRoot()
+    executor = BackgroundExecutor(root)
+    errors = []
+
+    def fail(job):
+        raise ValueError("no template")
+
+    job = executor.submit(fail, on_done=errors.append, on_error=errors.append)
+    root.pump(lambda: job.finished)
+    assert [str(error) for error in errors] == ["no template"]
+
+    def stop(job):
+        raise JobCancelled("stopped")
+
+    job = executor.submit(stop, on_done=errors.append, on_error=errors.append)
+    root.pump(lambda: job.finished)
+    assert len(errors) == 1
+
+def test_timed_out_job_reports_a_timeout_and_drops_its_late_result():
+    root = FakeRoot()
+    executor = BackgroundExecutor(root)
+    release = threading.Event()
+    done, errors = [], []
+    job = executor.submit(lambda job: release.wait(5), on_done=done.append,
+                          on_error=errors.append, timeout=0.05)
+    root.pump(lambda: errors)
+    assert isinstance(errors[0], TimeoutError)
+    assert job.cancelled and job.reason == "timed out"
+    release.set()
+    root.pump(lambda: "generation-job" not in {thread.name for thread in threading.enumerate()})
+    root.pump(root.calls.empty)
+    assert done == [] and len(errors) == 1
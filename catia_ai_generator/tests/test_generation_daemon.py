@@ -0,0 +1,103 @@
+"""Requests round-trip through the daemon, and clients carry on without one"""
+
+import socket
+import threading
+import time
+
+import pytest
+
+import generation_daemon
+from backends import StubBackend
+from generation_daemon import DaemonClient, DaemonGenerator, DaemonUnavailable, GenerationDaemon
+from main import AICodeGenerator, CodeRequest
+from router import Router
+
+OFFLINE = CodeRequest("Draw a 50 mm square and pad it 10 mm")
+AI_CODE = 'Sub CATMain()\n    MsgBox "Hello from openai"\nEnd Sub'
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setenv("CATIA_AI_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("CATIA_AI_DAEMON", raising=False)
+    monkeypatch.setattr(generation_daemon, "_client", None)
+    monkeypatch.setattr(generation_daemon, "_checked_at", None)
+
+def make_generator(*backends):
+    generator = AICodeGenerator(api_key="")
+    generator.cache = None
+    generator.similar = None
+    generator.history = None
+    generator.backend_names = [backend.name for backend in backends]
+    generator.router = Router(backends, hedge=False)
+    return generator
+
+@pytest.fixture
+def daemon():
+    backend = StubBackend("openai", sleep=lambda _: None)
+    daemon = GenerationDaemon(generator=make_generator(backend))
+    daemon.routers["openai"] = Router([backend], hedge=False)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    while generation_daemon.read_state() is None:
+        time.sleep(0.01)
+    yield daemon
+    daemon.server.shutdown()
+    thread.join(5)
+
+def test_round_trip(daemon):
+    client = generation_daemon.find_daemon()
+    assert client is not None and client.port == daemon.port
+    assert client.info["ai_available"] and client.info["backends"] == ["openai"]
+
+    info = {}
+    assert client.generate(OFFLINE, info=info).startswith("' Assembled offline")
+    assert info == {"source": "offline", "backend": None}
+    assert client.generate(OFFLINE, use_ai=True) == AI_CODE
+    info = {}
+    assert "".join(client.stream(OFFLINE, info)) == AI_CODE
+    assert info == {"source": "ai", "backend": "openai"}
+    routed = client.complete("prompt", 100, ["openai"])
+    assert (routed.text, routed.backend) == (AI_CODE, "openai")
+    assert client.status()["requests"] == 4
+
+    generator = DaemonGenerator()
+    assert generator.remote and generator.ai_available
+    assert generator.generate_code_with_ai(OFFLINE) == AI_CODE
+    client.close()
+
+def test_wrong_token_is_refused(daemon):
+    client = DaemonClient(daemon.port, "wrong")
+    with pytest.raises(generation_daemon.DaemonError, match="token"):
+        client.status()
+    client.close()
+
+def test_generates_in_process_when_the_daemon_is_down(daemon):
+    port = daemon.port
+    daemon.server.shutdown()
+    daemon.server.server_close()
+    daemon.write_state()  # Left behind as by a daemon that crashed
+    client = DaemonClient(port, daemon.token)
+    with pytest.raises(DaemonUnavailable):
+        client.status()
+
+    generator = DaemonGenerator(api_key="")
+    generator.local.backend_names = []
+    assert not generator.remote
+    assert not generator.ai_available
+    assert generator.generate_local_code(OFFLINE).startswith("' Assembled offline")
+
+def test_a_hung_daemon_is_given_up_on_quickly(monkeypatch):
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()  # Accepts connections but never answers
+    try:
+        monkeypatch.setattr(generation_daemon, "read_state",
+                            lambda: {"port": listener.getsockname()[1], "token": "t", "pid": 0})
+        monkeypatch.setattr(generation_daemon, "STATUS_TIMEOUT_S", 0.2)
+        start = time.monotonic()
+        generator = DaemonGenerator(api_key="")
+        generator.local.backend_names = []
+        assert not generator.ai_available
+        assert time.monotonic() - start < 2.0
+    finally:
+        listener.close()
@@ -0,0 +1,39 @@
+"""The status bar names where the generated code actually came from"""
+
+import queue
+
+import pytest
+
+from executor import Job
+from gui import CatiaCodeGeneratorGUI
+
+class Recorded:
+    """Stands in for a Tk variable or widget, keeping what was set on it"""
+
+    def __init__(self):
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+    def config(self, **options):
+        pass
+
+@pytest.fixture
+def gui():
+    gui = CatiaCodeGeneratorGUI.__new__(CatiaCodeGeneratorGUI)
+    gui.status_var = Recorded()
+    gui.cancel_btn = Recorded()
+    gui.first_token = 0.25
+    return gui
+
+@pytest.mark.parametrize("source, label", [
+    ("ai", "AI-powered generation! (first block 0.25s"),
+    ("cache", "a cached AI response!"),
+    ("similar", "a cached AI response to a similar request!"),
+    ("offline", "offline generation!"),
+    ("template", "a code template!"),
+])
+def test_finished_stream_names_its_source(gui, source, label):
+    gui._finish_stream(Job(), queue.Queue(), {"source": source, "backend": None})
+    assert gui.status_var.value.startswith(f"Code generated successfully using {label}")
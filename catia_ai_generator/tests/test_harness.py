@@ -0,0 +1,42 @@
+"""The benchmark harness flags regressions against stored baselines and saves new ones"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+from harness import BenchResult, bench, compare, percentile, run
+
+def test_percentile_picks_the_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 51
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.99) == 7
+
+def test_bench_times_every_call():
+    calls = []
+    result = bench("append", lambda: calls.append(1), min_time=0, min_iterations=25, warmup=2)
+    assert result.iterations == 25 and len(calls) == 27
+    assert result.ops_per_sec > 0 and result.p50_us <= result.p99_us
+
+def test_compare_against_the_threshold():
+    result = BenchResult("case", 10, 60.0, 1.0, 2.0)
+    assert compare(result, None, 0.3) == ("(no baseline)", False)
+    assert compare(result, {"ops_per_sec": 80.0}, 0.3)[1] is False  # 25% slower
+    change, regressed = compare(result, {"ops_per_sec": 100.0}, 0.3)
+    assert change.strip() == "-40.0%" and regressed
+
+def test_run_saves_baselines_then_fails_on_a_regression(tmp_path, capsys):
+    path = tmp_path / "baselines.json"
+    argv = ["--baselines", str(path), "--min-time", "0"]
+    assert run({"fast": lambda: None}, "test", argv + ["--save-baseline"]) == 0
+    data = json.loads(path.read_text())
+    assert set(data["results"]) == {"fast"}
+
+    data["results"]["fast"]["ops_per_sec"] = 1e15  # Far beyond anything a real run reaches
+    path.write_text(json.dumps(data))
+    assert run({"fast": lambda: None, "new": lambda: None}, "test", argv) == 1
+    output = capsys.readouterr().out
+    assert "1 case(s) regressed" in output and "(no baseline)" in output
+    assert run({"fast": lambda: None}, "test", argv + ["-k", "other"]) == 0
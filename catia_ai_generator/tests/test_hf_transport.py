@@ -0,0 +1,170 @@
+"""HuggingFaceTransport retries and circuit breaker against a local stub HTTP server"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from hf_transport import CircuitBreaker, CircuitOpenError, HuggingFaceTransport, TransportError
+
+class StubServer:
+    """Answers each POST with the next scripted (status, headers, body) response"""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests += 1
+                status, headers, body = stub.responses.pop(0) if stub.responses else (200, {}, [])
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/model"
+
+    def script(self, *responses):
+        self.responses.extend(responses)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture(scope="module")
+def server():
+    server = StubServer()
+    yield server
+    server.close()
+
+@pytest.fixture
+def stub(server):
+    server.responses.clear()
+    server.requests = 0
+    return server
+
+def make_transport(stub, breaker=None, **options):
+    delays = []
+    transport = HuggingFaceTransport(api_url=stub.url, token="test", breaker=breaker,
+                                     sleep=delays.append, **options)
+    return transport, delays
+
+def test_retries_model_loading_then_succeeds(stub):
+    stub.script((503, {}, {"error": "loading"}), (503, {}, {"error": "loading"}),
+                (200, {}, [{"generated_text": "Sub CATMain()"}]))
+    transport, delays = make_transport(stub)
+    assert transport.post({"inputs": "x"}) == [{"generated_text": "Sub CATMain()"}]
+    assert stub.requests == 3
+    assert len(delays) == 2
+    assert transport.breaker.state == CircuitBreaker.CLOSED
+
+def test_honors_retry_after(stub):
+    stub.script((429, {"Retry-After": "2"}, {}), (200, {}, {"ok": True}))
+    transport, delays = make_transport(stub)
+    assert transport.post({}) == {"ok": True}
+    assert len(delays) == 1 and 1.6 <= delays[0] <= 2.4
+
+def test_honors_estimated_time_over_retry_after(stub):
+    stub.script((503, {"Retry-After": "10"}, {"estimated_time": 4.0}), (200, {}, {"ok": True}))
+    transport, delays = make_transport(stub)
+    transport.post({})
+    assert 3.2 <= delays[0] <= 4.8
+
+def test_gives_up_after_max_retries(stub):
+    stub.script(*[(503, {}, {})] * 5)
+    transport, delays = make_transport(stub, max_retries=2)
+    with pytest.raises(TransportError, match="503"):
+        transport.post({})
+    assert stub.requests == 3
+    assert len(delays) == 2
+
+def test_does_not_retry_client_errors(stub):
+    stub.script((400, {}, {"error": "bad input"}))
+    transport, delays = make_transport(stub)
+    with pytest.raises(TransportError, match="400"):
+        transport.post({})
+    assert stub.requests == 1
+    assert delays == []
+
+def test_breaker_opens_half_opens_and_closes(stub):
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    transport, _ = make_transport(stub, breaker=breaker, max_retries=0)
+
+    stub.script((500, {}, {}), (500, {}, {}))
+    for _ in range(2):
+        with pytest.raises(TransportError):
+            transport.post({})
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Open: fails fast without a request
+    with pytest.raises(CircuitOpenError):
+        transport.post({})
+    assert stub.requests == 2
+
+    # After the reset timeout one trial call goes through; a failure re-opens the circuit
+    clock.now = 31
+    stub.script((500, {}, {}))
+    with pytest.raises(TransportError):
+        transport.post({})
+    assert stub.requests == 3
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        transport.post({})
+
+    # A successful trial closes it again
+    clock.now = 62
+    stub.script((200, {}, {"ok": True}))
+    assert transport.post({}) == {"ok": True}
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_client_error_on_half_open_trial_closes_the_breaker(stub):
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    transport, _ = make_transport(stub, breaker=breaker, max_retries=0)
+
+    stub.script((500, {}, {}))
+    with pytest.raises(TransportError):
+        transport.post({})
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 31
+    stub.script((404, {}, {"error": "no such model"}))
+    with pytest.raises(TransportError, match="404"):
+        transport.post({})
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    stub.script((200, {}, {"ok": True}))
+    assert transport.post({}) == {"ok": True}
+
+def test_connection_errors_count_as_failures():
+    breaker = CircuitBreaker(failure_threshold=1)
+    transport = HuggingFaceTransport(api_url="http://127.0.0.1:9/model", breaker=breaker,
+                                     connect_timeout=0.5, sleep=lambda _: None)
+    with pytest.raises(TransportError):
+        transport.post({})
+    assert breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,51 @@
+"""History entries are found by full-text search and survive compaction"""
+
+import pytest
+
+import history
+from history import HistoryStore, match_query
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    yield store
+    store.close()
+
+def test_match_query():
+    assert match_query("Pad, the sketch!") == '"pad" "the" "sketch"*'
+    assert match_query("pad sketch", any_term=True) == '"pad" OR "sketch"*'
+    assert match_query("  --  ") is None
+
+def test_description_matches_rank_above_code_matches(store):
+    in_code = store.record("Create a block", "' then fillet every edge", source="template")
+    in_description = store.record("Fillet the top edges", "Sub CATMain()\nEnd Sub", backend="openai")
+    results = store.search("fillet")
+    assert [entry.id for entry in results] == [in_description, in_code]
+    assert (results[0].source, results[0].backend) == ("ai", "openai")
+    assert [entry.id for entry in store.search("fil")] == [in_description, in_code]  # Prefix match
+
+def test_search_falls_back_to_any_word_and_filters_language(store):
+    vba = store.record("Pad a rectangle", "Sub CATMain()\nEnd Sub")
+    python = store.record("Pad a circle", "def main(): pass", language="Python")
+    assert [entry.id for entry in store.search("pad rectangle")] == [vba]
+    assert [entry.id for entry in store.search("pad hexagon")] == [python, vba]  # Newest first
+    assert [entry.id for entry in store.search("pad", language="Python")] == [python]
+    assert store.search("pocket") == []
+
+def test_search_widens_its_window_to_older_entries(store, monkeypatch):
+    monkeypatch.setattr(history, "SEARCH_WINDOW", 2)
+    oldest = store.record("Chamfer the outer edges", "Sub CATMain()\nEnd Sub")
+    for i in range(10):
+        store.record(f"Unrelated request {i}", "Sub CATMain()\nEnd Sub")
+    assert [entry.id for entry in store.search("chamfer")] == [oldest]
+
+def test_compacted_code_reads_back_and_stays_searchable(store):
+    code = "Sub CATMain()\n    ' Mirror the body about the YZ plane\nEnd Sub"
+    entry_id = store.record("Mirror the body", code)
+    store.compact_after = -1  # Everything counts as old
+    assert store.compact() == 1 and store.compact() == 0
+    assert store.stats()["compacted"] == 1
+    assert store.get(entry_id).code == code
+    assert store.search("yz plane")[0].code == code
+    store.clear()
+    assert store.recent() == [] and store.search("mirror") == []
@@ -0,0 +1,24 @@
+"""Importing the CLI core stays fast and leaves the heavy dependencies for first use"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+from check_import_time import BUDGETS, SRC_DIR, import_profile
+
+def test_main_does_not_import_heavy_dependencies():
+    code = ("import sys; import main; "
+            "print(' '.join(sorted(name for name in ('openai', 'requests', 'jinja2') if name in sys.modules)))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=SRC_DIR)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+@pytest.mark.parametrize("module", ["main"])
+def test_import_time_budget(module):
+    directory, budget_ms = BUDGETS[module]
+    elapsed_ms = min(import_profile(module, directory)[0] for _ in range(3))
+    assert elapsed_ms <= budget_ms
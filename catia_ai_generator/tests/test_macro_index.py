@@ -0,0 +1,89 @@
+"""Macro index builds are published atomically and picked up by open readers"""
+
+import os
+
+import pytest
+
+import macro_index
+from macro_index import CURRENT_FILE, META_FILE, POSTINGS_FILE, MacroIndex, build_index, current_generation
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+@pytest.fixture
+def corpus(tmp_path):
+    source = tmp_path / "macros"
+    write(str(source / "pad.bas"), "Sub CATMain()\n    Set pad = shapeFactory.AddNewPad(sketch, 20)\nEnd Sub\n")
+    write(str(source / "hole.bas"), "Sub CATMain()\n    Set hole = shapeFactory.AddNewHole(face, 10)\nEnd Sub\n")
+    return str(source), str(tmp_path / "index")
+
+def names(results):
+    return [os.path.basename(path) for path, _ in results]
+
+def generations(index_dir):
+    return sorted(name for name in os.listdir(index_dir) if name.startswith("gen-"))
+
+def test_build_publishes_a_generation(corpus):
+    source, index_dir = corpus
+    build_index(source, index_dir)
+    generation = current_generation(index_dir)
+    assert generations(index_dir) == [generation]
+    assert sorted(os.listdir(os.path.join(index_dir, generation))) == [META_FILE, POSTINGS_FILE]
+    with MacroIndex(index_dir) as index:
+        assert names(index.search("hole")) == ["hole.bas"]
+
+def test_open_reader_switches_to_the_new_build(corpus, monkeypatch):
+    source, index_dir = corpus
+    build_index(source, index_dir)
+    monkeypatch.setattr(macro_index, "REFRESH_INTERVAL", 0.0)
+    with MacroIndex(index_dir) as index:
+        first = index.generation
+        assert names(index.search("chamfer")) == []
+
+        write(os.path.join(source, "chamfer.bas"), "Sub CATMain()\n    Set chamfer = AddNewChamfer\nEnd Sub\n")
+        build_index(source, index_dir)
+        assert names(index.search("chamfer")) == ["chamfer.bas"]
+        assert index.generation != first
+
+        # The generation before the current one is kept for readers that just read CURRENT
+        os.utime(os.path.join(source, "chamfer.bas"), (0, 1))
+        build_index(source, index_dir)
+        assert first not in generations(index_dir)
+        assert len(generations(index_dir)) == 2
+
+def test_reads_and_replaces_the_flat_layout(corpus):
+    source, index_dir = corpus
+    build_index(source, index_dir)
+    generation_dir = os.path.join(index_dir, current_generation(index_dir))
+    for name in (META_FILE, POSTINGS_FILE):
+        os.replace(os.path.join(generation_dir, name), os.path.join(index_dir, name))
+    os.rmdir(generation_dir)
+    os.remove(os.path.join(index_dir, CURRENT_FILE))
+
+    with MacroIndex(index_dir) as index:
+        assert index.generation is None
+        assert names(index.search("pad")) == ["pad.bas"]
+
+    write(os.path.join(source, "fillet.bas"), "Sub CATMain()\n    Set fillet = AddNewFillet\nEnd Sub\n")
+    assert build_index(source, index_dir)["unchanged"] == 2  # The flat index was reused
+    assert not os.path.exists(os.path.join(index_dir, META_FILE))
+    with MacroIndex(index_dir) as index:
+        assert names(index.search("fillet")) == ["fillet.bas"]
+
+def test_failed_refresh_keeps_the_open_generation(corpus, monkeypatch):
+    source, index_dir = corpus
+    build_index(source, index_dir)
+    monkeypatch.setattr(macro_index, "REFRESH_INTERVAL", 0.0)
+    with MacroIndex(index_dir) as index:
+        first = index.generation
+        write(os.path.join(source, "chamfer.bas"), "Sub CATMain()\n    Set chamfer = AddNewChamfer\nEnd Sub\n")
+        build_index(source, index_dir)
+        os.remove(os.path.join(index_dir, current_generation(index_dir), POSTINGS_FILE))
+
+        assert not index.refresh()
+        assert index.generation == first
+        assert names(index.search("hole")) == ["hole.bas"]
+        assert names(index.search("pad")) == ["pad.bas"]
+        assert names(index.search("chamfer")) == []
@@ -0,0 +1,53 @@
+"""MacroRunner executes macros through ExecuteScript in the simulated CATIA"""
+
+import os
+
+import pytest
+
+from catia_session import CatiaSessionManager
+from fake_catia import FakeCatiaBackend
+from macro_runner import MacroRunner, find_entry_point, summarize
+
+HELPER_FIRST = "Function Area(w)\n    Area = w * w\nEnd Function\n\nSub CATMain()\n    MsgBox Area(2)\nEnd Sub\n"
+FAILING = "Sub Broken()\n    Err.Raise 5\nEnd Sub\n"
+
+@pytest.fixture
+def backend():
+    return FakeCatiaBackend(running=True)
+
+@pytest.fixture
+def runner(backend, tmp_path):
+    session = CatiaSessionManager(backend)
+    session.connect()
+    with MacroRunner(session, script_dir=str(tmp_path)) as runner:
+        yield runner
+
+def test_entry_point_prefers_catmain():
+    assert find_entry_point(HELPER_FIRST) == "CATMain"
+    assert find_entry_point("Private Sub Helper()\nEnd Sub") == "Helper"
+    assert find_entry_point("' just a comment") is None
+
+def test_runs_the_entry_point_and_removes_the_script(runner, backend, tmp_path):
+    result = runner.run(HELPER_FIRST)
+    assert result.ok and result.entry_point == "CATMain"
+    (call, (library, _, program, function, _)), = backend.app.SystemService.calls
+    assert (call, library, function) == ("ExecuteScript", str(tmp_path), "CATMain")
+    assert program.endswith(".CATScript")
+    assert os.listdir(tmp_path) == []
+
+def test_errors_are_reported_per_macro(runner, backend):
+    results = list(runner.run_many([FAILING, "no code here", HELPER_FIRST]))
+    assert [result.ok for result in results] == [False, False, True]
+    assert results[0].error == "Runtime error in Broken"
+    assert results[1].error == "No Sub or Function found to run"
+    assert [result.index for result in results] == [0, 1, 2]
+    assert summarize(results).startswith("1/3 macros succeeded")
+    assert len(list(runner.run_many([FAILING, HELPER_FIRST], stop_on_error=True))) == 1
+
+def test_private_script_directory_is_removed_on_close(backend):
+    session = CatiaSessionManager(backend)
+    session.connect()
+    runner = MacroRunner(session)
+    assert runner.run(HELPER_FIRST).ok
+    runner.close()
+    assert not os.path.exists(runner.script_dir)
@@ -0,0 +1,67 @@
+"""Every running process exports only its own metrics, to its own Prometheus file"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from metrics import Recorder
+
+def read_prom(directory):
+    return {name: open(os.path.join(directory, name)).read()
+            for name in os.listdir(directory) if name.endswith(".prom")}
+
+def own_file():
+    return f"metrics.{os.getpid()}.prom"
+
+def test_file_is_named_after_the_process_and_removed_on_close(tmp_path):
+    recorder = Recorder(str(tmp_path))
+    recorder.record("generate", 0.02, {"backend": "openai"})
+    recorder.flush()
+    files = read_prom(str(tmp_path))
+    assert list(files) == [own_file()]
+    assert 'catia_ai_stage_duration_seconds_count{stage="generate",backend="openai"} 1' in files[own_file()]
+    recorder.close()
+    assert read_prom(str(tmp_path)) == {}
+    assert '"stage": "generate"' in (tmp_path / "metrics.jsonl").read_text()
+
+def test_label_values_are_escaped(tmp_path):
+    recorder = Recorder(str(tmp_path))
+    recorder.record("generate", 0.02, {"backend": 'odd\\name "x"\nnext'})
+    assert 'backend="odd\\\\name \\"x\\"\\nnext"' in recorder.prometheus_text()
+    recorder.close()
+
+def test_files_of_dead_processes_are_pruned(tmp_path):
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True).stdout.strip()
+    (tmp_path / f"metrics.{dead}.prom").write_text("stale\n")
+    (tmp_path / f"metrics.{os.getppid()}.prom").write_text("still running\n")
+    recorder = Recorder(str(tmp_path))
+    assert sorted(read_prom(str(tmp_path))) == [f"metrics.{os.getppid()}.prom"]
+    recorder.close()
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_process_starts_from_empty_metrics(tmp_path):
+    import metrics
+    recorder = metrics.configure(str(tmp_path))
+    try:
+        metrics.record("generate", 0.02, backend="openai")
+        pid = os.fork()
+        if pid == 0:
+            try:
+                metrics.record("render", 0.01)
+                recorder.flush()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        recorder.flush()
+        files = read_prom(str(tmp_path))
+        assert sorted(files) == sorted([own_file(), f"metrics.{pid}.prom"])
+        assert 'stage="render"' not in files[own_file()]
+        assert 'stage="render"' in files[f"metrics.{pid}.prom"]
+        assert 'stage="generate"' not in files[f"metrics.{pid}.prom"]
+        lines = (tmp_path / "metrics.jsonl").read_text().splitlines()
+        assert [line.count('"stage": "generate"') for line in lines] == [1, 0]
+    finally:
+        metrics.configure(None)
@@ -0,0 +1,82 @@
+"""Offline assembly of macros from snippets, and when the generator uses it"""
+
+import pytest
+
+from backends import StubBackend
+from main import AICodeGenerator, CodeRequest
+from offline_backend import OfflineBackend
+from router import Router
+
+ASSEMBLED = "' Assembled offline from the CATIA snippet library"
+AI_CODE = 'Sub CATMain()\n    MsgBox "Hello from openai"\nEnd Sub'
+
+@pytest.fixture(scope="module")
+def backend():
+    return OfflineBackend()
+
+def test_assembles_operations_with_their_prerequisites(backend):
+    assembly = backend.assemble("Draw a 120 x 40 mm rectangle on the XZ plane, pad it 15 mm, then fillet the edges 3 mm")
+    assert assembly.complete
+    assert assembly.operations == ["new_part", "sketch", "rectangle", "pad", "fillet"]
+    code = assembly.code
+    assert "Sketches.Add(part.OriginElements.PlaneZX)" in code
+    assert "factory2D.CreateLine -60, -20, 60, -20" in code
+    assert code.index("sketch.CloseEdition") < code.index("AddNewPad(sketch, 15)")
+    assert "AddNewSolidEdgeFilletWithConstantRadius(Nothing, 1, 3)" in code
+
+def test_repeated_operations_get_their_own_variables(backend):
+    code = backend.assemble("sketch a 10 mm circle and pad it 5 mm, then sketch a 20 mm square and pocket it 4 mm",
+                            "Python").code
+    assert "sketch2 = body.Sketches.Add" in code
+    assert "shape_factory.AddNewPocket(sketch2, 4)" in code
+
+def test_cube_is_padded_to_its_edge_length(backend):
+    code = backend.assemble("make a 40 mm cube").code
+    assert "factory2D.CreateLine -20, -20, 20, -20" in code
+    assert "AddNewPad(sketch, 40)" in code
+    assert "AddNewPad(sketch, 15)" in backend.assemble("make a 40 mm cube 15 mm thick").code
+
+def test_unrecognised_clauses_make_the_assembly_incomplete(backend):
+    assembly = backend.assemble("pad a 30 mm square 10 mm, then compute the moment of inertia")
+    assert not assembly.complete
+    assert assembly.unmatched == ["compute the moment of inertia"]
+    assert "' Not recognised: compute the moment of inertia" in assembly.code
+    assert backend.assemble("hello there") is None
+
+def make_generator(*backends):
+    generator = AICodeGenerator(api_key="")
+    generator.cache = None
+    generator.similar = None
+    generator.history = None
+    generator.backend_names = [backend.name for backend in backends]
+    generator.router = Router(backends, hedge=False)
+    return generator
+
+REQUEST = CodeRequest("Draw a 50 mm square and pad it 10 mm")
+
+def test_requested_ai_is_used_even_when_offline_assembly_would_do():
+    stub = StubBackend("openai", sleep=lambda _: None)
+    generator = make_generator(stub)
+    assert generator.generate_code_with_ai(REQUEST) == AI_CODE
+    assert "".join(generator.stream_code_with_ai(REQUEST)) == AI_CODE
+    assert stub.calls == 2
+    assert generator.generate_local_code(REQUEST).startswith(ASSEMBLED)
+
+def test_offline_assembly_without_ai_and_after_failures():
+    assert make_generator().generate_code_with_ai(REQUEST).startswith(ASSEMBLED)
+    failing = make_generator(StubBackend("openai", error_rate=1.0, sleep=lambda _: None))
+    assert failing.generate_code_with_ai(REQUEST).startswith(ASSEMBLED)
+    assert "".join(failing.stream_code_with_ai(REQUEST)).startswith(ASSEMBLED)
+
+def test_callers_learn_where_the_code_came_from():
+    generator = make_generator(StubBackend("openai", sleep=lambda _: None))
+    for generate, request, source in [
+            (generator.generate_local_code, REQUEST, "offline"),
+            (generator.generate_local_code, CodeRequest("hello there"), "template"),
+            (generator.generate_code_with_ai, REQUEST, "ai")]:
+        info = {}
+        generate(request, info)
+        assert info["source"] == source
+    info = {}
+    "".join(generator.stream_code_with_ai(REQUEST, info))
+    assert info == {"source": "ai", "backend": "openai"}
@@ -0,0 +1,61 @@
+"""Numbers in a request bound to what they measure, by the template compiler and the offline assembler"""
+
+import pytest
+
+from offline_backend import OfflineBackend
+from param_parser import AmbiguousDimensions, assign, normalize, parse, to_code
+
+def dimensions(description):
+    return [(feature.kind, feature.params) for feature in parse(description).features]
+
+def test_postfix_labels_bind_to_the_number_before_them():
+    assert dimensions("create a hole 8mm diameter 20mm deep") == [("hole", {"diameter": 8.0, "depth": 20.0})]
+    assert dimensions("create a hole diameter 8mm depth 20mm") == [("hole", {"diameter": 8.0, "depth": 20.0})]
+    assert dimensions("a hole 10 mm deep and 6 mm diameter") == [("hole", {"depth": 10.0, "diameter": 6.0})]
+
+def test_counts_are_not_dimensions():
+    assert dimensions("create 3 holes of 5mm") == [("hole", {"diameter": 5.0})]
+    assert dimensions("create 4 holes 6mm diameter") == [("hole", {"diameter": 6.0})]
+
+def test_fractions_and_mixed_numbers():
+    assert dimensions("1/2 inch hole") == [("hole", {"diameter": 12.7})]
+    assert dimensions("a hole 1 1/2 in deep")[0][1]["depth"] == pytest.approx(38.1)
+
+def test_prefix_labels_with_equals():
+    assert dimensions("circle r=12.5") == [("circle", {"diameter": 25.0})]
+    assert dimensions("circle d = 8") == [("circle", {"diameter": 8.0})]
+    assert dimensions("hole ø6") == [("hole", {"diameter": 6.0})]
+
+def test_unlabelled_and_paired_numbers_keep_their_order():
+    assert dimensions("Sketch a rectangle 50 by 30 mm on the XY plane, pad it 10 mm") == [
+        ("rectangle", {"width": 50.0, "height": 30.0}), ("pad", {"length": 10.0})]
+    assert dimensions("rectangle 50 wide 30 long") == [("rectangle", {"width": 50.0, "height": 30.0})]
+
+def test_ambiguous_binding_falls_back_to_the_template():
+    parsed = parse("sketch a hole 8mm diameter 20mm")
+    assert parsed.ambiguous
+    code = to_code(parsed, "VBA", "sketch_creation")
+    assert "could not be matched" in code
+    assert "Diameter" not in code and "AddNewHole" not in code
+
+def test_assign_refuses_ambiguous_clauses():
+    with pytest.raises(AmbiguousDimensions):
+        assign(normalize("hole 8 diameter 20"), [("hole", ["diameter", "depth"])])
+
+def test_offline_assembly_uses_the_bound_values():
+    backend = OfflineBackend()
+    code = backend.assemble("create a hole 8mm diameter 20mm deep").code
+    assert "PlaneXY), 20)" in code and "hole.Diameter.Value = 8" in code
+    assert "CreateClosedCircle 0, 0, 12.5" in backend.assemble("circle r=12.5").code
+    assert backend.assemble("a hole 8mm diameter 20mm") is None
+
+@pytest.mark.parametrize("description, radius", [
+    ("sketch a circle of radius 10 and pad it 5 mm", "10"),
+    ("sketch a circle r=10 and pad it 5 mm", "10"),
+    ("sketch a circle diameter 10 and pad it 5 mm", "5"),
+    ("sketch a 10 mm circle and pad it 5 mm", "5"),
+])
+def test_offline_circle_size_is_a_diameter(description, radius):
+    assembly = OfflineBackend().assemble(description)
+    assert f"CreateClosedCircle 0, 0, {radius}\n" in assembly.code
+    assert "AddNewPad(sketch, 5)" in assembly.code
@@ -0,0 +1,46 @@
+"""Prompts share a static prefix and stay within their token budget"""
+
+from prompt_builder import MIN_DESCRIPTION_TOKENS, PromptBuilder
+
+class WordTokenizer:
+    """One token per word, so budgets in the tests are easy to reason about"""
+
+    name = "words"
+
+    def count(self, text):
+        return len(text.split())
+
+    def truncate(self, text, tokens):
+        return " ".join(text.split()[:tokens])
+
+def make_builder(input_budget=1500, example_budget=600):
+    return PromptBuilder("test-model", input_budget, example_budget, tokenizer=WordTokenizer())
+
+def test_prefix_is_identical_across_requests():
+    builder = make_builder()
+    first = builder.build("Create a   pad", "vba", "basic")
+    second = builder.build("Create a pocket", "VBA", "basic", examples=["Sub Example()\nEnd Sub"])
+    assert first.prefix == second.prefix and second.text.startswith(first.prefix)
+    assert first.text.endswith("\nDescription: Create a pad\n")
+    assert first.sections == ["base", "language:VBA", "complexity:basic", "description"]
+    assert second.sections[-2:] == ["examples", "description"]
+    assert (first.max_tokens, builder.build("x", "Python", "advanced").max_tokens) == (800, 2000)
+
+def test_examples_fill_only_the_remaining_budget():
+    builder = make_builder()
+    prefix_tokens = builder.prefix("VBA", "basic")[1]
+    description_tokens = WordTokenizer().count(builder.description_section("Create a pad"))
+    builder.input_budget = prefix_tokens + description_tokens + 23
+    examples = [" ".join(["word"] * 5)] * 4
+    prompt = builder.build("Create a pad", "VBA", "basic", examples)
+    assert prompt.examples == 2  # The 9-token header and two 7-token blocks; a third would not fit
+    assert prompt.tokens == WordTokenizer().count(prompt.text) <= prompt.budget
+    assert not prompt.truncated
+
+def test_long_description_is_truncated_but_kept():
+    builder = make_builder(input_budget=10)
+    description = " ".join(f"step{i}" for i in range(500))
+    prompt = builder.build(description, "VBA", "advanced", examples=["Sub Unused()\nEnd Sub"])
+    assert prompt.truncated and prompt.examples == 0
+    kept = prompt.text.split("Description: ")[1].split()
+    assert kept[:2] == ["step0", "step1"] and len(kept) == MIN_DESCRIPTION_TOKENS
@@ -0,0 +1,120 @@
+"""Response cache hits, misses, expiry and use from several connections at once"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "responses.sqlite3")
+
+def test_hits_misses_and_batched_counters(path):
+    cache = ResponseCache(path)
+    assert cache.get("a") is None
+    cache.put("a", "Sub A()\nEnd Sub")
+    assert cache.get("a") == "Sub A()\nEnd Sub"
+    assert cache.get("a") == "Sub A()\nEnd Sub"
+
+    other = ResponseCache(path)  # Another process: sees what was written so far
+    assert other.stats()["misses"] == 1 and other.stats()["hits"] == 0
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+    assert other.stats()["hits"] == 2
+    cache.close()
+    other.close()
+
+def test_expired_entries_are_misses_and_evicted(path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(path, ttl=60)
+    cache.put("old", "Sub Old()\nEnd Sub")
+    now[0] += 61
+    assert cache.get("old") is None
+    cache.put("new", "Sub New()\nEnd Sub")
+    assert cache.stats()["entries"] == 1
+    assert cache.get("new") == "Sub New()\nEnd Sub"
+    cache.close()
+
+def test_least_recently_read_entry_is_evicted(path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(path, max_entries=2)
+    for key in ("a", "b"):
+        now[0] += 1
+        cache.put(key, key)
+    now[0] += 1
+    cache.get("a")
+    now[0] += 1
+    cache.put("c", "c")  # The batched access time of "a" is written first
+    assert [cache.get(key) for key in ("a", "b", "c")] == ["a", None, "c"]
+    cache.close()
+
+def test_reads_do_not_wait_for_a_writer(path):
+    cache = ResponseCache(path)
+    cache.put("a", "value")
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")  # Another process in the middle of a write
+    try:
+        start = time.perf_counter()
+        assert [cache.get("a") for _ in range(10)] == ["value"] * 10
+        assert time.perf_counter() - start < 1.0
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+    cache.close()
+
+def test_threads_and_connections_share_the_cache(path):
+    caches = [ResponseCache(path), ResponseCache(path)]
+    errors = []
+
+    def work(n):
+        cache = caches[n % 2]
+        try:
+            for i in range(50):
+                cache.put(f"{n}-{i}", f"value {n} {i}")
+                assert cache.get(f"{n}-{i}") == f"value {n} {i}"
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    for cache in caches:
+        cache.flush()
+    stats = caches[0].stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (300, 300, 0)
+    for cache in caches:
+        cache.close()
+
+class FakeRouted:
+    def __init__(self, text):
+        self.text = text
+        self.backend = "huggingface"
+        self.hedged = False
+
+def test_assistant_caches_only_responses_with_code(path):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from catia_ai_assistant import CatiaAIAssistant
+
+    assistant = CatiaAIAssistant.__new__(CatiaAIAssistant)  # No Tk window
+    assistant.cache = ResponseCache(path)
+    assistant.backend_names = ["huggingface"]
+    assistant.history = None
+    answers = iter(["I cannot help with that.", "Sub CATMain()\n    MsgBox \"hi\"\nEnd Sub"])
+    assistant.complete = lambda prompt: FakeRouted(next(answers))
+
+    assert assistant.generate_with_ai("make a part") is None
+    assert assistant.cache.stats()["entries"] == 0
+    assert assistant.generate_with_ai("make a part") == "Sub CATMain()\n    MsgBox \"hi\"\nEnd Sub"
+    assert assistant.cache.stats()["entries"] == 1
+    assistant.cache.close()
@@ -0,0 +1,118 @@
+"""Router failover, unhealthy-backend probing and hedging, driven by a fake clock"""
+
+import threading
+import time
+
+import pytest
+
+from backends import StubBackend
+from router import NoBackendAvailable, Router
+
+STALL = 60.0
+
+class FakeClock:
+    """Advanced by the stub backends' sleeps, so recorded latencies are exact"""
+
+    def __init__(self):
+        self.now = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        with self._lock:
+            self.now += seconds
+
+def stub(name, clock, median, error_rate=0.0, sleep=None):
+    return StubBackend(name, median=median, sigma=0.0, error_rate=error_rate, sleep=sleep or clock.sleep)
+
+def test_fails_over_to_the_next_backend():
+    clock = FakeClock()
+    failing = stub("openai", clock, 0.2, error_rate=1.0)
+    answering = stub("huggingface", clock, 0.1)
+    router = Router([failing, answering], hedge=False, explore_every=0, clock=clock)
+    try:
+        response = router.complete("pad", 100)
+        assert (response.backend, response.hedged) == ("huggingface", False)
+        assert response.errors == ["openai: openai failed (simulated)"]
+        assert response.latency == pytest.approx(0.3)
+        assert router.stats["openai"].failures == 1
+        assert router.stats["huggingface"].latency == pytest.approx(0.1)
+
+        with pytest.raises(NoBackendAvailable, match="openai failed"):
+            Router([failing], hedge=False, clock=clock).complete("pad", 100)
+    finally:
+        router.close()
+
+def test_prefers_the_fastest_backend_once_measured():
+    clock = FakeClock()
+    slow = stub("openai", clock, 0.3)
+    fast = stub("huggingface", clock, 0.1)
+    router = Router([slow, fast], hedge=False, explore_every=0, clock=clock)
+    try:
+        # Unmeasured backends are tried first, then the faster one wins every time
+        assert [router.complete("pad", 100).backend for _ in range(4)] == \
+            ["openai", "huggingface", "huggingface", "huggingface"]
+        assert (slow.calls, fast.calls) == (1, 3)
+    finally:
+        router.close()
+
+def test_unhealthy_backend_is_skipped_until_probed():
+    clock = FakeClock()
+    flaky = stub("openai", clock, 0.1, error_rate=1.0)
+    steady = stub("huggingface", clock, 0.2)
+    router = Router([flaky, steady], alpha=1.0, probe_after=30.0, hedge=False, explore_every=0, clock=clock)
+    try:
+        assert router.complete("pad", 100).errors  # The first failure marks it unhealthy
+        assert not router.healthy(flaky)
+        assert [backend.name for backend in router.ranked()] == ["huggingface", "openai"]
+
+        response = router.complete("pad", 100)
+        assert (response.backend, response.errors) == ("huggingface", [])
+        assert flaky.calls == 1
+
+        clock.sleep(30.0)  # Past probe_after: one request probes it again
+        assert router.healthy(flaky)
+        flaky.error_rate = 0.0
+        response = router.complete("pad", 100)
+        assert response.backend == "openai"
+        assert flaky.calls == 2
+        assert router.healthy(flaky) and router.stats["openai"].error_rate == 0.0
+    finally:
+        router.close()
+
+def test_slow_call_is_hedged_to_the_runner_up():
+    clock = FakeClock()
+    released = threading.Event()
+
+    def primary_sleep(seconds):
+        if seconds >= STALL:
+            released.wait(10)
+        clock.sleep(seconds)
+
+    primary = stub("openai", clock, 0.01, sleep=primary_sleep)
+    backup = stub("huggingface", clock, 0.05)
+    router = Router([primary, backup], min_hedge_samples=5, explore_every=0, clock=clock)
+    try:
+        router.hedge = False  # Measure both backends without racing the hedge timer
+        for _ in range(6):
+            router.complete("pad", 100)
+        router.hedge = True
+        assert len(router.stats["openai"].samples) == 5
+        assert router.hedge_delay(primary) == pytest.approx(0.01)
+
+        primary.median = STALL
+        response = router.complete("pad", 100)
+        assert (response.backend, response.hedged, response.errors) == ("huggingface", True, [])
+        assert primary.calls == 6 and backup.calls == 2
+
+        # The losing call finishes in the background and still updates the stats
+        released.set()
+        deadline = time.monotonic() + 5
+        while router.stats["openai"].calls < 6 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert max(router.stats["openai"].samples) >= STALL
+    finally:
+        released.set()
+        router.close()
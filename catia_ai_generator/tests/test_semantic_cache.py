@@ -0,0 +1,50 @@
+"""Reworded requests served from the semantic cache, and when their dimensions may be swapped in"""
+
+import pytest
+
+from response_cache import ResponseCache
+from semantic_cache import SemanticCache, dimensions, resubstitute
+
+HOLE_CODE = """Sub CATMain()
+    Set hole = shapeFactory.AddNewHoleFromPoint(0, 0, 0, reference, 20)
+    hole.Diameter.Value = 8
+End Sub"""
+
+@pytest.fixture
+def similar(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    semantic = SemanticCache(cache)
+    cache.put("hole", HOLE_CODE)
+    semantic.put("create a hole 8mm diameter 20mm deep", "VBA", "basic", "hole")
+    yield semantic
+    semantic.close()
+
+def test_dimensions_are_keyed_by_what_they_measure():
+    assert dimensions("create a hole 8mm diameter 20mm deep") == dimensions("a hole 20 mm deep, diameter 8 mm")
+    assert dict(dimensions("Sketch a rectangle 50 by 30 mm, pad it 10 mm")) == {
+        "rectangle1.width": 50.0, "rectangle1.height": 30.0, "pad1.length": 10.0}
+
+def test_unbound_numbers_keep_their_position():
+    assert dimensions("array of 5 by 3 copies") == (("?0", 5.0), ("?1", 3.0))
+    assert dimensions("a hole 8mm diameter 20mm") == (("?0", 8.0), ("?1", 20.0))
+
+def test_reordered_request_gets_the_same_code(similar):
+    hit = similar.get("make a hole 20 mm deep with a diameter of 8 mm")
+    assert hit is not None and hit.code == HOLE_CODE and not hit.substituted
+
+def test_swapped_dimensions_are_not_substituted(similar):
+    assert similar.get("create a hole 20mm diameter 8mm deep") is None
+
+def test_changed_dimension_is_substituted(similar):
+    hit = similar.get("create a hole 6mm diameter 20mm deep")
+    assert hit is not None and hit.substituted
+    assert "hole.Diameter.Value = 6" in hit.code and "reference, 20)" in hit.code
+
+def test_unbound_dimensions_are_not_substituted():
+    old, new = (("?0", 8.0), ("?1", 20.0)), (("?0", 6.0), ("?1", 20.0))
+    assert resubstitute(HOLE_CODE, old, new) is None
+    assert resubstitute(HOLE_CODE, old, old) == HOLE_CODE
+
+def test_different_parameters_are_not_substituted():
+    old = (("hole1.depth", 20.0), ("hole1.diameter", 8.0))
+    assert resubstitute(HOLE_CODE, old, (("pad1.length", 20.0), ("rectangle1.width", 8.0))) is None
@@ -0,0 +1,138 @@
+"""Identical in-flight requests share one upstream call, streamed or not"""
+
+import threading
+
+import pytest
+
+from main import AICodeGenerator, CodeRequest
+from single_flight import SingleFlight, StreamAbandoned
+
+def start(target, *args):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(target(*args)))
+    thread.start()
+    return thread, results
+
+def capture(func):
+    try:
+        return func()
+    except Exception as e:
+        return e
+
+def test_followers_share_the_leaders_result():
+    flights = SingleFlight()
+    entered, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        entered.set()
+        release.wait(5)
+        return "code"
+
+    leader = start(flights.do, "key", slow)
+    entered.wait(5)
+    followers = [start(flights.do, "key", slow) for _ in range(3)]
+    while flights.stats()["coalesced"] < 3:
+        threading.Event().wait(0.001)
+    release.set()
+    for thread, _ in [leader, *followers]:
+        thread.join(5)
+    assert [results for _, results in [leader, *followers]] == [["code"]] * 4
+    assert calls == [1]
+    assert flights.stats() == {"executions": 1, "coalesced": 3, "in_flight": 0}
+    assert flights.do("key", lambda: "again") == "again"  # Finished calls are not reused
+
+def test_errors_reach_every_follower():
+    flights = SingleFlight()
+    entered, release = threading.Event(), threading.Event()
+
+    def failing():
+        entered.set()
+        release.wait(5)
+        raise ConnectionError("upstream down")
+
+    leader = start(capture, lambda: flights.do("key", failing))
+    entered.wait(5)
+    follower = start(capture, lambda: "".join(flights.stream("key", failing)))
+    while flights.stats()["coalesced"] < 1:
+        threading.Event().wait(0.001)
+    release.set()
+    for thread, _ in (leader, follower):
+        thread.join(5)
+    assert all(isinstance(results[0], ConnectionError) for _, results in (leader, follower))
+
+def test_stream_followers_receive_earlier_and_later_chunks():
+    flights = SingleFlight()
+    next_chunk = threading.Semaphore(0)
+
+    def chunks():
+        for chunk in ("Sub ", "CATMain()", "\nEnd Sub"):
+            next_chunk.acquire()
+            yield chunk
+
+    leader = flights.stream("key", chunks)
+    next_chunk.release()
+    assert next(leader) == "Sub "
+    follower = start(lambda: list(flights.stream("key", chunks)))
+    joined = start(flights.do, "key", lambda: "not called")
+    while flights.stats()["coalesced"] < 2:
+        threading.Event().wait(0.001)
+    next_chunk.release()
+    next_chunk.release()
+    assert list(leader) == ["CATMain()", "\nEnd Sub"]
+    for thread, _ in (follower, joined):
+        thread.join(5)
+    assert follower[1] == [["Sub ", "CATMain()", "\nEnd Sub"]]
+    assert joined[1] == ["Sub CATMain()\nEnd Sub"]
+
+def test_followers_fail_when_the_leading_stream_is_abandoned():
+    flights = SingleFlight()
+    leader = flights.stream("key", lambda: iter(["a", "b"]))
+    assert next(leader) == "a"
+    follower = flights.stream("key", lambda: iter(["unused"]))
+    assert next(follower) == "a"
+    leader.close()
+    with pytest.raises(StreamAbandoned):
+        next(follower)
+
+class FakeStream:
+    """OpenAI client whose streams wait until the test lets them finish"""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        self.calls += 1
+        self.started.set()
+        return self.events()
+
+    def events(self):
+        for text in ("Here is the macro:\nSub CATMain()", "\nEnd Sub", "\nRun it from Tools > Macro."):
+            self.release.wait(5)
+            yield type("Event", (), {"choices": [type("Choice", (), {"delta": type("Delta", (), {"content": text})})]})
+
+def test_identical_streaming_requests_share_one_openai_stream():
+    generator = AICodeGenerator(api_key="test")
+    generator.cache = None
+    generator.similar = None
+    generator.history = None
+    generator.backend_names = ["openai"]
+    generator.flights = SingleFlight()
+    generator.client = FakeStream()
+    request = CodeRequest("Compute the moment of inertia of every body")
+
+    first = start(lambda: "".join(generator.stream_code_with_ai(request)))
+    generator.client.started.wait(5)
+    second = start(lambda: "".join(generator.stream_code_with_ai(request)))
+    while generator.flights.stats()["coalesced"] < 1:
+        threading.Event().wait(0.001)
+    generator.client.release.set()
+    for thread, _ in (first, second):
+        thread.join(5)
+    assert first[1] == second[1] == ["Sub CATMain()\nEnd Sub"]
+    assert generator.client.calls == 1
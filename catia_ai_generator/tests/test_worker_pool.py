@@ -0,0 +1,71 @@
+"""CATIA processes of killed workers are ended, not orphaned"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from fake_catia import FakeCatiaBackend
+from worker_pool import CatiaWorkerPool
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc"), reason="checks processes through /proc")
+
+class SeparateProcessBackend(FakeCatiaBackend):
+    """Simulated CATIA that also starts a real process, like DispatchEx, and writes its id to a file"""
+
+    def __init__(self, pid_file: str):
+        super().__init__(startup_delay=0.0)
+        self.pid_file = pid_file
+        self.process = None
+
+    def launch(self):
+        super().launch()
+        self.process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        with open(self.pid_file, "a") as f:
+            f.write(f"{self.process.pid}\n")
+
+    def process_id(self, app):
+        return self.process.pid
+
+    def shutdown(self, app):
+        super().shutdown(app)
+        self.process.terminate()
+        self.process.wait()
+
+def running(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] not in ("Z", "X")
+    except OSError:
+        return False
+
+def wait_until_gone(pids, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not any(running(pid) for pid in pids):
+            return True
+        time.sleep(0.05)
+    return False
+
+def catia_pids(pid_file) -> list:
+    return [int(line) for line in pid_file.read_text().split()]
+
+def test_timed_out_worker_takes_its_catia_down(tmp_path):
+    pid_file = tmp_path / "catia.pids"
+    pool = CatiaWorkerPool(workers=1, backend_factory=lambda: SeparateProcessBackend(str(pid_file)),
+                           file_timeout=1.0, retries=0, start_method="fork")
+    results = pool.map(["part_hang.CATPart", "part.CATPart"])
+    assert [result.ok for result in results] == [False, True]
+    assert "Timed out" in results[0].error
+    pids = catia_pids(pid_file)
+    assert len(pids) == 2  # The replacement worker started its own
+    assert wait_until_gone(pids)
+
+def test_idle_workers_quit_their_catia(tmp_path):
+    pid_file = tmp_path / "catia.pids"
+    pool = CatiaWorkerPool(workers=2, backend_factory=lambda: SeparateProcessBackend(str(pid_file)),
+                           start_method="fork")
+    assert all(result.ok for result in pool.map(["a.CATPart", "b.CATPart", "c.CATPart"]))
+    assert wait_until_gone(catia_pids(pid_file))